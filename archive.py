@@ -0,0 +1,515 @@
+# app/archive.py
+# Arquivo colunar compactado de dias selados (AAAA-MM-DD.mla) e busca vetorizada com NumPy
+# (um arquivo por DB: com shards, AAAA-MM-DD_HH.mla)
+#
+# Um dia selado em SQLite custa ~50-80 bytes por linha mais os índices. No arquivo,
+# cada coluna vira um array compactado (zlib) em grupos de ARCHIVE_ROW_GROUP_ROWS
+# linhas, com min/max de cada coluna por grupo:
+#   - linhas ordenadas por horário; timestamp e id gravados como delta da linha anterior
+#   - IPs (uint32), portas (uint16) e IDs de dicionário no menor inteiro que cabe
+#   - bytes de cada valor transpostos antes do zlib (bytes altos repetidos ficam juntos)
+# A busca descarta grupos pelo min/max, acha o intervalo de horário com searchsorted
+# e filtra com máscaras; as demais colunas só são descompactadas nos grupos com acerto.
+#
+# Layout: MAGIC | blocos | rodapé JSON (zlib) | tamanho do rodapé (uint64) | MAGIC.
+# Os dicionários (id -> nome) vão no rodapé: o arquivo não depende de nenhum DB.
+# Linhas que chegarem depois para um dia arquivado vão para um DB novo do dia, com
+# IDs continuando os do arquivo (database.create_log_schema): a busca lê os dois.
+
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import threading
+from itertools import chain
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from app import config, database, catalog, bloom
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'MLARCH01'
+ARCHIVE_SUFFIX = '.mla'
+
+# Ordem das colunas = tabela logs
+COLUMNS = ('id', 'timestamp', 'interface_in_id', 'interface_out_id', 'state_id', 'protocol_id',
+           'src_ip_priv', 'src_port_priv', 'dst_ip', 'dst_port', 'nat_ip_pub', 'nat_port_pub')
+DELTA_COLUMNS = ('id', 'timestamp')
+NULLABLE_COLUMNS = ('state_id', 'nat_ip_pub', 'nat_port_pub')  # NULL gravado como 0
+DICT_TABLES = ('d_interfaces', 'd_protocols', 'd_states')
+
+def available() -> bool:
+    """Arquivamento e leitura de arquivos exigem NumPy"""
+    return np is not None
+
+def archive_path_for_db(db_path: str) -> str:
+    """Arquivo colunar de um DB de dia (ou shard), ao lado dele"""
+    return os.path.splitext(db_path)[0] + ARCHIVE_SUFFIX
+
+# ==================== CODIFICAÇÃO ====================
+
+def _smallest_dtype(lo: int, hi: int):
+    """Menor inteiro que guarda [lo, hi] (sem sinal se lo >= 0)"""
+    kinds = ('uint8', 'uint16', 'uint32', 'uint64') if lo >= 0 else ('int8', 'int16', 'int32', 'int64')
+    for kind in kinds:
+        info = np.iinfo(kind)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(kind)
+    return np.dtype('int64')
+
+def _encode(values, delta: bool) -> Tuple[bytes, Dict]:
+    """Coluna int64 -> (bloco compactado, metadados)"""
+    meta = {'min': int(values.min()), 'max': int(values.max())}
+    if delta:
+        meta['base'] = int(values[0])
+        values = np.diff(values, prepend=values[:1])
+    dtype = _smallest_dtype(int(values.min()), int(values.max()))
+    meta['dtype'] = dtype.str
+
+    data = values.astype(dtype)
+    if dtype.itemsize > 1:
+        data = data.view(np.uint8).reshape(-1, dtype.itemsize).T
+    return zlib.compress(data.tobytes(), config.ARCHIVE_COMPRESSION_LEVEL), meta
+
+def _decode(block, meta: Dict, count: int):
+    """Bloco compactado -> coluna int64"""
+    dtype = np.dtype(meta['dtype'])
+    raw = np.frombuffer(zlib.decompress(block), dtype=np.uint8)
+    if dtype.itemsize > 1:
+        raw = np.ascontiguousarray(raw.reshape(dtype.itemsize, count).T)
+    values = raw.view(dtype).reshape(count).astype(np.int64)
+    if 'base' in meta:
+        values = np.cumsum(values) + meta['base']
+    return values
+
+# ==================== ESCRITA ====================
+
+class ArchiveWriter:
+    """Grava um arquivo grupo a grupo (em .tmp até close())"""
+
+    def __init__(self, path: str, day: date, dicts: Dict[str, Dict[int, str]]):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.day = day
+        self.dicts = dicts
+        self.groups = []
+        self.rows = 0
+        self.checksums = dict.fromkeys(COLUMNS, 0)
+        self.file = open(self.tmp_path, 'wb')
+        self.file.write(MAGIC)
+
+    def write_group(self, columns: Dict[str, 'np.ndarray']):
+        """Grava um grupo de linhas (colunas int64, já ordenadas por horário)"""
+        count = len(columns['timestamp'])
+        group = {'rows': count, 'columns': {}}
+        for name in COLUMNS:
+            block, meta = _encode(columns[name], name in DELTA_COLUMNS)
+            meta['offset'] = self.file.tell()
+            meta['length'] = len(block)
+            self.file.write(block)
+            group['columns'][name] = meta
+            self.checksums[name] += int(columns[name].sum())
+        self.groups.append(group)
+        self.rows += count
+
+    def close(self) -> Dict:
+        """Grava o rodapé e fsync. Retorna o rodapé"""
+        footer = {
+            'version': 1,
+            'day': self.day.isoformat(),
+            'rows': self.rows,
+            'max_id': max((g['columns']['id']['max'] for g in self.groups), default=0),
+            'created_at': datetime.now().isoformat(),
+            'dicts': {table: sorted(names.items()) for table, names in self.dicts.items()},
+            'groups': self.groups,
+        }
+        data = zlib.compress(json.dumps(footer, separators=(',', ':')).encode())
+        self.file.write(data)
+        self.file.write(struct.pack('<Q', len(data)))
+        self.file.write(MAGIC)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        return footer
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+# ==================== LEITURA ====================
+
+class ArchiveReader:
+    """Arquivo de um dia mapeado em memória; colunas descompactadas sob demanda"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC or self.mm[-len(MAGIC):] != MAGIC:
+            raise ValueError(f"{os.path.basename(path)} não é um arquivo MEGA LOG")
+
+        end = len(self.mm) - len(MAGIC) - 8
+        footer_len = struct.unpack('<Q', self.mm[end:end + 8])[0]
+        footer = json.loads(zlib.decompress(self.mm[end - footer_len:end]))
+
+        self.day = date.fromisoformat(footer['day'])
+        self.rows = footer['rows']
+        self.max_id = footer['max_id']
+        self.groups = footer['groups']
+        self.min_ts = min((g['columns']['timestamp']['min'] for g in self.groups), default=None)
+        self.max_ts = max((g['columns']['timestamp']['max'] for g in self.groups), default=None)
+        self.dicts = {table: {int(id_): name for id_, name in pairs} for table, pairs in footer['dicts'].items()}
+
+    def column(self, group_index: int, name: str):
+        """Coluna de um grupo (int64)"""
+        group = self.groups[group_index]
+        meta = group['columns'][name]
+        block = self.mm[meta['offset']:meta['offset'] + meta['length']]
+        return _decode(block, meta, group['rows'])
+
+    def _groups_for(self, start_ts: int, end_ts: int, filters: Dict[str, int]) -> List[int]:
+        """Grupos cujo min/max pode conter linhas do filtro"""
+        selected = []
+        for index, group in enumerate(self.groups):
+            stats = group['columns']
+            if stats['timestamp']['max'] < start_ts or stats['timestamp']['min'] > end_ts:
+                continue
+            if all(stats[name]['min'] <= value <= stats[name]['max'] for name, value in filters.items()):
+                selected.append(index)
+        return selected
+
+    def _select(self, index: int, start_ts: int, end_ts: int, filters: Dict[str, int]):
+        """(timestamps do grupo, posições das linhas do filtro em ordem crescente)"""
+        timestamps = self.column(index, 'timestamp')
+        lo = int(np.searchsorted(timestamps, start_ts, 'left'))
+        hi = int(np.searchsorted(timestamps, end_ts, 'right'))
+        if lo >= hi or not filters:
+            return timestamps, np.arange(lo, max(lo, hi))
+
+        mask = None
+        for name, value in filters.items():
+            hits = self.column(index, name)[lo:hi] == value
+            mask = hits if mask is None else mask & hits
+        return timestamps, np.flatnonzero(mask) + lo
+
+    def _after_keys(self, index: int, timestamps, selected, start_ts: int, end_ts: int,
+                    after_id: Optional[int], before_id: Optional[int]):
+        """Nas linhas de horário start_ts/end_ts, só as de id maior que after_id/menor que before_id"""
+        stamps = timestamps[selected]
+        at_start = after_id is not None and stamps[0] == start_ts
+        at_end = before_id is not None and stamps[-1] == end_ts
+        if not (at_start or at_end):
+            return selected
+
+        ids = self.column(index, 'id')[selected]
+        keep = np.ones(len(selected), dtype=bool)
+        if at_start:
+            keep &= (stamps != start_ts) | (ids > after_id)
+        if at_end:
+            keep &= (stamps != end_ts) | (ids < before_id)
+        return selected[keep]
+
+    def scan(self, start_ts: int, end_ts: int, filters: Dict[str, int] = None,
+             columns: Tuple[str, ...] = COLUMNS, limit: int = None, newest_first: bool = True,
+             after_id: int = None, before_id: int = None) -> Dict[str, 'np.ndarray']:
+        """
+        Linhas com timestamp em [start_ts, end_ts] e colunas iguais a filters
+        ({coluna: valor}), da mais recente para a mais antiga (ou o contrário, com
+        newest_first=False), em ordem de (timestamp, id). Colunas NULL-áveis voltam
+        com 0 no lugar de NULL. Para de ler grupos ao atingir limit.
+        after_id/before_id: nas linhas de horário start_ts/end_ts, só ids maiores/menores
+        (continuação de uma página, models.LogSearch)
+        """
+        filters = filters or {}
+        parts = {name: [] for name in columns}
+        found = 0
+
+        groups = self._groups_for(start_ts, end_ts, filters)
+        for index in (reversed(groups) if newest_first else groups):
+            timestamps, selected = self._select(index, start_ts, end_ts, filters)
+            if len(selected) and (after_id is not None or before_id is not None):
+                selected = self._after_keys(index, timestamps, selected, start_ts, end_ts, after_id, before_id)
+            if not len(selected):
+                continue
+
+            if newest_first:
+                selected = selected[::-1]
+            for name in columns:
+                values = timestamps if name == 'timestamp' else self.column(index, name)
+                parts[name].append(values[selected])
+            found += len(selected)
+            if limit is not None and found >= limit:
+                break
+
+        return {name: (np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64))[:limit]
+                for name, arrays in parts.items()}
+
+    def count(self, start_ts: int, end_ts: int, filters: Dict[str, int] = None,
+              deadline: float = None) -> int:
+        """
+        Quantas linhas scan() traria sem limite (só lê as colunas dos filtros).
+        deadline (time.monotonic()): conferido entre grupos; passado o prazo, TimeoutError
+        """
+        filters = filters or {}
+        total = 0
+        for index in self._groups_for(start_ts, end_ts, filters):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("contagem interrompida pelo prazo")
+            total += len(self._select(index, start_ts, end_ts, filters)[1])
+        return total
+
+    def iter_groups(self, columns: Tuple[str, ...]) -> Iterator[Dict[str, 'np.ndarray']]:
+        """Todas as linhas, grupo a grupo"""
+        for index in range(len(self.groups)):
+            yield {name: self.column(index, name) for name in columns}
+
+    def close(self):
+        self.mm.close()
+
+# Leitores abertos (rodapé já lido), por caminho e mtime
+_readers: 'OrderedDict[str, Tuple[float, ArchiveReader]]' = OrderedDict()
+_readers_lock = threading.Lock()
+
+def open_archive(path: str) -> ArchiveReader:
+    """Leitor do arquivo (reaproveitado entre buscas enquanto o arquivo não mudar)"""
+    mtime = os.path.getmtime(path)
+    with _readers_lock:
+        cached = _readers.get(path)
+        if cached is not None and cached[0] == mtime:
+            _readers.move_to_end(path)
+            return cached[1]
+
+    reader = ArchiveReader(path)
+    with _readers_lock:
+        _readers[path] = (mtime, reader)
+        while len(_readers) > config.ARCHIVE_MAX_OPEN_READERS:
+            _readers.popitem(last=False)  # mmap fecha quando o último uso terminar
+    return reader
+
+def archived_max_id(db_path: str) -> int:
+    """Maior ID já arquivado do dia do DB (0 se o dia não tem arquivo)"""
+    path = archive_path_for_db(db_path)
+    if not os.path.exists(path):
+        return 0
+    return open_archive(path).max_id
+
+# ==================== ARQUIVAMENTO ====================
+
+def _verify(path: str, footer: Dict, checksums: Dict[str, int]):
+    """Relê todas as colunas do arquivo gravado e confere contagem e somas"""
+    reader = ArchiveReader(path)
+    try:
+        totals = dict.fromkeys(COLUMNS, 0)
+        count = 0
+        for group in reader.iter_groups(COLUMNS):
+            count += len(group['timestamp'])
+            for name in COLUMNS:
+                totals[name] += int(group[name].sum())
+        if count != footer['rows'] or totals != checksums:
+            raise RuntimeError("conteúdo relido difere do DB")
+    finally:
+        reader.close()
+
+def _remove_db(db_path: str):
+    for path in (database.get_sealed_marker_path(db_path), db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def archive_database(db_path: str, day: date) -> Optional[Dict]:
+    """
+    Converte o DB selado de um dia em arquivo colunar e remove o DB.
+    O arquivo só substitui o DB depois de relido e conferido, e o DB só sai
+    se continuar selado (sem linhas atrasadas gravadas durante a conversão).
+    Retorna None se o dia já tem arquivo e o DB só guarda linhas chegadas depois.
+    """
+    path = archive_path_for_db(db_path)
+    if os.path.exists(path):
+        # Queda entre gravar o arquivo e remover o DB: o DB só tem linhas já arquivadas?
+        conn = database.get_log_db_reader(db_path)
+        newest = conn.execute("SELECT MAX(id) FROM logs").fetchone()[0] or 0
+        conn.close()
+        if newest > open_archive(path).max_id:
+            return None  # Arquivo e DB são lidos juntos
+        _remove_db(db_path)
+        return {'rows': 0, 'size_before': 0, 'size_after': os.path.getsize(path), 'seconds': 0.0}
+
+    start = time.perf_counter()
+    size_before = os.path.getsize(db_path)
+    conn = database.get_db_connection(db_path)
+    if conn is None:
+        raise RuntimeError(f"falha ao abrir {db_path}")
+    conn.row_factory = None
+
+    writer = None
+    try:
+        conn.execute("BEGIN")  # Leitura de um snapshot só
+        writer = ArchiveWriter(path, day, {table: dict(names) for table, names in
+                                           database.load_dict_names(conn).items() if table in DICT_TABLES})
+        cursor = conn.execute(f"""
+            SELECT id, timestamp, interface_in_id, interface_out_id, IFNULL(state_id, 0), protocol_id,
+                   src_ip_priv, src_port_priv, dst_ip, dst_port, IFNULL(nat_ip_pub, 0), IFNULL(nat_port_pub, 0)
+            FROM logs ORDER BY timestamp, id
+        """)
+        while True:
+            rows = cursor.fetchmany(config.ARCHIVE_ROW_GROUP_ROWS)
+            if not rows:
+                break
+            matrix = np.array(rows, dtype=np.int64)
+            writer.write_group({name: np.ascontiguousarray(matrix[:, i]) for i, name in enumerate(COLUMNS)})
+        conn.rollback()
+
+        footer = writer.close()
+        _verify(writer.tmp_path, footer, writer.checksums)
+
+        # Troca com o lock de escrita: um lote atrasado espera e vai para um DB novo do dia
+        conn.execute("BEGIN IMMEDIATE")
+        if not database.is_sealed(db_path):
+            raise RuntimeError("DB recebeu linhas atrasadas durante o arquivamento")
+        os.replace(writer.tmp_path, path)
+        _remove_db(db_path)
+        conn.rollback()
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        conn.close()
+
+    return {'rows': footer['rows'], 'size_before': size_before, 'size_after': os.path.getsize(path),
+            'seconds': time.perf_counter() - start}
+
+def days_to_archive(after_days: int = None, now: float = None) -> List[Tuple[str, date]]:
+    """DBs (diários e shards) de dias com mais de after_days dias (mais antigos primeiro)"""
+    if after_days is None:
+        after_days = config.ARCHIVE_AFTER_DAYS
+    limit = date.fromtimestamp(now if now is not None else time.time()) - timedelta(days=after_days)
+
+    days = []
+    for name in sorted(os.listdir(config.COLD_STORAGE_DIR)):
+        parsed = database.parse_log_db_name(name)
+        if parsed is not None and parsed[0] < limit:
+            days.append((os.path.join(config.COLD_STORAGE_DIR, name), parsed[0]))
+    return days
+
+def archive_pending_days(after_days: int = None) -> int:
+    """Arquiva os dias antigos pendentes (selando antes os que faltarem). Retorna quantos"""
+    if not available():
+        print("⚠️ Arquivamento colunar requer NumPy (pip install numpy)")
+        return 0
+
+    from app import sealing
+
+    archived = 0
+    for db_path, day in days_to_archive(after_days):
+        name = os.path.basename(db_path)
+        try:
+            if not database.is_sealed(db_path):
+                sealing.seal_database(db_path)
+            result = archive_database(db_path, day)
+        except Exception as e:
+            print(f"❌ Erro ao arquivar {name}: {e}")
+            continue
+        if result is None:
+            continue
+
+        if os.path.exists(db_path):
+            catalog.refresh_file(db_path)  # Linhas atrasadas já abriram um DB novo do dia
+        else:
+            catalog.remove(db_path)
+        catalog.refresh_file(archive_path_for_db(db_path))
+        bloom.rebuild(archive_path_for_db(db_path))
+        archived += 1
+        print(f"🗜️ {name} arquivado em {result['seconds']:.1f}s ({result['rows']:,} linhas) - "
+              f"{result['size_before'] / (1024**2):.1f} MB → {result['size_after'] / (1024**2):.1f} MB")
+    return archived
+
+# ==================== CONSULTAS ====================
+
+def _db_columns(db_path: str, min_id: int, columns: Tuple[str, ...]) -> Optional[Dict[str, 'np.ndarray']]:
+    """Linhas do DB do dia com id > min_id (chegadas depois do arquivamento) como colunas"""
+    conn = database.get_log_db_reader(db_path)
+    if conn is None:
+        return None
+    try:
+        select = ', '.join(f"IFNULL({name}, 0)" if name in NULLABLE_COLUMNS else name for name in columns)
+        rows = conn.execute(f"SELECT {select} FROM logs WHERE id > ?", (min_id,)).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return None
+    matrix = np.array([tuple(row) for row in rows], dtype=np.int64)
+    return {name: matrix[:, i] for i, name in enumerate(columns)}
+
+def _add_counts(totals: Counter, values, names: Dict[int, str] = None):
+    keys, counts = np.unique(values, return_counts=True)
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        totals[names.get(key) if names is not None else key] += count
+
+def _is_public(ips):
+    """Máscara de IPs fora de 10/8, 172.16/12, 192.168/16, 127/8 e 0/8"""
+    first = ips >> 24
+    second = (ips >> 16) & 255
+    return ~((first == 10) | (first == 127) | (first == 0) |
+             ((first == 172) & (second >= 16) & (second <= 31)) |
+             ((first == 192) & (second == 168)))
+
+def _hour_counts(day: date, timestamps):
+    """Linhas por hora local do dia (limites de cada hora: horário de verão incluído)"""
+    midnight = datetime.combine(day, datetime.min.time())
+    hour_starts = np.array([(midnight + timedelta(hours=h)).timestamp() for h in range(24)])
+    hour = np.clip(np.searchsorted(hour_starts, timestamps, 'right') - 1, 0, 23)
+    return np.bincount(hour, minlength=24)
+
+def hourly_counts(reader: ArchiveReader) -> List[int]:
+    """Linhas por hora local gravadas no arquivo (catálogo, app/catalog.py)"""
+    hours = np.zeros(24, dtype=np.int64)
+    for part in reader.iter_groups(('timestamp',)):
+        hours += _hour_counts(reader.day, part['timestamp'])
+    return hours.tolist()
+
+def chart_counts(path: str) -> Dict[str, Counter]:
+    """
+    Contagens dos gráficos diários de um arquivo (e das linhas do DB chegadas depois):
+    protocolos e interfaces por nome, IPs NAT e de destino públicos (inteiros).
+    Somáveis com as de outros shards do dia (logs por hora: catálogo).
+    """
+    columns = ('interface_in_id', 'protocol_id', 'nat_ip_pub', 'dst_ip')
+    reader = open_archive(path)
+
+    parts = reader.iter_groups(columns)
+    db_path = os.path.splitext(path)[0] + '.db'
+    if os.path.exists(db_path):
+        late = _db_columns(db_path, reader.max_id, columns)
+        if late is not None:
+            parts = chain(parts, [late])
+
+    counts = {name: Counter() for name in ('protocols', 'interfaces', 'nat_ips', 'dst_ips')}
+    for part in parts:
+        _add_counts(counts['protocols'], part['protocol_id'], reader.dicts['d_protocols'])
+        _add_counts(counts['interfaces'], part['interface_in_id'], reader.dicts['d_interfaces'])
+        nat = part['nat_ip_pub']
+        _add_counts(counts['nat_ips'], nat[nat != 0])
+        dst = part['dst_ip']
+        _add_counts(counts['dst_ips'], dst[_is_public(dst)])
+    return counts
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Arquivamento colunar de dias antigos - MEGA LOG")
+    parser.add_argument('--days', type=int, default=None,
+                        help=f'Arquiva dias com mais de N dias (padrão: ARCHIVE_AFTER_DAYS={config.ARCHIVE_AFTER_DAYS})')
+    args = parser.parse_args()
+
+    after_days = args.days if args.days is not None else config.ARCHIVE_AFTER_DAYS
+    if not after_days:
+        parser.error("arquivamento desligado (ARCHIVE_AFTER_DAYS=0): informe --days")
+    count = archive_pending_days(after_days)
+    print(f"✅ {count} dia(s) arquivado(s)")
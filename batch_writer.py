@@ -0,0 +1,172 @@
+# app/batch_writer.py
+# Estágio de gravação do processador: thread dedicada que commita lotes no SQLite
+
+import time
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app import config, database, catalog, bloom
+
+class BatchWriter:
+    """
+    Grava lotes em uma thread própria (com conexões próprias aos DBs dos dias).
+
+    O processador entrega um lote e já começa a montar o próximo enquanto
+    este é commitado (double buffering). A fila de entrega é limitada: se o
+    SQLite não acompanhar, submit() bloqueia e o processador para de ler.
+    Os lotes são gravados estritamente em ordem; um lote que falha é
+    repetido até gravar, pois os offsets de entrada vão junto com ele.
+    Cada lote vai para o DB do seu dia: as conexões (com seus caches de
+    dicionário) ficam abertas em um LRU de até WRITER_MAX_OPEN_DBS dias.
+    As contagens dos lotes gravados vão para o catálogo (app/catalog.py) a
+    cada CATALOG_FLUSH_SEC, junto com os IPs novos para os filtros de Bloom
+    (app/bloom.py; o DB fica marcado como pendente antes do commit do lote).
+    """
+
+    def __init__(self, queue_depth: int = None):
+        self.queue = queue.Queue(maxsize=queue_depth or config.WRITER_QUEUE_DEPTH)
+        self.completed = queue.Queue()  # (posições, linhas inseridas) em ordem de commit
+        self.stats = {
+            'batches': 0,
+            'writer_busy_sec': 0.0,      # Writer gravando (executemany + commit + fsync)
+            'writer_idle_sec': 0.0,      # Writer esperando lote: gargalo é o parsing
+            'parser_blocked_sec': 0.0,   # Processador esperando vaga na fila: gargalo é o SQLite
+        }
+        self._closing = False
+        self._abandoned = 0
+        self._conns = OrderedDict()  # db_path -> (conexão, cache de dicionários), LRU
+        self._catalog = catalog.CatalogDeltas()
+        self._catalog_flushed = time.time()
+        self._written = set()  # DBs gravados (dirty no catálogo até o encerramento)
+        self._blooms = bloom.BloomUpdater()
+        self.thread = threading.Thread(target=self._run, name="megalog-writer", daemon=True)
+        self.thread.start()
+
+    # ---------- lado do processador ----------
+
+    def submit(self, db_path: str, batch: List[Tuple], positions: Dict[str, Tuple[int, int]],
+               chunks: List[Tuple[int, int]] = None):
+        """Entrega um lote para gravação (bloqueia se a fila estiver cheia)"""
+        start = time.perf_counter()
+        self.queue.put((db_path, batch, positions, chunks))
+        self.stats['parser_blocked_sec'] += time.perf_counter() - start
+
+    def collect(self) -> List[Tuple[Dict[str, Tuple[int, int]], int]]:
+        """Lotes já commitados desde a última chamada: [(posições, inseridas)]"""
+        done = []
+        while True:
+            try:
+                done.append(self.completed.get_nowait())
+            except queue.Empty:
+                return done
+
+    def pending(self) -> int:
+        """Lotes aguardando gravação"""
+        return self.queue.unfinished_tasks
+
+    def wait_idle(self):
+        """Bloqueia até todos os lotes entregues estarem gravados"""
+        start = time.perf_counter()
+        self.queue.join()
+        self.stats['parser_blocked_sec'] += time.perf_counter() - start
+
+    def close(self):
+        """Grava o que falta e encerra a thread"""
+        self._closing = True
+        self.queue.put(None)
+        self.thread.join()
+
+    # ---------- thread de gravação ----------
+
+    def _connect(self, db_path: str):
+        """Conexão ao DB do dia (do LRU ou nova, com schema e cache de dicionários)"""
+        if db_path in self._conns:
+            self._conns.move_to_end(db_path)
+            return self._conns[db_path]
+        
+        conn = database.get_db_connection(db_path)
+        if conn is None:
+            return None
+        database.create_log_schema(conn, db_path)  # Backlog pode trazer dias sem DB ainda
+        catalog.register(db_path)
+        self._written.add(db_path)
+        self._conns[db_path] = (conn, database.load_caches(conn))
+        
+        while len(self._conns) > config.WRITER_MAX_OPEN_DBS:
+            old_path, (old_conn, _) = self._conns.popitem(last=False)
+            old_conn.close()
+            self._blooms.forget(old_path)
+        return self._conns[db_path]
+
+    def _write(self, db_path: str, batch: List[Tuple], positions: Dict[str, Tuple[int, int]],
+               chunks: Optional[List[Tuple[int, int]]]) -> int:
+        """Grava um lote, repetindo até conseguir (ou até o encerramento)"""
+        while True:
+            opened = self._connect(db_path)
+            if opened is not None:
+                conn, caches = opened
+                if database.begin_log_write(conn, db_path):
+                    self._blooms.add(db_path, batch)
+                    inserted = database.insert_log_batch(conn, batch, positions, chunks, caches)
+                    if inserted:
+                        return inserted
+                # Próxima tentativa com conexão e cache novos
+                self._conns.pop(db_path, None)
+                conn.close()
+                self._blooms.forget(db_path)
+            if self._closing:
+                return 0
+            time.sleep(config.WRITER_RETRY_SEC)
+
+    def _run(self):
+        while True:
+            start = time.perf_counter()
+            try:
+                item = self.queue.get(timeout=config.CATALOG_FLUSH_SEC)
+            except queue.Empty:
+                item = False
+            self.stats['writer_idle_sec'] += time.perf_counter() - start
+
+            if time.time() - self._catalog_flushed >= config.CATALOG_FLUSH_SEC:
+                self._catalog.flush()
+                self._blooms.flush()
+                self._catalog_flushed = time.time()
+            if item is False:
+                continue
+
+            if item is None:
+                self.queue.task_done()
+                break
+
+            db_path, batch, positions, chunks = item
+            start = time.perf_counter()
+
+            if self._abandoned:
+                # Um lote anterior não foi gravado: gravar os seguintes pularia seus offsets
+                self._abandoned += len(batch)
+                inserted = 0
+            else:
+                inserted = self._write(db_path, batch, positions, chunks)
+                if not inserted:
+                    self._abandoned = len(batch)
+                else:
+                    self._catalog.add(db_path, batch)
+
+            self.stats['writer_busy_sec'] += time.perf_counter() - start
+            self.stats['batches'] += 1
+            self.completed.put((positions, inserted))
+            self.queue.task_done()
+
+        if self._abandoned:
+            print(f"⚠️ {self._abandoned:,} logs não gravados no encerramento "
+                  f"(serão relidos no próximo início)")
+        for conn, _ in self._conns.values():
+            conn.close()
+        self._conns.clear()
+        self._blooms.close()
+
+        # Contagens completas: os DBs saem do dirty (com lotes abandonados, o próximo
+        # início desfaz blocos já gravados e reconta esses DBs)
+        if self._catalog.flush() and not self._abandoned:
+            catalog.mark_clean(self._written)
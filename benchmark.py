@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+# benchmark.py
+# Benchmarks de desempenho do pipeline de ingestão
+
+import os
+import time
+import random
+import tempfile
+import argparse
+import multiprocessing
+from datetime import date, datetime, timedelta
+from app import config
+
+# ==================== UTILITÁRIOS ====================
+
+def read_udp_counters() -> dict:
+    """Lê contadores UDP do kernel (/proc/net/snmp)"""
+    try:
+        with open('/proc/net/snmp') as f:
+            lines = [line.split() for line in f if line.startswith('Udp:')]
+        header, values = lines[0][1:], lines[1][1:]
+        return dict(zip(header, (int(v) for v in values)))
+    except (OSError, IndexError):
+        return {}
+
+def count_lines(path: str) -> int:
+    """Conta linhas de um arquivo lendo em blocos grandes"""
+    if not os.path.exists(path):
+        return 0
+    total = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            total += chunk.count(b'\n')
+    return total
+
+def sample_log_lines(count: int = 1000) -> list:
+    """Gera linhas realistas no formato Mikrotik (mesmo gerador dos testes manuais)"""
+    from app.log_generator import LogGenerator
+    generator = LogGenerator()
+    lines = [generator.generate_log() for _ in range(count)]
+    generator.socket.close()
+    return lines
+
+# ==================== RECEPTOR UDP ====================
+
+def _udp_sender(port: int, rate: int, duration: float, payloads: list, result_queue):
+    """Processo emissor: envia `rate` datagramas/s em rajadas de 100"""
+    import socket
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+    target = ('127.0.0.1', port)
+
+    sent = 0
+    burst = 100
+    n_payloads = len(payloads)
+    start = time.perf_counter()
+
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            break
+
+        expected = int(elapsed * rate)
+        if sent >= expected:
+            time.sleep(0.0005)
+            continue
+
+        for _ in range(min(burst, expected - sent)):
+            try:
+                sock.sendto(payloads[sent % n_payloads], target)
+                sent += 1
+            except OSError:
+                break
+
+    result_queue.put(sent)
+
+def _legacy_receiver(port: int, output_file: str):
+    """Processo receptor no modo antigo"""
+    from app import log_receiver
+    receiver = log_receiver.SyslogReceiver(host='127.0.0.1', port=port)
+    receiver.output_file = output_file
+    receiver.start()
+
+def bench_receiver(args):
+    """Mede pacotes/s sustentados pelo receptor antes do kernel descartar datagramas"""
+    from app import log_receiver
+
+    payloads = [line.encode('utf-8') for line in sample_log_lines()]
+    tmp_dir = tempfile.mkdtemp(prefix='megalog-bench-')
+    output_file = os.path.join(tmp_dir, 'hot_logs.raw')
+
+    # Sobe os receptores
+    receivers = []
+    if args.mode == 'legacy':
+        proc = multiprocessing.Process(target=_legacy_receiver, args=(args.port, output_file), daemon=True)
+        proc.start()
+        receivers.append(proc)
+    else:
+        for worker_id in range(args.workers):
+            proc = multiprocessing.Process(
+                target=log_receiver._run_worker,
+                args=(worker_id, '127.0.0.1', args.port, output_file),
+                daemon=True
+            )
+            proc.start()
+            receivers.append(proc)
+    time.sleep(1.0)
+
+    print(f"\n🏁 Benchmark do receptor ({args.mode}, workers={args.workers if args.mode != 'legacy' else 1})")
+    print(f"   {'Taxa alvo':>12} {'Enviados':>12} {'Gravados':>12} {'Descartes':>10} {'pps real':>12}")
+
+    best_rate = 0
+    rate = args.start_rate
+
+    while rate <= args.max_rate:
+        before_lines = count_lines(output_file)
+        before_udp = read_udp_counters()
+
+        result_queue = multiprocessing.Queue()
+        per_sender = rate // args.senders
+        senders = [
+            multiprocessing.Process(target=_udp_sender,
+                                    args=(args.port, per_sender, args.duration, payloads, result_queue))
+            for _ in range(args.senders)
+        ]
+        for proc in senders:
+            proc.start()
+        sent = sum(result_queue.get() for _ in senders)
+        for proc in senders:
+            proc.join()
+
+        # Aguarda os workers drenarem o que restou nos sockets
+        time.sleep(1.5)
+
+        after_udp = read_udp_counters()
+        written = count_lines(output_file) - before_lines
+        drops = after_udp.get('RcvbufErrors', 0) - before_udp.get('RcvbufErrors', 0)
+        achieved = sent / args.duration
+
+        print(f"   {rate:>12,} {sent:>12,} {written:>12,} {drops:>10,} {achieved:>12,.0f}")
+
+        if drops > 0 or written < sent * 0.999:
+            break
+        if achieved < rate * 0.9:
+            print("   ⚠️ Emissores não alcançaram a taxa alvo (aumente --senders)")
+            best_rate = max(best_rate, int(achieved))
+            break
+
+        best_rate = int(achieved)
+        rate *= 2
+
+    for proc in receivers:
+        proc.terminate()
+    for proc in receivers:
+        proc.join(timeout=5)
+
+    print(f"\n✅ Taxa sustentada sem descartes no kernel: ~{best_rate:,} pacotes/s")
+
+    try:
+        os.remove(output_file)
+        os.rmdir(tmp_dir)
+    except OSError:
+        pass
+
+# ==================== PARSER ====================
+
+def _time_per_line(func, lines: list, rounds: int) -> float:
+    """Melhor tempo (ns/linha) entre `rounds` passadas sobre as linhas"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for line in lines:
+            func(line)
+        best = min(best, (time.perf_counter_ns() - start) / len(lines))
+    return best
+
+def bench_tokenizer(args):
+    """Compara ns/linha do tokenizador com as regex originais"""
+    import re
+    from app import database
+
+    nat_lines = sample_log_lines(args.lines)
+    no_nat_lines = [line.split(', NAT (')[0] for line in nat_lines]
+    categories = [
+        ('Com NAT', nat_lines),
+        ('Sem NAT', no_nat_lines),
+        ('Sem portas (ICMP)', [re.sub(r':\d+', '', line) for line in no_nat_lines]),
+    ]
+
+    print(f"\n🏁 Parser de linhas ({args.lines:,} linhas por tipo, melhor de {args.rounds})")
+    print(f"   {'Tipo':<20} {'Regex (ns)':>12} {'Tokenizador (ns)':>18} {'Ganho':>8}")
+
+    for name, lines in categories:
+        mismatches = sum(1 for line in lines if database.parse_log_line(line) != database.parse_log_line_regex(line))
+        if mismatches:
+            print(f"❌ {mismatches} divergências em '{name}': benchmark abortado")
+            return
+
+        regex_ns = _time_per_line(database.parse_log_line_regex, lines, args.rounds)
+        parse_ns = _time_per_line(database.parse_log_line, lines, args.rounds)
+        print(f"   {name:<20} {regex_ns:>12,.0f} {parse_ns:>18,.0f} {regex_ns / parse_ns:>7.1f}x")
+
+def _syslog_timestamps(count: int, start: float, lines_per_sec: float, jitter_sec: int) -> list:
+    """Strings "Dec  2 14:23:45" como chegam do firewall: muitas linhas por segundo, fora de ordem"""
+    rng = random.Random(42)
+    result = []
+    for i in range(count):
+        moment = datetime.fromtimestamp(start + i / lines_per_sec - rng.randint(0, jitter_sec))
+        result.append(f"{moment:%b} {moment.day:>2} {moment:%H:%M:%S}")
+    return result
+
+def bench_timestamps(args):
+    """Compara ns/linha do cache de timestamps com o strptime original"""
+    from app import timestamps
+
+    start = time.time() - 86400
+    scenarios = [
+        ('Tempo real', _syslog_timestamps(args.lines, start, args.rate, 2)),
+        ('Catch-up (1 dia)', _syslog_timestamps(args.lines, start, args.lines / 86400, 0)),
+    ]
+
+    print(f"\n🏁 Conversão de timestamps ({args.lines:,} linhas, {args.rate:,} linhas/s, melhor de {args.rounds})")
+    print(f"   {'Cenário':<20} {'strptime (ns)':>14} {'Cache (ns)':>12} {'Ganho':>8}")
+
+    for name, lines in scenarios:
+        timestamps.clear_cache()
+        if [timestamps.parse_syslog_timestamp(s) for s in lines] != \
+                [timestamps.strptime_timestamp(s) for s in lines]:
+            print(f"❌ Divergências em '{name}': benchmark abortado")
+            return
+
+        strptime_ns = _time_per_line(timestamps.strptime_timestamp, lines, args.rounds)
+        cached_ns = float('inf')
+        for _ in range(args.rounds):
+            timestamps.clear_cache()  # Cada rodada começa fria
+            cached_ns = min(cached_ns, _time_per_line(timestamps.parse_syslog_timestamp, lines, 1))
+        print(f"   {name:<20} {strptime_ns:>14,.0f} {cached_ns:>12,.0f} {strptime_ns / cached_ns:>7.1f}x")
+
+def bench_ipv4(args):
+    """Compara ns/campo da conversão de IPs: ipaddress x rápida x por coluna"""
+    from app import ipv4
+
+    rng = random.Random(42)
+    hot = [f"100.64.{rng.randint(0, 63)}.{rng.randint(1, 254)}" for _ in range(args.distinct)]
+    ips = [rng.choice(hot) for _ in range(args.lines)]
+    ints = [ipv4.ip_to_int(ip) for ip in ips]
+
+    print(f"\n🏁 Conversão de IPv4 ({args.lines:,} campos, {args.distinct:,} IPs distintos, melhor de {args.rounds})")
+    print(f"   {'Direção':<16} {'ipaddress (ns)':>15} {'Unitária (ns)':>14} {'Coluna (ns)':>12}")
+
+    for name, values, slow, fast, column in (
+            ('string -> int', ips, ipv4._ip_to_int_slow, ipv4.ip_to_int, ipv4.ips_to_ints),
+            ('int -> string', ints, ipv4._int_to_ip_slow, ipv4.int_to_ip, ipv4.ints_to_ips)):
+        slow_ns = _time_per_line(slow, values, args.rounds)
+        fast_ns = _time_per_line(fast, values, args.rounds)
+        column_ns = float('inf')
+        for _ in range(args.rounds):
+            start = time.perf_counter_ns()
+            column(values)
+            column_ns = min(column_ns, (time.perf_counter_ns() - start) / len(values))
+        print(f"   {name:<16} {slow_ns:>15,.0f} {fast_ns:>14,.0f} {column_ns:>12,.0f}")
+
+def bench_noise(args):
+    """Compara ns/linha do filtro de ruído: loop de substrings x regex compilada"""
+    from app import database
+    from app.noise_filter import NoiseFilter
+
+    lines = sample_log_lines(args.lines)
+    rng = random.Random(42)
+
+    print(f"\n🏁 Filtro de ruído ({args.lines:,} linhas, melhor de {args.rounds})")
+    print(f"   {'Regras':>8} {'Loop (ns)':>12} {'Compilado (ns)':>15} {'Descartadas':>12}")
+
+    for count in args.rules:
+        filters = list(config.NOISE_FILTERS)
+        while len(filters) < count:
+            filters.append(f"->{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}."
+                           f"{rng.randint(1, 254)}:{rng.choice([53, 123, 161, 514])}")
+        # Uma regra do meio da lista casa com o destino da primeira linha (ruído real)
+        first = database.parse_log_line(lines[0])
+        filters[len(filters) // 2] = f"->{first['dst_ip']}:{first['dst_port']}"
+
+        def loop(line, filters=filters):
+            for noise_filter in filters:
+                if noise_filter in line:
+                    return True
+            return False
+
+        compiled = NoiseFilter(filters)
+        expected = [loop(line) for line in lines]
+        if [compiled.match_line(line) is not None for line in lines] != expected:
+            print(f"❌ Divergência com {count} regras: benchmark abortado")
+            return
+
+        loop_ns = _time_per_line(loop, lines, args.rounds)
+        compiled_ns = _time_per_line(compiled.match_line, lines, args.rounds)
+        print(f"   {count:>8,} {loop_ns:>12,.0f} {compiled_ns:>15,.0f} {sum(expected):>12,}")
+
+def _normalized_rows(count: int, day_start: float) -> list:
+    """Linhas normalizadas (parse + normalize reais) espalhadas ao longo de um dia"""
+    from app import database
+
+    rows = []
+    for line in sample_log_lines(min(count, 20000)):
+        parsed = database.parse_log_line(line)
+        row = database.normalize_log(parsed) if parsed else None
+        if row:
+            rows.append(row)
+
+    step = 86400 / count
+    return [(int(day_start + i * step),) + rows[i % len(rows)][1:] for i in range(count)]
+
+def _insert_rate(db_path: str, rows: list, all_indexes: bool) -> float:
+    """Linhas/s inseridas em lotes de BATCH_SIZE (mesmo caminho do writer)"""
+    from app import database
+
+    conn = database.get_db_connection(db_path)
+    database.create_log_schema(conn)
+    if all_indexes:
+        database.create_log_indexes(conn)
+    caches = database.load_caches(conn)
+
+    start = time.perf_counter()
+    for i in range(0, len(rows), config.BATCH_SIZE):
+        database.begin_log_write(conn, db_path)
+        database.insert_log_batch(conn, rows[i:i + config.BATCH_SIZE], caches=caches)
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return len(rows) / elapsed
+
+def _search_ms(db_path: str, sql: str, params: list) -> float:
+    """Média em ms de uma consulta (conexão de leitura nova por busca, como na interface web)"""
+    from app import database
+
+    start = time.perf_counter()
+    for values in params:
+        conn = database.get_log_db_reader(db_path)
+        conn.execute(sql, values).fetchall()
+        conn.close()
+    return (time.perf_counter() - start) * 1000 / len(params)
+
+def bench_sealing(args):
+    """Inserção com índices completos x dia ativo, e busca antes/depois da selagem"""
+    from app import database, sealing
+
+    day_start = datetime(2024, 3, 10).timestamp()
+    day_end = day_start + 86400
+    rows = _normalized_rows(args.rows, day_start)
+    probes = random.Random(42).sample(rows, args.queries)
+
+    tmpdir = tempfile.mkdtemp(prefix='megalog-bench-')
+    full_path = os.path.join(tmpdir, 'completo.db')
+    active_path = os.path.join(tmpdir, 'ativo.db')
+
+    print(f"\n🏁 Inserção ({args.rows:,} linhas, lotes de {config.BATCH_SIZE})")
+    full_rate = _insert_rate(full_path, rows, all_indexes=True)
+    active_rate = _insert_rate(active_path, rows, all_indexes=False)
+    print(f"   {'Índices completos (' + str(len(database.LOG_INDEXES)) + ')':<28} {full_rate:>12,.0f} linhas/s")
+    print(f"   {'Dia ativo (' + str(len(config.ACTIVE_DAY_INDEXES)) + ')':<28} {active_rate:>12,.0f} linhas/s"
+          f"  ({active_rate / full_rate:.1f}x)")
+
+    select = "SELECT * FROM logs WHERE timestamp BETWEEN ? AND ? AND {} ORDER BY timestamp DESC"
+    queries = [
+        ('IP+porta pública (dia)', select.format("nat_ip_pub = ? AND nat_port_pub = ?"),
+         [(day_start, day_end, r[9], r[10]) for r in probes]),
+        ('IP privado (1h)', select.format("src_ip_priv = ?"),
+         [(r[0] - 1800, r[0] + 1800, r[5]) for r in probes]),
+        ('IP+porta destino (dia)', select.format("dst_ip = ? AND dst_port = ?"),
+         [(day_start, day_end, r[7], r[8]) for r in probes]),
+        ('Intervalo de 5 min', select.format("1"),
+         [(r[0], r[0] + 300) for r in probes]),
+    ]
+    before = {name: (_search_ms(full_path, sql, params), _search_ms(active_path, sql, params))
+              for name, sql, params in queries}
+
+    result = sealing.seal_database(active_path)
+    print(f"\n🔒 Selagem: índices {result['indexes_sec']:.1f}s, ANALYZE {result['analyze_sec']:.1f}s, "
+          f"VACUUM {result['vacuum_sec']:.1f}s - {result['size_before'] / (1024**2):.1f} MB → "
+          f"{result['size_after'] / (1024**2):.1f} MB")
+
+    print(f"\n🏁 Busca (ms, média de {args.queries} consultas)")
+    print(f"   {'Consulta':<24} {'Completo':>10} {'Dia ativo':>10} {'Selado':>10}")
+    for name, sql, params in queries:
+        full_ms, active_ms = before[name]
+        sealed_ms = _search_ms(active_path, sql, params)
+        print(f"   {name:<24} {full_ms:>10.2f} {active_ms:>10.2f} {sealed_ms:>10.2f}")
+
+    for name in os.listdir(tmpdir):
+        os.remove(os.path.join(tmpdir, name))
+    os.rmdir(tmpdir)
+
+# Agregados da API de gráficos diários (routes.api_daily_charts)
+CHART_QUERIES = [
+    "SELECT protocol_id, COUNT(*) AS n FROM logs GROUP BY protocol_id ORDER BY n DESC LIMIT 10",
+    "SELECT interface_in_id, COUNT(*) AS n FROM logs GROUP BY interface_in_id ORDER BY n DESC LIMIT 10",
+    "SELECT nat_ip_pub, COUNT(*) AS n FROM logs WHERE nat_ip_pub IS NOT NULL GROUP BY nat_ip_pub ORDER BY n DESC LIMIT 10",
+    """SELECT dst_ip, COUNT(*) AS n FROM logs
+       WHERE NOT ((dst_ip >> 24) & 255 IN (0, 10, 127))
+         AND NOT ((dst_ip >> 24) & 255 = 172 AND ((dst_ip >> 16) & 255) BETWEEN 16 AND 31)
+         AND NOT ((dst_ip >> 24) & 255 = 192 AND ((dst_ip >> 16) & 255) = 168)
+       GROUP BY dst_ip ORDER BY n DESC LIMIT 10""",
+]
+
+def bench_archive(args):
+    """Bytes/linha e tempo de busca/gráficos: dia selado em SQLite x arquivo colunar"""
+    from app import archive, database, sealing
+
+    if not archive.available():
+        print("⚠️ Arquivo colunar requer NumPy (pip install numpy)")
+        return
+
+    day = date(2024, 3, 10)
+    day_start = datetime.combine(day, datetime.min.time()).timestamp()
+    day_end = day_start + 86400
+    # Portas de origem e NAT aleatórias: a amostra se repete a cada 20 mil linhas
+    rng = random.Random(42)
+    rows = [row[:6] + (rng.randint(1024, 65535),) + row[7:10] + (rng.randint(1024, 65535) if row[10] else None,)
+            for row in _normalized_rows(args.rows, day_start)]
+    probes = [row for row in rng.sample(rows, args.queries * 3) if row[9]][:args.queries]
+
+    queries = [
+        ('IP+porta pública (dia)', [(day_start, day_end, {'nat_ip_pub': r[9], 'nat_port_pub': r[10]}) for r in probes]),
+        ('IP privado (1h)', [(r[0] - 1800, r[0] + 1800, {'src_ip_priv': r[5]}) for r in probes]),
+        ('IP+porta destino (dia)', [(day_start, day_end, {'dst_ip': r[7], 'dst_port': r[8]}) for r in probes]),
+        ('Intervalo de 5 min', [(r[0], r[0] + 300, {}) for r in probes]),
+    ]
+
+    tmpdir = tempfile.mkdtemp(prefix='megalog-bench-')
+    cold_dir = config.COLD_STORAGE_DIR
+    config.COLD_STORAGE_DIR = tmpdir
+    try:
+        db_path = database.get_log_db_path(day)
+        _insert_rate(db_path, rows, all_indexes=False)
+        sealing.seal_database(db_path)
+        db_bytes = sealing.db_size(db_path)
+
+        sql_ms = {}
+        for name, params in queries:
+            sql_ms[name] = sum(
+                _search_ms(db_path, "SELECT * FROM logs WHERE timestamp BETWEEN ? AND ?" +
+                           "".join(f" AND {column} = ?" for column in filters) + " ORDER BY timestamp DESC",
+                           [(start, end, *filters.values())])
+                for start, end, filters in params) / len(params)
+
+        start = time.perf_counter()
+        conn = database.get_log_db_reader(db_path)
+        for sql in CHART_QUERIES:
+            conn.execute(sql).fetchall()
+        conn.close()
+        sql_charts_ms = (time.perf_counter() - start) * 1000
+
+        result = archive.archive_database(db_path, day)
+        path = archive.archive_path_for_db(db_path)
+
+        print(f"\n🗜️ Arquivamento ({args.rows:,} linhas): {result['seconds']:.1f}s")
+        print(f"   {'SQLite selado':<24} {db_bytes / (1024**2):>10.1f} MB {db_bytes / args.rows:>8.1f} bytes/linha")
+        print(f"   {'Arquivo colunar':<24} {result['size_after'] / (1024**2):>10.1f} MB "
+              f"{result['size_after'] / args.rows:>8.1f} bytes/linha  ({db_bytes / result['size_after']:.1f}x menor)")
+
+        print(f"\n🏁 Busca (ms, média de {len(probes)} consultas)")
+        print(f"   {'Consulta':<24} {'SQLite':>10} {'Arquivo':>10}")
+        for name, params in queries:
+            start = time.perf_counter()
+            for start_ts, end_ts, filters in params:
+                archive.open_archive(path).scan(start_ts, end_ts, filters)
+            archive_ms = (time.perf_counter() - start) * 1000 / len(params)
+            print(f"   {name:<24} {sql_ms[name]:>10.2f} {archive_ms:>10.2f}")
+
+        start = time.perf_counter()
+        archive.chart_counts(path)
+        archive_charts_ms = (time.perf_counter() - start) * 1000
+        print(f"   {'Gráficos do dia':<24} {sql_charts_ms:>10.2f} {archive_charts_ms:>10.2f}")
+    finally:
+        config.COLD_STORAGE_DIR = cold_dir
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+def bench_bloom(args):
+    """Busca de um IP privado em N dias selados: com e sem filtros de Bloom"""
+    from app import bloom, catalog, database, sealing
+    from app.models import LogSearch
+
+    tmpdir = tempfile.mkdtemp(prefix='megalog-bench-')
+    saved = (config.COLD_STORAGE_DIR, config.CATALOG_DB_PATH, config.BLOOM_COLUMNS)
+    config.COLD_STORAGE_DIR = tmpdir
+    config.CATALOG_DB_PATH = os.path.join(tmpdir, 'catalog.db')
+    try:
+        # Cada dia tem sua faixa de assinantes (metade repetida do dia anterior)
+        rng = random.Random(42)
+        template = _normalized_rows(args.rows, 0)
+        first_ip = database.convert_ip_to_int('100.64.0.0')
+        first_day = date(2024, 3, 1)
+        probes = []
+        for i in range(args.days):
+            day = first_day + timedelta(days=i)
+            day_start = datetime.combine(day, datetime.min.time()).timestamp()
+            base = first_ip + i * args.subscribers // 2
+            rows = [(row[0] + int(day_start),) + row[1:5] + (base + rng.randrange(args.subscribers),) + row[6:]
+                    for row in template]
+            db_path = database.get_log_db_path(day)
+            _insert_rate(db_path, rows, all_indexes=False)
+            sealing.seal_database(db_path)
+            probes.append(rows[rng.randrange(len(rows))][5])
+        catalog.sync()
+        for name in os.listdir(tmpdir):
+            if name.endswith('.db') and name != 'catalog.db':
+                bloom.rebuild(os.path.join(tmpdir, name))
+        probes = rng.sample(probes, min(args.queries, len(probes)))
+
+        start_dt = datetime.combine(first_day, datetime.min.time())
+        end_dt = start_dt + timedelta(days=args.days)
+        files = LogSearch.get_db_files_in_range(start_dt, end_dt)
+
+        print(f"\n🏁 Busca por IP privado em {args.days} dias selados ({args.rows:,} linhas/dia, "
+              f"média de {len(probes)} consultas)")
+        print(f"   {'Modo':<24} {'ms':>10} {'DBs abertos':>12}")
+        for label, columns in (('Sem filtros', ()), ('Filtros de Bloom', saved[2] or ('src_ip_priv',))):
+            config.BLOOM_COLUMNS = columns
+            opened = 0
+            start = time.perf_counter()
+            for ip in probes:
+                opened += len(bloom.candidate_files(files, {'src_ip_priv': ip}))
+                LogSearch.search(start_dt, end_dt, ip_privado=database.convert_int_to_ip(ip))
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(probes)
+            print(f"   {label:<24} {elapsed_ms:>10.2f} {opened / len(probes):>12.1f}")
+    finally:
+        config.COLD_STORAGE_DIR, config.CATALOG_DB_PATH, config.BLOOM_COLUMNS = saved
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+# ==================== MAIN ====================
+
+def main():
+    """Ponto de entrada"""
+    parser = argparse.ArgumentParser(description="Benchmarks - MEGA LOG")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p_recv = subparsers.add_parser('receiver', help='Pacotes/s sustentados pelo receptor UDP')
+    p_recv.add_argument('--mode', choices=['batched', 'legacy'], default='batched')
+    p_recv.add_argument('--workers', type=int, default=config.RECEIVER_WORKERS)
+    p_recv.add_argument('--port', type=int, default=15514)
+    p_recv.add_argument('--senders', type=int, default=4)
+    p_recv.add_argument('--duration', type=float, default=5.0)
+    p_recv.add_argument('--start-rate', type=int, default=10000)
+    p_recv.add_argument('--max-rate', type=int, default=1280000)
+    p_recv.set_defaults(func=bench_receiver)
+
+    p_tok = subparsers.add_parser('tokenizer', help='ns/linha do parser: tokenizador x regex')
+    p_tok.add_argument('--lines', type=int, default=10000)
+    p_tok.add_argument('--rounds', type=int, default=3)
+    p_tok.set_defaults(func=bench_tokenizer)
+
+    p_ts = subparsers.add_parser('timestamps', help='ns/linha da conversão de timestamps: cache x strptime')
+    p_ts.add_argument('--lines', type=int, default=100000)
+    p_ts.add_argument('--rate', type=int, default=2000, help='Linhas por segundo no cenário em tempo real')
+    p_ts.add_argument('--rounds', type=int, default=3)
+    p_ts.set_defaults(func=bench_timestamps)
+
+    p_ip = subparsers.add_parser('ipv4', help='ns/campo da conversão de IPs: ipaddress x cache x coluna')
+    p_ip.add_argument('--lines', type=int, default=100000)
+    p_ip.add_argument('--distinct', type=int, default=5000, help='IPs distintos na amostra')
+    p_ip.add_argument('--rounds', type=int, default=3)
+    p_ip.set_defaults(func=bench_ipv4)
+
+    p_noise = subparsers.add_parser('noise', help='ns/linha do filtro de ruído por quantidade de regras')
+    p_noise.add_argument('--lines', type=int, default=10000)
+    p_noise.add_argument('--rules', type=int, nargs='+', default=[2, 50, 500, 5000])
+    p_noise.add_argument('--rounds', type=int, default=3)
+    p_noise.set_defaults(func=bench_noise)
+
+    p_seal = subparsers.add_parser('sealing', help='Inserção (dia ativo x índices completos) e busca antes/depois da selagem')
+    p_seal.add_argument('--rows', type=int, default=300000)
+    p_seal.add_argument('--queries', type=int, default=20)
+    p_seal.set_defaults(func=bench_sealing)
+
+    p_arch = subparsers.add_parser('archive', help='Bytes/linha e busca: dia selado em SQLite x arquivo colunar')
+    p_arch.add_argument('--rows', type=int, default=300000)
+    p_arch.add_argument('--queries', type=int, default=20)
+    p_arch.set_defaults(func=bench_archive)
+
+    p_bloom = subparsers.add_parser('bloom', help='Busca de um IP em N dias selados: com e sem filtros de Bloom')
+    p_bloom.add_argument('--days', type=int, default=30)
+    p_bloom.add_argument('--rows', type=int, default=50000)
+    p_bloom.add_argument('--subscribers', type=int, default=5000)
+    p_bloom.add_argument('--queries', type=int, default=20)
+    p_bloom.set_defaults(func=bench_bloom)
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"  {config.SYSTEM_NAME} - Benchmarks")
+    print("=" * 60)
+
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+# app/bloom.py
+# Filtros de Bloom por arquivo (DB de dia/shard ou arquivo colunar) e por coluna de IP
+#
+# Uma busca por IP privado ou público em 30 dias abriria os 30 DBs; com os filtros,
+# só os arquivos que podem ter o IP (falso positivo em ~BLOOM_FALSE_POSITIVE_RATE
+# dos demais). Os filtros ficam no catálogo (tabela blooms de app/catalog.py):
+#
+# - Arquivos em gravação: o writer e o importador juntam em memória os IPs novos de
+#   cada lote e os gravam no filtro a cada CATALOG_FLUSH_SEC (e ao fechar o DB).
+#   Antes do commit de um lote com IPs ainda fora do filtro, o arquivo é marcado em
+#   bloom_pending (com o lock de escrita do DB) e a busca o abre sempre até a
+#   gravação. Um IP nunca está no DB sem estar no filtro ou com o arquivo marcado,
+#   então a busca pode pular arquivos com segurança.
+# - Dia selado/arquivado: o filtro é refeito com os IPs distintos, no tamanho exato.
+# - Arquivo sem filtro (anterior aos filtros): sempre aberto.
+
+import os
+import math
+import socket
+import sqlite3
+from typing import Dict, List, Optional, Set, Tuple
+from app import config, database, catalog
+
+# Posição das colunas na linha normalizada (database.normalize_log)
+ROW_INDEX = {'src_ip_priv': 5, 'dst_ip': 7, 'nat_ip_pub': 9}
+
+_MASK64 = (1 << 64) - 1
+
+def _hash(value: int) -> Tuple[int, int]:
+    """Dois hashes de 32 bits do valor (splitmix64)"""
+    h = (value + 0x9E3779B97F4A7C15) & _MASK64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    h ^= h >> 31
+    return h & 0xFFFFFFFF, (h >> 32) | 1
+
+class BloomFilter:
+    """Filtro de Bloom de inteiros: m bits, k posições por valor (hash duplo)"""
+
+    def __init__(self, bits: bytearray, hashes: int):
+        self.bits = bits
+        self.size = len(bits) * 8
+        self.hashes = hashes
+
+    @classmethod
+    def for_capacity(cls, capacity: int, fp_rate: float = None) -> 'BloomFilter':
+        """Filtro vazio dimensionado para capacity valores distintos"""
+        fp_rate = fp_rate or config.BLOOM_FALSE_POSITIVE_RATE
+        capacity = max(capacity, 1024)
+        size = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        hashes = min(16, max(1, round(size / capacity * math.log(2))))
+        return cls(bytearray((size + 7) // 8), hashes)
+
+    def _positions(self, value: int):
+        h1, h2 = _hash(value)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value: int):
+        bits = self.bits
+        for pos in self._positions(value):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: int) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+# ==================== CATÁLOGO ====================
+
+def _load(conn: sqlite3.Connection, name: str, column: str) -> Tuple[Optional[BloomFilter], int]:
+    """(filtro, IPs distintos gravados) do arquivo; (None, 0) se não tiver"""
+    row = conn.execute("SELECT hashes, bits, items FROM blooms WHERE name = ? AND column = ?",
+                       (name, column)).fetchone()
+    if row is None:
+        return None, 0
+    return BloomFilter(bytearray(row['bits']), row['hashes']), row['items']
+
+def _store(conn: sqlite3.Connection, name: str, column: str, bloom: BloomFilter, items: int):
+    conn.execute("""
+        INSERT INTO blooms (name, column, hashes, bits, items) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name, column) DO UPDATE SET
+            hashes = excluded.hashes, bits = excluded.bits, items = excluded.items
+    """, (name, column, bloom.hashes, bytes(bloom.bits), items))
+
+def drop(path: str):
+    """Descarta os filtros do arquivo (a busca volta a abri-lo sempre, até rebuild)"""
+    conn = catalog.get_catalog_connection()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.execute("DELETE FROM blooms WHERE name = ?", (os.path.basename(path),))
+            conn.execute("INSERT OR IGNORE INTO bloom_pending (name, owner) VALUES (?, '*')",
+                         (os.path.basename(path),))
+    except Exception as e:
+        print(f"⚠️ Erro ao descartar filtros de {os.path.basename(path)}: {e}")
+    finally:
+        conn.close()
+
+class BloomUpdater:
+    """
+    Filtros dos DBs em gravação: add() junta em memória os IPs ainda não vistos de
+    um lote e marca o arquivo em bloom_pending; flush() grava os IPs no filtro e tira
+    a marca. Chamar add() com a transação de escrita do DB aberta
+    (database.begin_log_write), antes de inserir o lote: a selagem refaz o filtro e
+    limpa as marcas com esse mesmo lock.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.known: Dict[str, Dict[str, Set[int]]] = {}      # caminho -> {coluna: IPs já vistos}
+        self.unflushed: Dict[str, Dict[str, Set[int]]] = {}  # caminho -> {coluna: IPs fora do filtro}
+        self._conn = None
+
+    def _catalog(self) -> sqlite3.Connection:
+        """Conexão própria com o catálogo (aberta no primeiro uso)"""
+        if self._conn is None:
+            self._conn = catalog.get_catalog_connection()
+            if self._conn is None:
+                raise RuntimeError("catálogo indisponível")
+        return self._conn
+
+    def _reset_catalog(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def add(self, db_path: str, rows: List[Tuple]):
+        if not config.BLOOM_COLUMNS or catalog.parse_file_name(os.path.basename(db_path)) is None:
+            return
+        known = self.known.setdefault(db_path, {column: set() for column in config.BLOOM_COLUMNS})
+
+        new = {}
+        for column, seen in known.items():
+            index = ROW_INDEX[column]
+            values = {row[index] for row in rows if row[index] is not None} - seen
+            if values:
+                new[column] = values
+        if not new:
+            return
+
+        # A marca é conferida a cada lote: a selagem pode tê-la limpado
+        name = os.path.basename(db_path)
+        try:
+            conn = self._catalog()
+            marked = conn.execute("SELECT 1 FROM bloom_pending WHERE name = ? AND owner = ?",
+                                  (name, self.owner)).fetchone()
+            if marked is None:
+                with conn:
+                    conn.execute("INSERT OR IGNORE INTO bloom_pending (name, owner) VALUES (?, ?)",
+                                 (name, self.owner))
+        except Exception as e:
+            # Sem a marca, nenhum filtro do arquivo vale
+            print(f"⚠️ Erro ao atualizar filtros de {name}: {e}")
+            self._reset_catalog()
+            self.known.pop(db_path, None)
+            self.unflushed.pop(db_path, None)
+            drop(db_path)
+            return
+
+        unflushed = self.unflushed.setdefault(db_path, {})
+        for column, values in new.items():
+            known[column] |= values
+            unflushed.setdefault(column, set()).update(values)
+
+    def flush(self, db_path: str = None):
+        """Grava no filtro os IPs em memória (de um DB ou de todos) e tira as marcas"""
+        for path in [db_path] if db_path else list(self.unflushed):
+            new = self.unflushed.get(path)
+            if not new:
+                continue
+            name = os.path.basename(path)
+            try:
+                conn = self._catalog()
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for column, values in new.items():
+                        bloom, items = _load(conn, name, column)
+                        if bloom is None:
+                            bloom = BloomFilter.for_capacity(config.BLOOM_ACTIVE_CAPACITY)
+                        for value in values:
+                            bloom.add(value)
+                        _store(conn, name, column, bloom, items + len(values))
+                    conn.execute("DELETE FROM bloom_pending WHERE name = ? AND owner = ?", (name, self.owner))
+                del self.unflushed[path]
+            except Exception as e:
+                # A marca continua: a busca segue abrindo o arquivo até a próxima tentativa
+                print(f"⚠️ Erro ao gravar filtros de {name}: {e}")
+                self._reset_catalog()
+
+    def forget(self, db_path: str):
+        """Conexão do DB fechada: grava o que falta; na próxima, o filtro gravado é a referência"""
+        self.flush(db_path)
+        self.known.pop(db_path, None)
+
+    def close(self):
+        self.flush()
+        self._reset_catalog()
+
+# ==================== CONSTRUÇÃO ====================
+
+def _archive_values(path: str, column: str) -> Set[int]:
+    """IPs distintos de uma coluna do arquivo colunar"""
+    from app import archive
+
+    values = set()
+    for group in archive.open_archive(path).iter_groups((column,)):
+        values.update(archive.np.unique(group[column]).tolist())
+    if column in archive.NULLABLE_COLUMNS:
+        values.discard(0)  # NULL gravado como 0
+    return values
+
+def rebuild(path: str) -> bool:
+    """
+    Refaz os filtros do arquivo com os IPs distintos, no tamanho exato (dia selado
+    ou arquivado). DBs: com o lock de escrita, para nenhum lote entrar no meio
+    """
+    from app import archive
+
+    if not config.BLOOM_COLUMNS:
+        return False
+    name = os.path.basename(path)
+
+    conn = None
+    if path.endswith(archive.ARCHIVE_SUFFIX):
+        distinct = {column: _archive_values(path, column) for column in config.BLOOM_COLUMNS}
+    else:
+        conn = database.get_db_connection(path)
+        if conn is None:
+            return False
+        conn.row_factory = None
+        conn.execute("BEGIN IMMEDIATE")
+        if not os.path.exists(path):
+            conn.rollback()
+            conn.close()
+            return False  # Arquivado enquanto esperava o lock
+        min_id = archive.archived_max_id(path)  # Dia arquivado: só as linhas posteriores
+        distinct = {column: [value for (value,) in conn.execute(
+                        f"SELECT DISTINCT {column} FROM logs WHERE {column} IS NOT NULL AND id > ?", (min_id,))]
+                    for column in config.BLOOM_COLUMNS}
+
+    catalog_conn = catalog.get_catalog_connection()
+    try:
+        if catalog_conn is None:
+            return False
+        with catalog_conn:
+            for column, values in distinct.items():
+                bloom = BloomFilter.for_capacity(len(values))
+                for value in values:
+                    bloom.add(value)
+                _store(catalog_conn, name, column, bloom, len(values))
+            # Todos os IPs gravados estão no filtro: marcas de gravadores (e de drop) caem
+            catalog_conn.execute("DELETE FROM bloom_pending WHERE name = ?", (name,))
+        return True
+    except Exception as e:
+        print(f"⚠️ Erro ao gravar filtros de {name}: {e}")
+        return False
+    finally:
+        if catalog_conn is not None:
+            catalog_conn.close()
+        if conn is not None:
+            conn.rollback()
+            conn.close()
+
+def build_missing() -> int:
+    """Cria os filtros de arquivos selados/arquivados que não têm (anteriores aos filtros). Retorna quantos"""
+    if not config.BLOOM_COLUMNS:
+        return 0
+    conn = catalog.get_catalog_connection()
+    if conn is None:
+        return 0
+    try:
+        names = [row['name'] for row in conn.execute("""
+            SELECT name FROM files f
+            WHERE sealed = 1 AND NOT EXISTS (SELECT 1 FROM blooms b WHERE b.name = f.name)
+            ORDER BY name
+        """)]
+    finally:
+        conn.close()
+
+    built = 0
+    for name in names:
+        path = os.path.join(config.COLD_STORAGE_DIR, name)
+        try:
+            if os.path.exists(path) and rebuild(path):
+                built += 1
+        except Exception as e:
+            print(f"❌ Erro ao criar filtros de {name}: {e}")
+    return built
+
+# ==================== BUSCA ====================
+
+def candidate_files(paths: List[str], filters: Dict[str, int]) -> List[str]:
+    """Arquivos que podem ter linhas com os valores pedidos ({coluna: IP}); sem filtro: mantido"""
+    filters = {column: value for column, value in filters.items()
+               if column in config.BLOOM_COLUMNS and value is not None}
+    if not filters or not paths:
+        return paths
+
+    conn = catalog.get_catalog_connection()
+    if conn is None:
+        return paths
+    try:
+        pending = {row['name'] for row in conn.execute("SELECT DISTINCT name FROM bloom_pending")}
+        excluded = set()
+        for path in paths:
+            name = os.path.basename(path)
+            if name in pending:
+                continue  # IPs ainda fora do filtro
+            for column, value in filters.items():
+                bloom, _ = _load(conn, name, column)
+                if bloom is not None and value not in bloom:
+                    excluded.add(path)
+                    break
+    finally:
+        conn.close()
+    return [path for path in paths if path not in excluded]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Filtros de Bloom por arquivo - MEGA LOG")
+    parser.add_argument('--all', action='store_true', help='Refaz os filtros de todos os arquivos selados')
+    args = parser.parse_args()
+
+    if args.all:
+        conn = catalog.get_catalog_connection()
+        names = [row['name'] for row in conn.execute("SELECT name FROM files WHERE sealed = 1 ORDER BY name")]
+        conn.close()
+        count = sum(1 for name in names if rebuild(os.path.join(config.COLD_STORAGE_DIR, name)))
+    else:
+        count = build_missing()
+    print(f"✅ Filtros criados para {count} arquivo(s)")
@@ -0,0 +1,435 @@
+# app/catalog.py
+# Catálogo do storage COLD: uma linha por DB de dia/shard ou arquivo colunar
+#
+# Guarda intervalo de horários dos eventos, linhas, tamanho, selagem e linhas por
+# hora de cada arquivo. A busca escolhe os arquivos pelo catálogo, e o dashboard e
+# a visão diária leem contagens dele: nada de os.path.exists por dia, os.listdir
+# ou COUNT(*) por requisição.
+#
+# Quem grava mantém o catálogo: o writer do processador acumula as contagens dos
+# lotes commitados e aplica a cada CATALOG_FLUSH_SEC; o importador aplica a cada
+# transação; selagem e arquivamento atualizam o estado do arquivo. DBs que recebem
+# linhas ficam "dirty" (o processador limpa no encerramento normal) e são
+# recontados no início do processador: após uma queda ou rollback de blocos, as
+# contagens voltam a bater. sync() registra arquivos que o catálogo ainda não
+# conhece (ex: DBs anteriores ao catálogo).
+
+import os
+import json
+import time
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from app import config, database, sealing
+
+# ==================== CONEXÃO ====================
+
+def get_catalog_connection() -> Optional[sqlite3.Connection]:
+    """Conexão com o catálogo (cria o schema se necessário)"""
+    conn = database.get_db_connection(config.CATALOG_DB_PATH)
+    if conn is None:
+        return None
+
+    try:
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                name TEXT PRIMARY KEY,
+                day TEXT NOT NULL,
+                hour INTEGER,
+                min_ts INTEGER,
+                max_ts INTEGER,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                size_bytes INTEGER NOT NULL DEFAULT 0,
+                sealed INTEGER NOT NULL DEFAULT 0,
+                archived INTEGER NOT NULL DEFAULT 0,
+                hourly TEXT NOT NULL,
+                dirty INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_files_day ON files(day)")
+
+            # Filtros de Bloom dos IPs de cada arquivo (app/bloom.py)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS blooms (
+                name TEXT NOT NULL,
+                column TEXT NOT NULL,
+                hashes INTEGER NOT NULL,
+                bits BLOB NOT NULL,
+                items INTEGER NOT NULL,
+                PRIMARY KEY (name, column)
+            )
+            """)
+            # Arquivos com IPs ainda fora do filtro (em memória em algum gravador)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS bloom_pending (
+                name TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                PRIMARY KEY (name, owner)
+            )
+            """)
+    except Exception as e:
+        print(f"❌ Erro ao criar schema do catálogo: {e}")
+    return conn
+
+# ==================== ARQUIVOS ====================
+
+def parse_file_name(name: str) -> Optional[Tuple[date, Optional[int], bool]]:
+    """(dia, hora do shard ou None, arquivo colunar) pelo nome; None se não for de logs"""
+    from app import archive
+
+    archived = name.endswith(archive.ARCHIVE_SUFFIX)
+    if archived:
+        name = name[:-len(archive.ARCHIVE_SUFFIX)] + '.db'
+    parsed = database.parse_log_db_name(name)
+    if parsed is None:
+        return None
+    return parsed[0], parsed[1], archived
+
+def hour_bounds(ts: float) -> Tuple[int, float, float]:
+    """Hora local de um timestamp e seu intervalo [início, fim)"""
+    start = datetime.fromtimestamp(ts).replace(minute=0, second=0, microsecond=0)
+    return start.hour, start.timestamp(), (start + timedelta(hours=1)).timestamp()
+
+class CatalogDeltas:
+    """Contagens de linhas gravadas ainda não aplicadas ao catálogo, por arquivo"""
+
+    def __init__(self):
+        self.files = {}  # caminho -> [linhas, menor ts, maior ts, linhas por hora]
+
+    def add(self, db_path: str, rows: List[Tuple]):
+        """Soma um lote commitado (timestamp na coluna 0)"""
+        if not rows:
+            return
+        entry = self.files.get(db_path)
+        if entry is None:
+            entry = self.files[db_path] = [0, rows[0][0], rows[0][0], [0] * 24]
+
+        hourly = entry[3]
+        start = end = 0
+        for row in rows:
+            ts = row[0]
+            if not start <= ts < end:
+                hour, start, end = hour_bounds(ts)
+            hourly[hour] += 1
+        entry[0] += len(rows)
+        entry[1] = min(entry[1], min(row[0] for row in rows))
+        entry[2] = max(entry[2], max(row[0] for row in rows))
+
+    def flush(self) -> bool:
+        """Aplica as contagens acumuladas (arquivos ficam dirty até mark_clean)"""
+        if not self.files:
+            return True
+
+        conn = get_catalog_connection()
+        if conn is None:
+            return False
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for db_path, (count, min_ts, max_ts, hourly) in self.files.items():
+                    _apply(conn, db_path, count, min_ts, max_ts, hourly)
+            self.files.clear()
+            return True
+        except Exception as e:
+            print(f"⚠️ Erro ao atualizar catálogo: {e}")
+            return False
+        finally:
+            conn.close()
+
+def _insert_entry(conn: sqlite3.Connection, name: str) -> bool:
+    """Cria a linha de um arquivo (sem contagens) se ainda não existir"""
+    parsed = parse_file_name(name)
+    if parsed is None:
+        return False
+    day, hour, archived = parsed
+    conn.execute("""
+        INSERT OR IGNORE INTO files (name, day, hour, sealed, archived, hourly, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (name, day.isoformat(), hour, int(archived), int(archived),
+          json.dumps([0] * 24), time.time()))
+    return True
+
+def _apply(conn: sqlite3.Connection, db_path: str, count: int, min_ts: int, max_ts: int,
+           hourly: List[int]):
+    name = os.path.basename(db_path)
+    if not _insert_entry(conn, name):
+        return
+
+    row = conn.execute("SELECT hourly FROM files WHERE name = ?", (name,)).fetchone()
+    merged = [a + b for a, b in zip(json.loads(row['hourly']), hourly)]
+    conn.execute("""
+        UPDATE files SET
+            row_count = row_count + ?,
+            min_ts = MIN(IFNULL(min_ts, ?), ?),
+            max_ts = MAX(IFNULL(max_ts, ?), ?),
+            hourly = ?, size_bytes = ?, sealed = ?, dirty = 1, updated_at = ?
+        WHERE name = ?
+    """, (count, min_ts, min_ts, max_ts, max_ts, json.dumps(merged), sealing.db_size(db_path),
+          int(database.is_sealed(db_path)), time.time(), name))
+
+def _count_file(path: str) -> Optional[Tuple[int, Optional[int], Optional[int], List[int]]]:
+    """Contagens lidas do próprio arquivo: (linhas, menor ts, maior ts, linhas por hora)"""
+    from app import archive
+
+    if path.endswith(archive.ARCHIVE_SUFFIX):
+        reader = archive.open_archive(path)
+        return (reader.rows, reader.min_ts, reader.max_ts, archive.hourly_counts(reader))
+
+    conn = database.get_log_db_reader(path)
+    if conn is None:
+        return None
+    try:
+        # DB de dia arquivado: só as linhas chegadas depois (as demais contam no arquivo)
+        min_id = archive.archived_max_id(path)
+        count, min_ts, max_ts = conn.execute(
+            "SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM logs WHERE id > ?", (min_id,)).fetchone()
+        hourly = [0] * 24
+        for hour, hour_count in conn.execute("""
+            SELECT CAST(strftime('%H', timestamp, 'unixepoch', 'localtime') AS INTEGER), COUNT(*)
+            FROM logs WHERE id > ? GROUP BY 1
+        """, (min_id,)):
+            hourly[hour] = hour_count
+        return count, min_ts, max_ts, hourly
+    except sqlite3.OperationalError:
+        return None  # DB sem a tabela logs
+    finally:
+        conn.close()
+
+def refresh_file(path: str) -> bool:
+    """Reconta um arquivo e grava suas contagens absolutas (limpa o dirty)"""
+    counted = _count_file(path)
+    if counted is None:
+        return False
+    count, min_ts, max_ts, hourly = counted
+
+    name = os.path.basename(path)
+    conn = get_catalog_connection()
+    if conn is None:
+        return False
+    try:
+        with conn:
+            if not _insert_entry(conn, name):
+                return False
+            conn.execute("""
+                UPDATE files SET row_count = ?, min_ts = ?, max_ts = ?, hourly = ?, size_bytes = ?,
+                                 sealed = ?, dirty = 0, updated_at = ?
+                WHERE name = ?
+            """, (count, min_ts, max_ts, json.dumps(hourly), sealing.db_size(path),
+                  int(name.endswith('.mla') or database.is_sealed(path)), time.time(), name))
+        return True
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar catálogo ({name}): {e}")
+        return False
+    finally:
+        conn.close()
+
+def register(db_path: str):
+    """
+    DB que vai receber linhas: entra no catálogo (contado, se ainda não estiver) e
+    fica dirty - após uma queda, linhas commitadas podem não ter chegado ao catálogo
+    """
+    name = os.path.basename(db_path)
+    conn = get_catalog_connection()
+    if conn is None:
+        return
+    try:
+        known = conn.execute("SELECT 1 FROM files WHERE name = ?", (name,)).fetchone()
+    finally:
+        conn.close()
+    if not known:
+        refresh_file(db_path)
+
+    conn = get_catalog_connection()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.execute("UPDATE files SET dirty = 1 WHERE name = ?", (name,))
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar catálogo: {e}")
+    finally:
+        conn.close()
+
+def update_state(path: str):
+    """Selagem mudou: atualiza sealed e tamanho do arquivo"""
+    conn = get_catalog_connection()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.execute("UPDATE files SET sealed = ?, size_bytes = ?, updated_at = ? WHERE name = ?",
+                         (int(database.is_sealed(path)), sealing.db_size(path), time.time(), os.path.basename(path)))
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar catálogo: {e}")
+    finally:
+        conn.close()
+
+def mark_clean(paths: Iterable[str]):
+    """Encerramento limpo de quem gravava: contagens completas"""
+    conn = get_catalog_connection()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.executemany("UPDATE files SET dirty = 0 WHERE name = ?",
+                             [(os.path.basename(path),) for path in paths])
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar catálogo: {e}")
+    finally:
+        conn.close()
+
+def remove(path: str):
+    """Arquivo apagado (ex: DB substituído pelo arquivo colunar)"""
+    conn = get_catalog_connection()
+    if conn is None:
+        return
+    try:
+        with conn:
+            conn.execute("DELETE FROM files WHERE name = ?", (os.path.basename(path),))
+            conn.execute("DELETE FROM blooms WHERE name = ?", (os.path.basename(path),))
+            conn.execute("DELETE FROM bloom_pending WHERE name = ?", (os.path.basename(path),))
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar catálogo: {e}")
+    finally:
+        conn.close()
+
+def refresh_dirty() -> int:
+    """Reconta arquivos com contagens incompletas (queda durante a gravação). Retorna quantos"""
+    conn = get_catalog_connection()
+    if conn is None:
+        return 0
+    try:
+        names = [row['name'] for row in conn.execute("SELECT name FROM files WHERE dirty = 1")]
+    finally:
+        conn.close()
+
+    for name in names:
+        path = os.path.join(config.COLD_STORAGE_DIR, name)
+        if os.path.exists(path):
+            refresh_file(path)
+        else:
+            remove(path)
+    return len(names)
+
+def sync(rebuild: bool = False) -> Tuple[int, int]:
+    """
+    Confere o catálogo com os arquivos do storage COLD: registra os que faltam e tira
+    os que não existem mais (rebuild: reconta todos). Retorna (registrados, removidos)
+    """
+    present = {name for name in os.listdir(config.COLD_STORAGE_DIR) if parse_file_name(name) is not None}
+
+    conn = get_catalog_connection()
+    if conn is None:
+        return 0, 0
+    try:
+        known = {row['name'] for row in conn.execute("SELECT name FROM files")}
+        with conn:
+            conn.executemany("DELETE FROM files WHERE name = ?", [(name,) for name in known - present])
+            conn.executemany("DELETE FROM blooms WHERE name = ?", [(name,) for name in known - present])
+            conn.executemany("DELETE FROM bloom_pending WHERE name = ?", [(name,) for name in known - present])
+    finally:
+        conn.close()
+
+    added = 0
+    for name in sorted(present if rebuild else present - known):
+        if refresh_file(os.path.join(config.COLD_STORAGE_DIR, name)):
+            added += 1
+    return added, len(known - present)
+
+# ==================== CONSULTAS ====================
+
+def _entries(rows) -> List[Dict]:
+    """
+    Linhas do catálogo com caminho, linhas por hora e intervalo da partição
+    (start, end): o DB diário cobre o dia; cada shard vai até o próximo shard do dia
+    """
+    entries = [dict(row, path=os.path.join(config.COLD_STORAGE_DIR, row['name']),
+                    hourly=json.loads(row['hourly'])) for row in rows]
+
+    for day in {entry['day'] for entry in entries}:
+        day_start = datetime.combine(date.fromisoformat(day), datetime.min.time())
+        day_end = (day_start + timedelta(days=1)).timestamp()
+        same_day = [entry for entry in entries if entry['day'] == day]
+        hours = sorted({entry['hour'] for entry in same_day if entry['hour'] is not None})
+        for entry in same_day:
+            if entry['hour'] is None:
+                entry['start'], entry['end'] = day_start.timestamp(), day_end
+                continue
+            later = [hour for hour in hours if hour > entry['hour']]
+            entry['start'] = (day_start + timedelta(hours=entry['hour'])).timestamp()
+            entry['end'] = (day_start + timedelta(hours=later[0])).timestamp() if later else day_end
+    return entries
+
+def _select(where: str, params: Tuple) -> List[Dict]:
+    conn = get_catalog_connection()
+    if conn is None:
+        return []
+    try:
+        rows = conn.execute(f"SELECT * FROM files WHERE {where} ORDER BY day, hour, archived DESC",
+                            params).fetchall()
+    finally:
+        conn.close()
+    return _entries(rows)
+
+def entries_in_range(start_ts: float, end_ts: float) -> List[Dict]:
+    """
+    Arquivos com eventos que podem estar no intervalo, como dicionários (ordem de
+    horário). Arquivos imutáveis (selados/arquivados) são filtrados pelo menor/maior
+    horário gravado; os que ainda recebem linhas, pelo intervalo da partição
+    """
+    first_day = date.fromtimestamp(start_ts).isoformat()
+    last_day = date.fromtimestamp(end_ts).isoformat()
+
+    entries = []
+    for entry in _select("day BETWEEN ? AND ?", (first_day, last_day)):
+        if entry['end'] <= start_ts or entry['start'] > end_ts:
+            continue
+        if entry['sealed'] and not (entry['row_count'] and entry['min_ts'] <= end_ts and entry['max_ts'] >= start_ts):
+            continue
+        entries.append(entry)
+    return entries
+
+def files_in_range(start_ts: float, end_ts: float) -> List[str]:
+    """Caminhos dos arquivos de entries_in_range"""
+    return [entry['path'] for entry in entries_in_range(start_ts, end_ts)]
+
+def rows_in_range(entry: Dict, start_ts: float, end_ts: float) -> float:
+    """Linhas do arquivo no intervalo, estimadas pelas linhas por hora (horas parciais: proporcional)"""
+    day_start = datetime.combine(date.fromisoformat(entry['day']), datetime.min.time())
+    total = 0.0
+    for hour, rows in enumerate(entry['hourly']):
+        if not rows:
+            continue
+        hour_start = (day_start + timedelta(hours=hour)).timestamp()
+        hour_end = (day_start + timedelta(hours=hour + 1)).timestamp()
+        overlap = min(hour_end, end_ts + 1) - max(hour_start, start_ts)
+        if overlap > 0:
+            total += rows * overlap / (hour_end - hour_start)
+    return total
+
+def day_files(target_date: date) -> List[Dict]:
+    """Arquivos de um dia como dicionários (colunas do catálogo, path, start, end)"""
+    return _select("day = ?", (target_date.isoformat(),))
+
+def available_days() -> List[date]:
+    """Dias com arquivos de logs (mais recentes primeiro)"""
+    conn = get_catalog_connection()
+    if conn is None:
+        return []
+    try:
+        return [date.fromisoformat(row['day'])
+                for row in conn.execute("SELECT DISTINCT day FROM files ORDER BY day DESC")]
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Catálogo do storage COLD - MEGA LOG")
+    parser.add_argument('--rebuild', action='store_true', help='Reconta todos os arquivos')
+    args = parser.parse_args()
+
+    added, removed = sync(rebuild=args.rebuild)
+    print(f"✅ Catálogo: {added} arquivo(s) contado(s), {removed} removido(s)")
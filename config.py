@@ -21,9 +21,45 @@ USERS_DB_PATH = os.path.join(BASE_DIR, "users.db")
 # Formato de nome do banco de logs (por dia)
 LOG_DB_FILENAME_FORMAT = "%Y-%m-%d.db"  # Ex: 2025-12-02.db
 
-# Arquivo de offset do Pygtail (controle de leitura)
+# Shards de N horas por dia (divisor de 24; 0 = um DB por dia). A busca abre só os
+# shards do intervalo, pequenos o bastante para ficar no page cache. Com shards, o
+# DB diário guarda só as estatísticas do processador. DBs já gravados no outro
+# layout continuam sendo lidos.
+LOG_SHARD_HOURS = int(os.environ.get('MEGALOG_SHARD_HOURS', '0'))
+LOG_SHARD_FILENAME_FORMAT = "%Y-%m-%d_%H.db"  # Ex: 2025-12-02_14.db (hora inicial)
+if LOG_SHARD_HOURS < 0 or (LOG_SHARD_HOURS and 24 % LOG_SHARD_HOURS):
+    raise ValueError(f"MEGALOG_SHARD_HOURS={LOG_SHARD_HOURS} não divide o dia (use 1, 2, 3, 4, 6, 8 ou 12)")
+
+# Dicionário global (interfaces/protocolos/estados com IDs estáveis entre os dias).
+# Desligado: cada DB diário tem suas próprias tabelas d_*. DBs já gravados com
+# dicionário próprio continuam usando-o mesmo depois de ligar o modo global.
+GLOBAL_DICTIONARY = os.environ.get('MEGALOG_GLOBAL_DICTIONARY', 'False').lower() == 'true'
+DICTIONARY_DB_PATH = os.path.join(COLD_STORAGE_DIR, "dictionary.db")
+
+# Arquivo de offset do antigo leitor Pygtail (lido apenas para migração)
 PROCESSOR_OFFSET_FILE = os.path.join(COLD_STORAGE_DIR, ".processor.offset")
 
+# Buffer HOT segmentado: receptor grava hot_logs.000123.raw de tamanho fixo e o
+# processador apaga os segmentos já commitados (disco HOT limitado).
+# Desligado por padrão porque o rsyslog ainda pode escrever em hot_logs.raw.
+HOT_BUFFER_SEGMENTED = os.environ.get('MEGALOG_HOT_SEGMENTED', 'False').lower() == 'true'
+
+# Tamanho de cada segmento
+HOT_SEGMENT_SIZE_BYTES = 64 * 1024 * 1024  # 64MB
+
+# Checkpoint legado em arquivo (migração). O offset oficial fica no DB diário,
+# gravado na mesma transação de cada lote (tabela ingest_offsets).
+HOT_CHECKPOINT_FILE = os.path.join(COLD_STORAGE_DIR, ".processor.checkpoint")
+
+# Quantos dias para trás procurar o último offset commitado ao reiniciar
+INGEST_OFFSET_LOOKBACK_DAYS = 7
+
+# Máximo de bytes lidos do buffer HOT por iteração do processador
+HOT_READ_MAX_BYTES = 4 * 1024 * 1024  # 4MB
+
+# Intervalo da coleta de segmentos commitados (segundos)
+HOT_GC_INTERVAL_SEC = 30
+
 # ==================== INICIALIZAÇÃO ====================
 # Garantir que diretórios existam (executado na inicialização)
 os.makedirs(HOT_STORAGE_DIR, exist_ok=True)
@@ -53,12 +89,170 @@ BATCH_SIZE = 500
 # Tempo máximo antes de salvar lote incompleto (segundos)
 BATCH_TIMEOUT_SEC = 10
 
-# Filtros de ruído (logs que NÃO serão salvos)
+# Processos de parsing/normalização (1 = tudo no processo principal).
+# Os IDs de dicionário e a inserção continuam no processo principal, em ordem.
+PROCESSOR_WORKERS = int(os.environ.get('MEGALOG_PROCESSOR_WORKERS', '1'))
+
+# Bytes lidos por bloco de cada fonte no loop em streaming
+PROCESSOR_CHUNK_BYTES = 256 * 1024  # 256KB (~1.300 linhas)
+
+# Limite rígido de linhas em memória aguardando gravação (backpressure)
+MAX_INFLIGHT_LINES = 50000
+
+# Duração mínima de uma fase de catch-up para reportar a vazão (segundos)
+CATCHUP_MIN_REPORT_SEC = 5
+
+# Lotes aguardando o writer além do que está sendo gravado (1 = double buffering)
+WRITER_QUEUE_DEPTH = 1
+
+# Espera entre tentativas quando um lote falha ao gravar (segundos)
+WRITER_RETRY_SEC = 1
+
+# Conexões de DBs diários mantidas abertas pelo writer (LRU). Cada linha vai para o
+# DB do dia do seu próprio timestamp, não do dia em que chegou.
+WRITER_MAX_OPEN_DBS = 4
+
+# Janela de atraso: um dia é encerrado (lote gravado) quando o horário dos eventos
+# passa da meia-noite + esta janela. Linhas que chegam depois ainda vão para o dia
+# certo, contadas como atrasadas.
+LATE_DATA_WINDOW_SEC = 300
+
+# Strings de segundo ("Dec  2 14:23:45") mantidas no cache de timestamps
+TIMESTAMP_CACHE_SIZE = 4096
+
+# Prefixos de linha (horário, host, interfaces, proto) mantidos no cache do tokenizador
+TOKENIZER_CACHE_SIZE = 4096
+
+# Filtros de ruído (logs que NÃO serão salvos): trechos da linha crua.
+# Compilados em uma única regex, o custo não cresce com a quantidade de filtros.
 NOISE_FILTERS = [
     '->10.10.10.10:53',  # DNS interno
     '->8.8.8.8:53',      # Google DNS (opcional)
 ]
 
+# Regras de ruído estruturadas, avaliadas após o parsing (todos os campos devem bater).
+# Campos: interface_in, interface_out, state, proto, src_ip_priv, src_port_priv,
+# dst_ip, dst_port, nat_ip_pub, nat_port_pub. 'name' identifica a regra nas estatísticas.
+NOISE_RULES = [
+    # {'name': 'ntp', 'dst_port': 123},
+    # {'name': 'monitoramento', 'dst_ip': '10.10.10.20', 'dst_port': 161},
+]
+
+# ==================== IMPORTAÇÃO ====================
+# Importação em massa de arquivos crus/.gz (log_importer.py, comando megalog-import)
+IMPORT_WORKERS = int(os.environ.get('MEGALOG_IMPORT_WORKERS', '4'))
+
+# Bytes lidos por bloco de parsing
+IMPORT_CHUNK_BYTES = 4 * 1024 * 1024  # 4MB (~20.000 linhas)
+
+# Linhas por transação na carga de cada dia (sincronização relaxada, índices no final)
+IMPORT_TRANSACTION_ROWS = 500000
+
+# Espera máxima pelo processador quando ele tem linhas não confirmadas no mesmo dia (segundos)
+IMPORT_PROCESSOR_WAIT_SEC = 120
+
+# ==================== SELAGEM ====================
+# Índices do dia ativo: só a busca por IP+porta pública (ordens judiciais). Cada
+# índice a mais é uma B-tree atualizada por linha inserida; os demais índices
+# forenses são criados quando o dia é selado.
+ACTIVE_DAY_INDEXES = ['idx_logs_nat_combo']
+
+# Dia encerrado é selado (índices completos, ANALYZE, VACUUM, aberto como imutável)
+# depois da meia-noite + este atraso, dando margem a linhas atrasadas (segundos)
+SEAL_DELAY_SEC = 3600
+
+# Selagem automática só de dias recentes (DBs antigos: python3 -m app.sealing --all)
+SEAL_MAX_AGE_DAYS = 7
+
+# Intervalo entre verificações de dias a selar no processador (segundos)
+SEAL_CHECK_INTERVAL_SEC = 300
+
+# ==================== ARQUIVO COLUNAR ====================
+# Dias selados mais antigos que isto viram arquivo colunar compactado (AAAA-MM-DD.mla,
+# app/archive.py) e o DB do dia é removido. Requer NumPy. 0 = desligado
+ARCHIVE_AFTER_DAYS = int(os.environ.get('MEGALOG_ARCHIVE_AFTER_DAYS', '0'))
+
+# Linhas por grupo do arquivo (unidade de descompressão, com min/max por coluna)
+ARCHIVE_ROW_GROUP_ROWS = 65536
+
+# Nível de compressão zlib (1-9)
+ARCHIVE_COMPRESSION_LEVEL = 6
+
+# Arquivos mantidos abertos (rodapé lido, mmap) entre buscas
+ARCHIVE_MAX_OPEN_READERS = 64
+
+# ==================== CATÁLOGO ====================
+# Índice dos arquivos do storage COLD (app/catalog.py): horários, linhas, tamanho,
+# selagem e linhas por hora de cada DB/arquivo. Reconstruir: python3 -m app.catalog --rebuild
+CATALOG_DB_PATH = os.path.join(COLD_STORAGE_DIR, "catalog.db")
+
+# Intervalo de atualização do catálogo com as contagens do writer (segundos)
+CATALOG_FLUSH_SEC = 10
+
+# ==================== BUSCA ====================
+# Threads de busca por processo web (compartilhadas pelas buscas do processo):
+# arquivos de dias/shards diferentes são consultados em paralelo (app/search_pool.py)
+SEARCH_MAX_THREADS = 8
+
+# Arquivos consultados ao mesmo tempo por uma busca (padrão; cada chamada pode pedir
+# outro valor). Limita o quanto uma busca pesada ocupa do disco e das CPUs
+SEARCH_CONCURRENCY = 4
+
+# Tempo para a contagem exata do total de uma busca (segundos): passado isso, os
+# arquivos ainda não contados entram por estimativa (catálogo) e a tela mostra "~"
+SEARCH_COUNT_BUDGET_SEC = 1.0
+
+# ==================== EXPORTAÇÃO ====================
+# Linhas por página da busca refeita na exportação (app/export.py): a memória do
+# download é de uma página, qualquer que seja o tamanho do resultado
+EXPORT_BATCH_ROWS = 5000
+
+# Nível de compressão das exportações com gzip (1 = rápido, 9 = menor)
+EXPORT_GZIP_LEVEL = 6
+
+# ==================== FILTROS DE BLOOM ====================
+# Colunas com filtro de Bloom por arquivo (app/bloom.py): a busca por IP privado ou
+# público só abre os DBs/arquivos que podem ter o IP. () = desligado
+BLOOM_COLUMNS = ('src_ip_priv', 'nat_ip_pub')
+
+# Taxa de falso positivo (arquivo aberto sem ter o IP)
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+# IPs distintos previstos por arquivo em gravação (na selagem o filtro é refeito
+# no tamanho exato). 131072 IPs = ~160KB por coluna
+BLOOM_ACTIVE_CAPACITY = 131072
+
+# ==================== RECEPTOR ====================
+# Modo do receptor: "legacy" (1 socket, 1 datagrama por vez) ou "batched" (N workers
+# com SO_REUSEPORT). Instalações existentes seguem no legacy; o batched é opt-in
+RECEIVER_MODE = os.environ.get('MEGALOG_RECEIVER_MODE', 'legacy')
+
+# Quantidade de workers UDP (cada um com seu próprio socket SO_REUSEPORT)
+RECEIVER_WORKERS = int(os.environ.get('MEGALOG_RECEIVER_WORKERS', '4'))
+
+# Buffer de recepção do kernel por socket (bytes) - absorve picos de CGNAT
+RECEIVER_RCVBUF_BYTES = 32 * 1024 * 1024  # 32MB
+
+# Máximo de datagramas drenados por acordada antes de gravar em lote
+RECEIVER_BATCH_MAX = 2048
+
+# ==================== RING BUFFER (MEMÓRIA COMPARTILHADA) ====================
+# Caminho zero-copy: receptor publica em ring mmap, processador consome direto.
+# O arquivo HOT vira apenas spill de durabilidade quando o processador atrasa.
+USE_SHM_RING = os.environ.get('MEGALOG_USE_SHM_RING', 'False').lower() == 'true'
+
+# Diretório dos rings (tmpfs) - um ring por worker do receptor
+RING_BUFFER_DIR = "/dev/shm/megalog"
+
+# Tamanho da área de dados de cada ring
+RING_BUFFER_SIZE_BYTES = 64 * 1024 * 1024  # 64MB
+
+# Intervalo de polling do processador quando os rings estão vazios (segundos)
+RING_POLL_INTERVAL_SEC = 0.005
+
+# Timeout de lote no modo ring (latência ponta-a-ponta em milissegundos)
+RING_BATCH_TIMEOUT_SEC = 0.05
+
 # ==================== PERFORMANCE ====================
 # Timeout de conexão SQLite
 DB_TIMEOUT = 30.0
@@ -69,6 +263,9 @@ DB_JOURNAL_MODE = "WAL"
 # Sincronização (NORMAL = mais rápido, FULL = mais seguro)
 DB_SYNCHRONOUS = "NORMAL"
 
+# IPs distintos mantidos no cache de conversão string <-> inteiro (pool de NAT, clientes quentes)
+IP_CACHE_SIZE = 65536
+
 # ==================== RETENÇÃO ====================
 # Dias para manter logs (0 = infinito)
 LOG_RETENTION_DAYS = 365
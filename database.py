@@ -4,10 +4,13 @@
 import sqlite3
 import os
 import re
-import ipaddress
+import time
+import urllib.parse
 from datetime import datetime, date, timedelta
 from typing import Optional, Dict, List, Tuple
-from app import config
+from app import config, ipv4
+from app.tokenizer import tokenize_firewall_line, NO_MATCH
+from app.timestamps import parse_syslog_timestamp
 
 # ==================== REGEX DE PARSING ====================
 # Suporta logs Mikrotik com NAT
@@ -28,6 +31,10 @@ LOG_REGEX_NO_NAT = re.compile(
     r'(?P<src_ip_priv>[\d\.]+):(?P<src_port_priv>\d+)->(?P<dst_ip>[\d\.]+):(?P<dst_port>\d+)'
 )
 
+# ==================== OFFSETS DE ENTRADA ====================
+# Pseudo-fonte em ingest_offsets: seq do bloco de entrada no ponto de retomada
+CHUNK_SEQ_SOURCE = "chunk_seq"
+
 # ==================== CACHE GLOBAL ====================
 # Cache em memória para dicionários (compressão)
 D_CACHE = {
@@ -54,6 +61,21 @@ def get_db_connection(db_path: str, timeout: float = None) -> Optional[sqlite3.C
         print(f"❌ Erro ao conectar ao DB {db_path}: {e}")
         return None
 
+def get_log_db_reader(db_path: str) -> Optional[sqlite3.Connection]:
+    """Conexão de leitura (buscas/estatísticas): DB selado abre imutável, sem locks nem WAL"""
+    if not os.path.exists(db_path):
+        return None  # Dia arquivado (app/archive.py): não cria DB vazio
+    if not is_sealed(db_path):
+        return get_db_connection(db_path)
+
+    try:
+        conn = sqlite3.connect(f"file:{urllib.parse.quote(db_path)}?mode=ro&immutable=1", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+    except Exception as e:
+        print(f"❌ Erro ao abrir DB selado {db_path}: {e}")
+        return None
+
 def get_users_db_connection() -> Optional[sqlite3.Connection]:
     """Conexão com banco de usuários"""
     return get_db_connection(config.USERS_DB_PATH)
@@ -66,6 +88,67 @@ def get_log_db_path(date_obj: date = None) -> str:
     db_name = date_obj.strftime(config.LOG_DB_FILENAME_FORMAT)
     return os.path.join(config.COLD_STORAGE_DIR, db_name)
 
+def get_log_shard_path(date_obj: date, hour: int) -> str:
+    """Caminho do shard do dia que começa na hora dada (LOG_SHARD_HOURS)"""
+    shard_start = datetime.combine(date_obj, datetime.min.time()) + timedelta(hours=hour)
+    return os.path.join(config.COLD_STORAGE_DIR, shard_start.strftime(config.LOG_SHARD_FILENAME_FORMAT))
+
+def parse_log_db_name(name: str) -> Optional[Tuple[date, Optional[int]]]:
+    """(dia, hora inicial do shard ou None se diário) pelo nome do DB; None para outros arquivos"""
+    for name_format, sharded in ((config.LOG_DB_FILENAME_FORMAT, False), (config.LOG_SHARD_FILENAME_FORMAT, True)):
+        try:
+            moment = datetime.strptime(name, name_format)
+        except ValueError:
+            continue
+        return moment.date(), moment.hour if sharded else None
+    return None
+
+def partition_bounds(ts: float) -> Tuple[str, float, float]:
+    """DB de um timestamp (do dia ou do shard, conforme LOG_SHARD_HOURS) e seu intervalo [início, fim)"""
+    moment = datetime.fromtimestamp(ts)
+    day_start = datetime.combine(moment.date(), datetime.min.time())
+    if not config.LOG_SHARD_HOURS:
+        return get_log_db_path(moment.date()), day_start.timestamp(), (day_start + timedelta(days=1)).timestamp()
+    
+    hour = moment.hour - moment.hour % config.LOG_SHARD_HOURS
+    start = day_start + timedelta(hours=hour)
+    end = start + timedelta(hours=config.LOG_SHARD_HOURS)
+    return get_log_shard_path(moment.date(), hour), start.timestamp(), end.timestamp()
+
+def get_sealed_marker_path(db_path: str) -> str:
+    """Marca de DB selado (app/sealing.py): arquivo ao lado do DB"""
+    return f"{db_path}.sealed"
+
+def is_sealed(db_path: str) -> bool:
+    """DB de dia encerrado, já selado (somente leitura)"""
+    return os.path.exists(get_sealed_marker_path(db_path))
+
+def begin_log_write(conn: sqlite3.Connection, db_path: str) -> bool:
+    """
+    Abre a transação de escrita de um lote (BEGIN IMMEDIATE) e tira a marca de
+    selado do DB, se houver: com o lock de escrita, a selagem não cria a marca
+    no meio do lote. Retorna False se o DB continuar bloqueado.
+    """
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ DB ocupado ({os.path.basename(db_path)}): {e}")
+        return False
+
+    if not os.path.exists(db_path):
+        # Arquivado (app/archive.py) enquanto a conexão esperava: reabrir cria um DB novo
+        conn.rollback()
+        print(f"🗜️ {os.path.basename(db_path)} foi arquivado: reabrindo")
+        return False
+
+    if is_sealed(db_path):
+        from app import catalog
+        
+        os.remove(get_sealed_marker_path(db_path))
+        catalog.update_state(db_path)  # Busca volta a abrir o DB pelo intervalo da partição
+        print(f"🔓 {os.path.basename(db_path)} recebeu linhas atrasadas: selagem desfeita")
+    return True
+
 def get_current_log_db_connection() -> Optional[sqlite3.Connection]:
     """Conexão com banco de logs do dia atual"""
     db_path = get_log_db_path()
@@ -121,31 +204,45 @@ def create_users_schema(conn: sqlite3.Connection):
     except Exception as e:
         print(f"❌ Erro ao criar schema de usuários: {e}")
 
-def create_log_schema(conn: sqlite3.Connection):
-    """Cria schema do banco de logs (normalizado)"""
+def create_dict_tables(conn: sqlite3.Connection, schema: str = 'main'):
+    """Cria tabelas de dicionário (normalização) no DB do dia ou no DB global anexado"""
+    for table in D_CACHE:
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.{table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+        """)
+
+# Índices da tabela logs: nome -> colunas
+LOG_INDEXES = {
+    'idx_logs_timestamp': 'timestamp DESC',
+    'idx_logs_src_ip': 'src_ip_priv',
+    'idx_logs_nat_ip': 'nat_ip_pub',
+    'idx_logs_dst_ip': 'dst_ip',
+    'idx_logs_nat_combo': 'nat_ip_pub, nat_port_pub, timestamp DESC',  # Busca por IP+Porta (mais comum)
+}
+
+def create_log_indexes(conn: sqlite3.Connection, names: List[str] = None):
+    """Cria os índices da tabela logs que faltarem (padrão: todos)"""
+    for name in names if names is not None else LOG_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON logs({LOG_INDEXES[name]})")
+
+def drop_log_indexes(conn: sqlite3.Connection):
+    """Remove os índices da tabela logs (carga em massa: recriar no final é mais rápido)"""
+    with conn:
+        for name in LOG_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+def create_log_schema(conn: sqlite3.Connection, db_path: str = None):
+    """
+    Cria schema do banco de logs (normalizado).
+    db_path: DB de um dia já arquivado continua os IDs do arquivo (app/archive.py)
+    """
     try:
         with conn:
             # Tabelas de dicionário (normalização)
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS d_interfaces (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            )
-            """)
-            
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS d_protocols (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            )
-            """)
-            
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS d_states (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            )
-            """)
+            create_dict_tables(conn)
             
             # Tabela principal de logs (otimizada)
             conn.execute("""
@@ -169,98 +266,213 @@ def create_log_schema(conn: sqlite3.Connection):
             )
             """)
             
-            # Índices otimizados para busca forense
-            conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_logs_timestamp 
-            ON logs(timestamp DESC)
-            """)
-            
-            conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_logs_src_ip 
-            ON logs(src_ip_priv)
-            """)
-            
-            conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_logs_nat_ip 
-            ON logs(nat_ip_pub)
-            """)
+            # Índices do dia ativo (os demais são criados na selagem do dia: app/sealing.py)
+            create_log_indexes(conn, config.ACTIVE_DAY_INDEXES)
             
+            # Tabela de estatísticas do processador
             conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_logs_dst_ip 
-            ON logs(dst_ip)
+            CREATE TABLE IF NOT EXISTS processor_stats (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
             """)
             
-            # Índice composto para buscas por IP+Porta (mais comum)
+            # Offsets de leitura do buffer HOT (gravados na mesma transação do lote)
             conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_logs_nat_combo 
-            ON logs(nat_ip_pub, nat_port_pub, timestamp DESC)
+            CREATE TABLE IF NOT EXISTS ingest_offsets (
+                source TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                byte_offset INTEGER NOT NULL,
+                committed_at REAL NOT NULL
+            )
             """)
             
-            # Tabela de estatísticas do processador
+            # Primeira linha de cada bloco de entrada gravado neste DB (desfaz commits
+            # posteriores ao ponto de retomada quando um lote vai para vários dias)
             conn.execute("""
-            CREATE TABLE IF NOT EXISTS processor_stats (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS ingest_chunks (
+                chunk_seq INTEGER PRIMARY KEY,
+                first_id INTEGER NOT NULL
             )
             """)
             
+            # Dia já arquivado: linhas novas ficam com IDs acima dos arquivados
+            if db_path is not None:
+                from app import archive
+                max_id = archive.archived_max_id(db_path)
+                seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'logs'").fetchone()
+                if max_id and seq is None:
+                    conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('logs', ?)", (max_id,))
+                elif max_id and seq[0] < max_id:
+                    conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'logs'", (max_id,))
+            
     except Exception as e:
         print(f"❌ Erro ao criar schema de logs: {e}")
 
 # ==================== CACHE ====================
 
-def load_caches(conn: sqlite3.Connection):
-    """Carrega dicionários na memória para inserções rápidas"""
+def has_local_dictionary(conn: sqlite3.Connection) -> bool:
+    """DB do dia gravado com dicionário próprio (tabelas d_* locais preenchidas)"""
+    try:
+        return any(conn.execute(f"SELECT 1 FROM main.{table} LIMIT 1").fetchone() for table in D_CACHE)
+    except sqlite3.OperationalError:
+        return False
+
+def attach_dictionary_db(conn: sqlite3.Connection):
+    """Anexa o DB de dicionários global à conexão (schema 'dict')"""
+    if _dict_schema(conn) == 'dict':
+        return
+    conn.execute("ATTACH DATABASE ? AS dict", (config.DICTIONARY_DB_PATH,))
+    conn.execute(f"PRAGMA dict.journal_mode = {config.DB_JOURNAL_MODE};")
+    with conn:
+        create_dict_tables(conn, 'dict')
+
+def _dict_schema(conn: sqlite3.Connection) -> str:
+    """Schema onde estão os dicionários usados pela conexão: 'dict' (global) ou 'main'"""
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    return 'dict' if 'dict' in attached else 'main'
+
+def load_caches(conn: sqlite3.Connection) -> Dict[str, Dict[str, int]]:
+    """
+    Carrega dicionários na memória para inserções rápidas.
+    Modo global: anexa o DB de dicionários, exceto em DBs que já têm dicionário próprio
+    (gravados antes do modo global ser ligado) - um DB nunca mistura os dois.
+    """
     global D_CACHE
     
-    for table in D_CACHE.keys():
+    if config.GLOBAL_DICTIONARY and not has_local_dictionary(conn):
+        try:
+            attach_dictionary_db(conn)
+        except Exception as e:
+            print(f"⚠️ Aviso ao anexar dicionário global: {e}")
+    schema = _dict_schema(conn)
+    
+    cache = {table: {} for table in D_CACHE}
+    for table in cache:
         try:
-            cursor = conn.execute(f"SELECT id, name FROM {table}")
-            D_CACHE[table] = {row['name']: row['id'] for row in cursor.fetchall()}
+            cursor = conn.execute(f"SELECT id, name FROM {schema}.{table}")
+            cache[table] = {row['name']: row['id'] for row in cursor.fetchall()}
         except Exception as e:
             print(f"⚠️ Aviso ao carregar cache {table}: {e}")
+    D_CACHE.update(cache)  # Padrão para quem não passa o cache da conexão
     
-    total_items = sum(len(cache) for cache in D_CACHE.values())
+    total_items = sum(len(names) for names in cache.values())
     if total_items > 0:
         print(f"✅ Cache carregado: {total_items} itens")
+    return cache
 
-def get_or_create_dict_id(conn: sqlite3.Connection, table: str, value: str) -> Optional[int]:
-    """Pega ID do cache ou cria novo (normalização)"""
-    value = value.strip()
-    if not value:
-        return None
+# Colunas da linha normalizada (database.normalize_log) resolvidas por cada dicionário
+DICT_COLUMNS = (
+    ('d_interfaces', (1, 2)),
+    ('d_states', (3,)),
+    ('d_protocols', (4,)),
+)
+
+def fetch_dict_ids(conn: sqlite3.Connection, table: str, names) -> Dict[str, int]:
+    """Cria os nomes que faltam e retorna seus IDs (um INSERT OR IGNORE + um SELECT)"""
+    names = list(names)
+    table = f"{_dict_schema(conn)}.{table}"
+    conn.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(name,) for name in names])
+    
+    ids = {}
+    for start in range(0, len(names), 500):  # Limite de parâmetros do SQLite
+        chunk = names[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        cursor = conn.execute(f"SELECT id, name FROM {table} WHERE name IN ({placeholders})", chunk)
+        ids.update((row[1], row[0]) for row in cursor)
+    return ids
+
+def resolve_dict_ids(conn: sqlite3.Connection, rows: List[Tuple],
+                     caches: Dict[str, Dict[str, int]] = None) -> Tuple[List[Tuple], Dict[str, Dict[str, int]]]:
+    """
+    Troca os nomes das linhas normalizadas pelos IDs dos dicionários.
+    Chamar dentro da transação do lote: nomes novos são criados nela mesma.
+    caches: cache da conexão (load_caches); padrão D_CACHE.
+    Retorna (linhas para inserção, IDs novos por tabela - entram no cache após o commit).
+    """
+    if caches is None:
+        caches = D_CACHE
+    new_ids = {}
+    lookup = {}
+    
+    for table, columns in DICT_COLUMNS:
+        cache = caches[table]
+        missing = {row[column] for row in rows for column in columns if row[column] not in cache}
+        missing.discard('')  # Estado vazio vira NULL
+        
+        if missing:
+            new_ids[table] = fetch_dict_ids(conn, table, missing)
+            lookup[table] = {**cache, **new_ids[table]}
+        else:
+            lookup[table] = cache
+    
+    interfaces = lookup['d_interfaces']
+    states = lookup['d_states']
+    protocols = lookup['d_protocols']
     
-    # Busca no cache primeiro (O(1))
-    if value in D_CACHE[table]:
-        return D_CACHE[table][value]
+    resolved = [
+        (row[0], interfaces[row[1]], interfaces[row[2]], states.get(row[3]), protocols[row[4]]) + row[5:]
+        for row in rows
+    ]
+    return resolved, new_ids
+
+# ==================== DECODIFICAÇÃO (WEB) ====================
+# Dicionário global em memória: {tabela: {id: nome}} (IDs nunca mudam; só crescem)
+GLOBAL_NAMES = {table: {} for table in D_CACHE}
+
+def _load_global_names():
+    """Relê o DB de dicionários global"""
+    global GLOBAL_NAMES
     
-    # Não está no cache, insere no DB
+    if not os.path.exists(config.DICTIONARY_DB_PATH):
+        return
+    conn = get_db_connection(config.DICTIONARY_DB_PATH)
+    if not conn:
+        return
     try:
-        with conn:
-            cursor = conn.execute(f"INSERT INTO {table} (name) VALUES (?)", (value,))
-            new_id = cursor.lastrowid
-            D_CACHE[table][value] = new_id
-            return new_id
-    except sqlite3.IntegrityError:
-        # Race condition: outro processo inseriu enquanto estávamos tentando
-        try:
-            cursor = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (value,))
-            row = cursor.fetchone()
-            if row:
-                D_CACHE[table][value] = row['id']
-                return row['id']
-        except Exception as inner_e:
-            print(f"⚠️ Erro ao recuperar ID em race condition: {inner_e}")
-    except Exception as e:
-        print(f"❌ Erro em get_or_create_dict_id({table}, {value}): {e}")
+        GLOBAL_NAMES = {
+            table: {row[0]: row[1] for row in conn.execute(f"SELECT id, name FROM {table}")}
+            for table in D_CACHE
+        }
+    except sqlite3.OperationalError:
+        pass  # DB global ainda sem tabelas
+    finally:
+        conn.close()
+
+def load_dict_names(conn: sqlite3.Connection, required_ids: Dict[str, set] = None) -> Dict[str, Dict[int, str]]:
+    """
+    Mapas ID -> nome para decodificar resultados de um DB do dia ({tabela: {id: nome}}).
+    DB com dicionário próprio: lê as tabelas locais (pequenas).
+    DB do modo global: usa o mapa em memória, relido só se faltar algum ID de required_ids.
+    """
+    local = {table: {row[0]: row[1] for row in conn.execute(f"SELECT id, name FROM main.{table}")}
+             for table in D_CACHE}
+    if any(local.values()):
+        return local
     
-    return None
+    missing = any(not GLOBAL_NAMES[table].keys() >= set(ids) - {None}
+                  for table, ids in (required_ids or {}).items())
+    if missing or not any(GLOBAL_NAMES.values()):
+        _load_global_names()
+    return GLOBAL_NAMES
 
 # ==================== PARSING ====================
 
 def parse_log_line(line: str) -> Optional[Dict]:
     """Analisa linha de log e retorna dicionário com campos"""
+    # Caminho rápido: tokenizador de passada única
+    data = tokenize_firewall_line(line)
+    if data is NO_MATCH:
+        return None
+    if data is not None:
+        return data
+    
+    # Linha ambígua: regex decide
+    return parse_log_line_regex(line)
+
+def parse_log_line_regex(line: str) -> Optional[Dict]:
+    """Parser original por regex (fallback do tokenizador e referência de equivalência)"""
     # Tenta regex com NAT primeiro
     match = LOG_REGEX_WITH_NAT.search(line)
     if match:
@@ -281,56 +493,27 @@ def parse_log_line(line: str) -> Optional[Dict]:
 
 def convert_ip_to_int(ip_str: str) -> Optional[int]:
     """Converte IP string para inteiro"""
-    if not ip_str:
-        return None
-    try:
-        return int(ipaddress.IPv4Address(ip_str))
-    except (ipaddress.AddressValueError, ValueError):
-        return None
+    return ipv4.ip_to_int(ip_str)
 
 def convert_int_to_ip(ip_int: int) -> Optional[str]:
     """Converte IP inteiro para string"""
-    if not ip_int:
-        return None
-    try:
-        return str(ipaddress.IPv4Address(ip_int))
-    except (ipaddress.AddressValueError, ValueError):
-        return None
+    return ipv4.int_to_ip(ip_int)
 
 def parse_timestamp(ts_str: str) -> Optional[int]:
-    """Converte timestamp syslog para Unix timestamp"""
-    try:
-        current_year = datetime.now().year
-        # Formato: "Dec  2 14:23:45"
-        dt_str = f"{ts_str} {current_year}"
-        dt = datetime.strptime(dt_str, '%b %d %H:%M:%S %Y')
-        
-        # Ajuste de ano (se log é de dezembro mas estamos em janeiro)
-        now = datetime.now()
-        if dt.month == 12 and now.month == 1:
-            dt = dt.replace(year=current_year - 1)
-        
-        return int(dt.timestamp())
-    except Exception:
-        return None
+    """Converte timestamp syslog para Unix timestamp (com cache por segundo/hora)"""
+    return parse_syslog_timestamp(ts_str)
 
-def prepare_log_for_db(conn: sqlite3.Connection, parsed: Dict) -> Optional[Tuple]:
-    """Converte log parseado em tupla para inserção"""
+def normalize_log(parsed: Dict) -> Optional[Tuple]:
+    """
+    Converte log parseado em linha compacta, ainda com nomes nos campos de dicionário.
+    Não usa conexão: pode rodar nos workers do pool de parsing.
+    """
     try:
         # Timestamp
         ts = parse_timestamp(parsed['syslog_ts'])
         if ts is None:
             return None
         
-        # Normaliza strings em IDs
-        in_if_id = get_or_create_dict_id(conn, 'd_interfaces', parsed['interface_in'])
-        out_if_id = get_or_create_dict_id(conn, 'd_interfaces', parsed['interface_out'])
-        proto_id = get_or_create_dict_id(conn, 'd_protocols', parsed['proto'])
-        state_id = get_or_create_dict_id(conn, 'd_states', parsed.get('state', 'unknown'))
-        
-        if not all([in_if_id, out_if_id, proto_id]):
-            return None
-        
         # Converte IPs para inteiros
         src_ip = convert_ip_to_int(parsed['src_ip_priv'])
         dst_ip = convert_ip_to_int(parsed['dst_ip'])
@@ -339,12 +522,19 @@ def prepare_log_for_db(conn: sqlite3.Connection, parsed: Dict) -> Optional[Tuple
         if src_ip is None or dst_ip is None:
             return None
         
+        # Interfaces e protocolo são obrigatórios (IDs NOT NULL no schema)
+        interface_in = parsed['interface_in'].strip()
+        interface_out = parsed['interface_out'].strip()
+        proto = parsed['proto'].strip()
+        if not (interface_in and interface_out and proto):
+            return None
+        
         return (
             ts,
-            in_if_id,
-            out_if_id,
-            state_id,
-            proto_id,
+            interface_in,
+            interface_out,
+            parsed.get('state', 'unknown').strip(),
+            proto,
             src_ip,
             int(parsed['src_port_priv']),
             dst_ip,
@@ -358,24 +548,157 @@ def prepare_log_for_db(conn: sqlite3.Connection, parsed: Dict) -> Optional[Tuple
 
 # ==================== INSERÇÃO ====================
 
-def insert_log_batch(conn: sqlite3.Connection, batch: List[Tuple]) -> int:
-    """Insere lote de logs no DB"""
+def insert_log_batch(conn: sqlite3.Connection, batch: List[Tuple],
+                     offsets: Dict[str, Tuple[int, int]] = None,
+                     chunks: List[Tuple[int, int]] = None,
+                     caches: Dict[str, Dict[str, int]] = None) -> int:
+    """
+    Insere lote de logs no DB
+    
+    batch: linhas normalizadas (database.normalize_log), com nomes nos campos
+    de dicionário; os IDs são resolvidos na mesma transação.
+    offsets: {source: (segmento, byte_offset)} de onde retomar a entrada.
+    Gravados na MESMA transação do lote: após um crash o processador
+    retoma exatamente do último commit (sem perda nem duplicação).
+    chunks: [(seq do bloco de entrada, linhas no lote)] na ordem do lote.
+    caches: cache de dicionários da conexão (load_caches); padrão D_CACHE.
+    """
     if not batch:
         return 0
+    if caches is None:
+        caches = D_CACHE
     
     try:
         with conn:
+            batch, new_ids = resolve_dict_ids(conn, batch, caches)
+            
             conn.executemany("""
             INSERT INTO logs (
                 timestamp, interface_in_id, interface_out_id, state_id, protocol_id,
                 src_ip_priv, src_port_priv, dst_ip, dst_port, nat_ip_pub, nat_port_pub
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, batch)
+            
+            if chunks:
+                save_ingest_chunks(conn, chunks, len(batch))
+            
+            if offsets:
+                save_ingest_offsets(conn, offsets)
+                if CHUNK_SEQ_SOURCE in offsets:
+                    # Blocos antes do ponto de retomada nunca serão desfeitos
+                    conn.execute("DELETE FROM ingest_chunks WHERE chunk_seq < ?",
+                                 (offsets[CHUNK_SEQ_SOURCE][0],))
+        
+        # Só depois do commit: um rollback não deixa IDs inexistentes no cache
+        for table, ids in new_ids.items():
+            caches[table].update(ids)
         return len(batch)
     except Exception as e:
         print(f"❌ Erro ao inserir lote: {e}")
         return 0
 
+def save_ingest_chunks(conn: sqlite3.Connection, chunks: List[Tuple[int, int]], batch_size: int):
+    """Registra o primeiro ID de cada bloco do lote recém-inserido (chamar dentro da transação)"""
+    # IDs AUTOINCREMENT de um executemany são contíguos dentro da transação
+    first_id = conn.execute("SELECT MAX(id) FROM logs").fetchone()[0] - batch_size + 1
+    records = []
+    for chunk_seq, count in chunks:
+        records.append((chunk_seq, first_id))
+        first_id += count
+    conn.executemany("INSERT OR IGNORE INTO ingest_chunks (chunk_seq, first_id) VALUES (?, ?)", records)
+
+def save_ingest_offsets(conn: sqlite3.Connection, offsets: Dict[str, Tuple[int, int]]):
+    """Grava offsets de leitura (chamar dentro da transação do lote)"""
+    now = time.time()
+    conn.executemany("""
+    INSERT INTO ingest_offsets (source, segment, byte_offset, committed_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(source) DO UPDATE SET
+        segment = excluded.segment,
+        byte_offset = excluded.byte_offset,
+        committed_at = excluded.committed_at
+    """, [(source, segment, offset, now) for source, (segment, offset) in offsets.items()])
+
+def recent_log_db_paths(lookback_days: int = None) -> List[str]:
+    """
+    DBs de logs modificados nos últimos dias (pelo mtime do DB/WAL), do mais recente ao mais antigo.
+    Com roteamento por horário do evento, o último commit pode estar em qualquer dia.
+    """
+    if lookback_days is None:
+        lookback_days = config.INGEST_OFFSET_LOOKBACK_DAYS
+    
+    modified = []
+    for name in os.listdir(config.COLD_STORAGE_DIR):
+        if parse_log_db_name(name) is None:
+            continue  # users.db, dictionary.db, temporários...
+        path = os.path.join(config.COLD_STORAGE_DIR, name)
+        mtimes = [os.path.getmtime(p) for p in (path, f"{path}-wal") if os.path.exists(p)]
+        if mtimes:
+            modified.append((max(mtimes), path))
+    
+    if not modified:
+        return []
+    modified.sort(reverse=True)
+    newest = modified[0][0]
+    return [path for mtime, path in modified if mtime >= newest - lookback_days * 86400]
+
+def load_ingest_offsets(lookback_days: int = None) -> Dict[str, Tuple[int, int]]:
+    """Offsets commitados mais recentes, procurando nos DBs modificados nos últimos dias"""
+    latest = {}  # source -> (committed_at, segment, offset)
+    
+    for db_path in recent_log_db_paths(lookback_days):
+        conn = get_db_connection(db_path)
+        if not conn:
+            continue
+        
+        try:
+            cursor = conn.execute("SELECT source, segment, byte_offset, committed_at FROM ingest_offsets")
+            for row in cursor:
+                current = latest.get(row['source'])
+                if current is None or row['committed_at'] > current[0]:
+                    latest[row['source']] = (row['committed_at'], row['segment'], row['byte_offset'])
+        except sqlite3.OperationalError:
+            pass  # DB antigo sem a tabela
+        finally:
+            conn.close()
+    
+    return {source: (segment, offset) for source, (_, segment, offset) in latest.items()}
+
+def rollback_uncommitted_chunks(chunk_seq: int, lookback_days: int = None) -> int:
+    """
+    Apaga linhas de blocos a partir de chunk_seq (o ponto de retomada).
+    Um lote de um dia pode ter sido commitado enquanto um bloco mais antigo
+    ainda esperava no lote de outro dia; esses blocos serão relidos e gravados
+    de novo, então a cópia antiga sai. Retorna quantas linhas foram apagadas.
+    """
+    removed = 0
+    for db_path in recent_log_db_paths(lookback_days):
+        conn = get_db_connection(db_path)
+        if not conn:
+            continue
+        
+        try:
+            with conn:
+                first_id = conn.execute("SELECT MIN(first_id) FROM ingest_chunks WHERE chunk_seq >= ?",
+                                        (chunk_seq,)).fetchone()[0]
+                if first_id is not None:
+                    removed += conn.execute("DELETE FROM logs WHERE id >= ?", (first_id,)).rowcount
+                    conn.execute("DELETE FROM ingest_chunks WHERE chunk_seq >= ?", (chunk_seq,))
+        except sqlite3.OperationalError:
+            pass  # DB antigo sem a tabela
+        finally:
+            conn.close()
+    
+    return removed
+
+def has_pending_chunks(conn: sqlite3.Connection, chunk_seq: int) -> bool:
+    """Processador tem blocos a partir de chunk_seq gravados neste DB (ainda sujeitos a rollback)"""
+    try:
+        return conn.execute("SELECT 1 FROM ingest_chunks WHERE chunk_seq >= ? LIMIT 1",
+                            (chunk_seq,)).fetchone() is not None
+    except sqlite3.OperationalError:
+        return False  # DB antigo sem a tabela
+
 def update_processor_stats(conn: sqlite3.Connection, key: str, value: str):
     """Atualiza estatística do processador"""
     try:
@@ -0,0 +1,390 @@
+# app/hot_buffer.py
+# Buffer HOT (arquivo único ou segmentos hot_logs.000123.raw): leitores e coleta de lixo
+
+import os
+import re
+import fcntl
+from typing import List, Optional, Tuple
+from app import config
+
+# ==================== SEGMENTOS ====================
+SEGMENT_REGEX = re.compile(r'^hot_logs\.(\d{6,})\.raw$')
+
+def get_segment_path(seq: int) -> str:
+    """Caminho do segmento de número seq"""
+    return os.path.join(config.HOT_STORAGE_DIR, f"hot_logs.{seq:06d}.raw")
+
+def list_segments() -> List[int]:
+    """Lista números de segmentos existentes (ordem crescente)"""
+    segments = []
+    try:
+        for filename in os.listdir(config.HOT_STORAGE_DIR):
+            match = SEGMENT_REGEX.match(filename)
+            if match:
+                segments.append(int(match.group(1)))
+    except FileNotFoundError:
+        pass
+    segments.sort()
+    return segments
+
+def get_buffer_size_bytes() -> int:
+    """Tamanho total do buffer HOT em disco (arquivo único ou segmentos)"""
+    total = 0
+    if os.path.exists(config.HOT_LOG_BUFFER_FILE):
+        total += os.path.getsize(config.HOT_LOG_BUFFER_FILE)
+    for seq in list_segments():
+        try:
+            total += os.path.getsize(get_segment_path(seq))
+        except OSError:
+            pass
+    return total
+
+def _open_lock_file() -> int:
+    """Arquivo de lock compartilhado entre escritores e o leitor"""
+    return os.open(os.path.join(config.HOT_STORAGE_DIR, ".hot_logs.lock"),
+                   os.O_RDWR | os.O_CREAT, 0o644)
+
+# ==================== ESCRITOR ====================
+
+class SegmentWriter:
+    """
+    Escritor de segmentos de tamanho fixo (vários processos podem escrever).
+
+    Cada write() acontece sob LOCK_SH; a troca de segmento sob LOCK_EX.
+    Assim o leitor, ao pegar LOCK_EX, sabe que nenhum write está em voo
+    e que todo write futuro já irá para o segmento mais novo.
+    """
+
+    def __init__(self, segment_size: int = None):
+        self.segment_size = segment_size or config.HOT_SEGMENT_SIZE_BYTES
+        os.makedirs(config.HOT_STORAGE_DIR, exist_ok=True)
+        self.lock_fd = _open_lock_file()
+        self.seq = None
+        self.fd = None
+
+        segments = list_segments()
+        self._open_segment(segments[-1] if segments else 0)
+
+    def _open_segment(self, seq: int):
+        if self.fd is not None:
+            os.close(self.fd)
+        self.seq = seq
+        self.fd = os.open(get_segment_path(seq), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _roll(self):
+        """Cria o próximo segmento (se outro escritor ainda não criou)"""
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+        try:
+            next_seq = self.seq + 1
+            if not os.path.exists(get_segment_path(next_seq)):
+                open(get_segment_path(next_seq), 'ab').close()
+            self._open_segment(next_seq)
+        finally:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def write(self, payload: bytes):
+        """Grava um lote de linhas (terminado em \\n) no segmento atual"""
+        while True:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_SH)
+            try:
+                # Outro escritor já abriu segmento novo (ou o atual foi coletado)? Segue para o mais novo
+                st = os.fstat(self.fd)
+                if st.st_nlink == 0 or os.path.exists(get_segment_path(self.seq + 1)):
+                    segments = list_segments()
+                    self._open_segment(segments[-1] if segments else self.seq + 1)
+                    st = os.fstat(self.fd)
+
+                if st.st_size < self.segment_size:
+                    view = memoryview(payload)
+                    while view:
+                        written = os.write(self.fd, view)
+                        view = view[written:]
+                    return
+            finally:
+                fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+            # Segmento cheio
+            self._roll()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        os.close(self.lock_fd)
+
+# ==================== CHECKPOINT LEGADO ====================
+# O offset oficial agora fica no DB diário (ver database.insert_log_batch).
+# Estes arquivos só são lidos uma vez para migrar instalações antigas.
+
+def load_legacy_checkpoint() -> Optional[Tuple[int, int]]:
+    """Lê checkpoint antigo: .processor.checkpoint (segmentos) ou offset do Pygtail"""
+    try:
+        if config.HOT_BUFFER_SEGMENTED:
+            with open(config.HOT_CHECKPOINT_FILE) as f:
+                seq, offset = f.read().split()
+        else:
+            # Formato do Pygtail: "inode\noffset\n"
+            with open(config.PROCESSOR_OFFSET_FILE) as f:
+                seq, offset = f.read().split()[:2]
+        return int(seq), int(offset)
+    except (OSError, ValueError):
+        return None
+
+# ==================== LEITORES ====================
+
+class _ChunkReader:
+    """Leitura em blocos grandes com readinto() em buffer pré-alocado"""
+
+    def _init_reader(self):
+        self.file = None
+        self.offset = 0
+        self._buf = bytearray(config.HOT_READ_MAX_BYTES)
+        self._view = memoryview(self._buf)
+
+    def _read_chunk(self, max_bytes: int) -> bytes:
+        """Lê linhas completas a partir do offset (no máximo max_bytes, ou uma linha maior que isso)"""
+        size = min(max_bytes, len(self._buf))
+        n = self.file.readinto(self._view[:size])
+        if not n:
+            return b''
+
+        cut = self._buf.rfind(b'\n', 0, n) + 1
+        if not cut and n == size:
+            # Nenhuma linha completa no bloco: estende a leitura até o buffer inteiro
+            n += self.file.readinto(self._view[n:]) or 0
+            cut = self._buf.find(b'\n', 0, n) + 1
+            if not cut and n == len(self._buf):
+                return self._read_long_line()
+
+        if cut < n:
+            # Linha incompleta: devolve para a próxima leitura
+            self.file.seek(self.offset + cut)
+        self.offset += cut
+        return bytes(self._view[:cut])
+
+    def _read_long_line(self) -> bytes:
+        """Linha maior que o buffer: entrega o início dela e descarta o resto até o \\n"""
+        head = bytes(self._buf)
+        size = len(head)
+        while True:
+            block = self.file.read(64 * 1024)
+            if not block:
+                # Fim da linha ainda não foi escrito: tenta de novo na próxima leitura
+                self.file.seek(self.offset)
+                return b''
+            end = block.find(b'\n')
+            if end >= 0:
+                size += end + 1
+                break
+            size += len(block)
+
+        print(f"⚠️ Linha de {size} bytes excede HOT_READ_MAX_BYTES: truncada em {len(head)} bytes")
+        self.offset += size
+        self.file.seek(self.offset)
+        return head + b'\n'
+
+    @staticmethod
+    def _decode(chunks: List[bytes]) -> List[str]:
+        if not chunks:
+            return []
+        return b''.join(chunks).decode('utf-8', errors='ignore').splitlines()
+
+class SegmentTailer(_ChunkReader):
+    """Lê os segmentos em ordem a partir de um checkpoint (seek O(1) no restart)"""
+
+    def __init__(self, checkpoint: Optional[Tuple[int, int]] = None):
+        self._init_reader()
+        self.lock_fd = _open_lock_file()
+
+        if checkpoint is None:
+            segments = list_segments()
+            checkpoint = (segments[0], 0) if segments else (0, 0)
+
+        self.seq, self.offset = checkpoint
+
+        # Checkpoint aponta para segmento já coletado? Começa do mais antigo existente
+        segments = list_segments()
+        if segments and self.seq < segments[0]:
+            print(f"⚠️ Segmento {self.seq} não existe mais. Retomando de {segments[0]}")
+            self.seq, self.offset = segments[0], 0
+
+    def position(self) -> Tuple[int, int]:
+        """Posição atual (após a última linha entregue)"""
+        return self.seq, self.offset
+
+    def _open(self) -> bool:
+        if self.file is None:
+            try:
+                self.file = open(get_segment_path(self.seq), 'rb', buffering=0)
+                self.file.seek(self.offset)
+            except FileNotFoundError:
+                return False
+        return True
+
+    def _advance(self) -> bool:
+        """Passa para o próximo segmento se o atual estiver finalizado"""
+        if not os.path.exists(get_segment_path(self.seq + 1)):
+            return False
+
+        # Garante que nenhum escritor ainda está gravando no segmento atual
+        fcntl.flock(self.lock_fd, fcntl.LOCK_EX)
+        fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+        if os.fstat(self.file.fileno()).st_size > self.offset:
+            return False  # Ainda há dados finais para ler
+
+        self.file.close()
+        self.file = None
+        self.seq += 1
+        self.offset = 0
+        return True
+
+    def read_lines(self, max_bytes: int = None) -> List[str]:
+        """Lê até max_bytes de linhas disponíveis (atravessando segmentos)"""
+        if max_bytes is None:
+            max_bytes = config.HOT_READ_MAX_BYTES
+
+        chunks = []
+        remaining = max_bytes
+
+        while remaining > 0 and self._open():
+            data = self._read_chunk(remaining)
+            if data:
+                chunks.append(data)
+                remaining -= len(data)
+                continue
+            if not self._advance():
+                break
+
+        return self._decode(chunks)
+
+    def pending_bytes(self) -> int:
+        """Bytes ainda não lidos (backlog)"""
+        total = 0
+        for seq in list_segments():
+            if seq < self.seq:
+                continue
+            try:
+                size = os.path.getsize(get_segment_path(seq))
+            except OSError:
+                continue
+            total += size - self.offset if seq == self.seq else size
+        return total
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        os.close(self.lock_fd)
+
+class FileTailer(_ChunkReader):
+    """
+    Lê o arquivo único hot_logs.raw (escrito pelo rsyslog ou receptor legado).
+
+    A posição é (inode, offset). Em rotação (inode novo) termina de ler o
+    arquivo antigo pelo descritor aberto antes de trocar; em truncamento
+    (copytruncate) volta ao início.
+    """
+
+    def __init__(self, path: str = None, checkpoint: Optional[Tuple[int, int]] = None):
+        self._init_reader()
+        self.path = path or config.HOT_LOG_BUFFER_FILE
+        self.inode = None
+
+        if self._open() and checkpoint:
+            inode, offset = checkpoint
+            size = os.fstat(self.file.fileno()).st_size
+            if inode == self.inode and offset <= size:
+                self.file.seek(offset)
+                self.offset = offset
+            else:
+                print(f"⚠️ Checkpoint não corresponde a {self.path} (rotacionado?). Lendo desde o início")
+
+    def position(self) -> Tuple[int, int]:
+        """Posição atual (após a última linha entregue)"""
+        return self.inode or 0, self.offset
+
+    def _open(self) -> bool:
+        if self.file is None:
+            try:
+                self.file = open(self.path, 'rb', buffering=0)
+            except FileNotFoundError:
+                return False
+            self.inode = os.fstat(self.file.fileno()).st_ino
+            self.offset = 0
+        return True
+
+    def _check_rotation(self) -> bool:
+        """No EOF: detecta rotação/truncamento. Retorna True se há algo novo a ler"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+
+        if st.st_ino != self.inode:
+            # Arquivo antigo já lido até o fim: passa para o novo
+            self.file.close()
+            self.file = None
+            return self._open()
+
+        if st.st_size < self.offset:
+            print(f"⚠️ {self.path} foi truncado. Relendo desde o início")
+            self.file.seek(0)
+            self.offset = 0
+            return True
+
+        return False
+
+    def read_lines(self, max_bytes: int = None) -> List[str]:
+        """Lê até max_bytes de linhas disponíveis"""
+        if max_bytes is None:
+            max_bytes = config.HOT_READ_MAX_BYTES
+
+        if not self._open():
+            return []
+
+        chunks = []
+        remaining = max_bytes
+
+        while remaining > 0:
+            data = self._read_chunk(remaining)
+            if data:
+                chunks.append(data)
+                remaining -= len(data)
+                continue
+            if not self._check_rotation():
+                break
+
+        return self._decode(chunks)
+
+    def pending_bytes(self) -> int:
+        """Bytes ainda não lidos (backlog)"""
+        if self.file is None:
+            return 0
+        return max(0, os.fstat(self.file.fileno()).st_size - self.offset)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def open_tailer(checkpoint: Optional[Tuple[int, int]] = None):
+    """Leitor do buffer HOT conforme o modo configurado"""
+    if config.HOT_BUFFER_SEGMENTED:
+        return SegmentTailer(checkpoint)
+    return FileTailer(checkpoint=checkpoint)
+
+# ==================== COLETA DE LIXO ====================
+
+def collect_segments(committed_seq: int) -> int:
+    """Remove segmentos totalmente commitados (anteriores ao segmento do checkpoint)"""
+    removed = 0
+    for seq in list_segments():
+        if seq >= committed_seq:
+            break
+        try:
+            os.remove(get_segment_path(seq))
+            removed += 1
+        except OSError as e:
+            print(f"⚠️ Erro ao remover segmento {seq}: {e}")
+    return removed
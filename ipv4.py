@@ -0,0 +1,75 @@
+# app/ipv4.py
+# Conversão rápida de IPv4 string <-> inteiro (unitária e por coluna)
+#
+# ipaddress.IPv4Address monta um objeto e valida octeto a octeto em Python
+# (~4µs por campo). inet_pton/inet_ntoa fazem o mesmo em C com as mesmas
+# regras (4 octetos decimais, sem zero à esquerda, sem espaços), e os IPs
+# quentes (pool de NAT, clientes ativos) ficam em cache LRU.
+
+import socket
+import ipaddress
+from functools import lru_cache
+from typing import List, Optional
+from app import config
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_AF_INET = socket.AF_INET
+_inet_pton = socket.inet_pton
+_inet_ntoa = socket.inet_ntoa
+
+def _ip_to_int_slow(ip_str) -> Optional[int]:
+    """Conversão original via ipaddress (entradas que não são str ASCII)"""
+    try:
+        return int(ipaddress.IPv4Address(ip_str))
+    except (ipaddress.AddressValueError, ValueError):
+        return None
+
+def _int_to_ip_slow(ip_int) -> Optional[str]:
+    """Conversão original via ipaddress (entradas que não são int)"""
+    try:
+        return str(ipaddress.IPv4Address(ip_int))
+    except (ipaddress.AddressValueError, ValueError):
+        return None
+
+@lru_cache(maxsize=config.IP_CACHE_SIZE)
+def ip_to_int(ip_str: str) -> Optional[int]:
+    """Converte IP string para inteiro (None se vazio ou inválido)"""
+    if not ip_str:
+        return None
+    try:
+        return int.from_bytes(_inet_pton(_AF_INET, ip_str), 'big')
+    except OSError:
+        return None
+    except (TypeError, ValueError):
+        return _ip_to_int_slow(ip_str)
+
+@lru_cache(maxsize=config.IP_CACHE_SIZE, typed=True)
+def int_to_ip(ip_int: int) -> Optional[str]:
+    """Converte IP inteiro para string (None se zero/vazio ou fora da faixa)"""
+    if not ip_int:
+        return None
+    if type(ip_int) is int and 0 < ip_int <= 0xFFFFFFFF:
+        return _inet_ntoa(ip_int.to_bytes(4, 'big'))
+    return _int_to_ip_slow(ip_int)
+
+def ips_to_ints(values) -> List[Optional[int]]:
+    """Converte uma coluna de IPs string; cada IP distinto é convertido uma vez"""
+    distinct = {value: ip_to_int(value) for value in set(values)}
+    return [distinct[value] for value in values]
+
+def ints_to_ips(values) -> List[Optional[str]]:
+    """
+    Converte uma coluna de IPs inteiros; cada IP distinto é convertido uma vez.
+    Arrays NumPy são deduplicados com np.unique, sem passar valor a valor pelo Python.
+    """
+    if np is not None and isinstance(values, np.ndarray):
+        distinct, inverse = np.unique(values, return_inverse=True)
+        rendered = [int_to_ip(value) for value in distinct.tolist()]
+        return [rendered[i] for i in inverse.ravel().tolist()]
+
+    distinct = {value: int_to_ip(value) for value in set(values)}
+    return [distinct[value] for value in values]
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# log_importer.py
+# Importação em massa de logs crus (arquivos do rsyslog, rotações .gz) para os DBs diários
+#
+# Duas fases:
+#   1. Parsing em paralelo (mesmo filtro/normalização do processador); as linhas são
+#      particionadas por dia em arquivos temporários no disco COLD.
+#   2. Carga de cada dia em paralelo (um processo por DB): transações grandes,
+#      sincronização relaxada e, em DBs novos, índices criados só no final.
+
+import os
+import sys
+import time
+import gzip
+import pickle
+import shutil
+import signal
+import tempfile
+import multiprocessing
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app import config, database, timestamps, catalog, bloom
+from app.processor_service import parse_chunk
+
+# ==================== LEITURA ====================
+
+def read_chunks(path: str, chunk_bytes: int = None) -> Iterator[List[str]]:
+    """Lê um arquivo cru ou gzip (detectado pelo conteúdo) em blocos de linhas"""
+    if chunk_bytes is None:
+        chunk_bytes = config.IMPORT_CHUNK_BYTES
+
+    with open(path, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+
+    with (gzip.open(path, 'rb') if is_gzip else open(path, 'rb')) as f:
+        tail = b''
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                break
+            data = tail + data
+            cut = data.rfind(b'\n') + 1
+            tail = data[cut:]
+            if cut:
+                yield data[:cut].decode('utf-8', errors='ignore').splitlines()
+        if tail:
+            yield tail.decode('utf-8', errors='ignore').splitlines()
+
+def reference_time(path: str, year: int = None) -> float:
+    """
+    Data de referência para o ano dos timestamps syslog (que não têm ano).
+    Padrão: mtime do arquivo (rotação logo após a última linha, cobre a virada
+    dezembro/janeiro). --year fixa o ano inteiro.
+    """
+    if year:
+        return datetime(year, 12, 31, 23, 59, 59).timestamp()
+    return os.path.getmtime(path)
+
+# ==================== FASE 1: PARSING ====================
+
+_worker_reference = [None]
+
+def _init_worker():
+    """Workers ignoram Ctrl+C: o processo principal encerra o pool"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def parse_task(reference_ts: float, lines: List[str]) -> Tuple[Dict[str, List[Tuple]], int, int]:
+    """Parseia um bloco e agrupa por DB do dia (ou shard). Retorna ({DB: linhas}, falhas, filtradas)"""
+    if _worker_reference[0] != reference_ts:
+        timestamps.set_reference_time(reference_ts)
+        _worker_reference[0] = reference_ts
+
+    rows, noise_hits, failed = parse_chunk(lines)
+
+    by_day = {}
+    start = end = 0
+    for row in rows:
+        if not start <= row[0] < end:
+            db_path, start, end = database.partition_bounds(row[0])
+            current = by_day.setdefault(db_path, [])
+        current.append(row)
+    return by_day, failed, sum(noise_hits.values())
+
+class DaySpool:
+    """Partições por DB do dia (ou shard) em arquivos temporários (blocos de linhas em pickle)"""
+
+    def __init__(self, spool_dir: str):
+        self.spool_dir = spool_dir
+        self.files = {}
+        self.counts = {}
+
+    def path(self, db_path: str) -> str:
+        return os.path.join(self.spool_dir, f"{os.path.basename(db_path)}.spool")
+
+    def add(self, by_day: Dict[str, List[Tuple]]):
+        for day, rows in by_day.items():
+            f = self.files.get(day)
+            if f is None:
+                f = self.files[day] = open(self.path(day), 'wb')
+            pickle.dump(rows, f, pickle.HIGHEST_PROTOCOL)
+            self.counts[day] = self.counts.get(day, 0) + len(rows)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+
+def read_spool(path: str) -> Iterator[List[Tuple]]:
+    """Blocos de linhas de uma partição"""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+def parse_files(paths: List[str], spool: DaySpool, pool, workers: int, year: int = None) -> Dict[str, int]:
+    """Fase 1: lê e parseia os arquivos, gravando as partições por dia"""
+    stats = {'lines': 0, 'rows': 0, 'failed': 0, 'filtered': 0}
+    pending = deque()
+
+    def consume(result):
+        by_day, failed, filtered = result
+        spool.add(by_day)
+        stats['rows'] += sum(len(rows) for rows in by_day.values())
+        stats['failed'] += failed
+        stats['filtered'] += filtered
+
+    for path in paths:
+        reference_ts = reference_time(path, year)
+        print(f"📄 {path} (ano de referência: {datetime.fromtimestamp(reference_ts).year})")
+
+        for lines in read_chunks(path):
+            stats['lines'] += len(lines)
+            if pool is None:
+                consume(parse_task(reference_ts, lines))
+                continue
+
+            # Até 2 blocos por worker em voo (memória limitada em arquivos grandes)
+            pending.append(pool.apply_async(parse_task, (reference_ts, lines)))
+            if len(pending) >= workers * 2:
+                consume(pending.popleft().get())
+
+    while pending:
+        consume(pending.popleft().get())
+
+    spool.close()
+    return stats
+
+# ==================== FASE 2: CARGA ====================
+
+def _resume_seq() -> int:
+    """Seq do bloco no ponto de retomada do processador"""
+    return database.load_ingest_offsets().get(database.CHUNK_SEQ_SOURCE, (0, 0))[0]
+
+def insert_rows(conn, db_path: str, batch: List[Tuple], caches: Dict, resume: List[int],
+                blooms: bloom.BloomUpdater) -> int:
+    """
+    Insere um lote (uma transação) fora do alcance do rollback do processador.
+
+    Se o processador tem blocos ainda não confirmados neste DB (linhas atrasadas
+    chegando agora), um restart dele apaga tudo a partir desses blocos - inclusive
+    o que fosse importado depois. Nesse caso espera ele confirmar.
+    """
+    deadline = time.time() + config.IMPORT_PROCESSOR_WAIT_SEC
+    while True:
+        if not database.begin_log_write(conn, db_path):
+            return 0
+        if not database.has_pending_chunks(conn, resume[0]):
+            # IPs nos filtros de Bloom antes do commit (insert_log_batch commita a transação aberta)
+            blooms.add(db_path, batch)
+            return database.insert_log_batch(conn, batch, caches=caches)
+        conn.rollback()
+
+        if time.time() > deadline:
+            print(f"❌ Processador com linhas não confirmadas há {config.IMPORT_PROCESSOR_WAIT_SEC}s")
+            return 0
+        time.sleep(1)
+        resume[0] = _resume_seq()
+
+def transaction_batches(spool_path: str) -> Iterator[List[Tuple]]:
+    """Blocos da partição agrupados em lotes de IMPORT_TRANSACTION_ROWS linhas"""
+    batch = []
+    for rows in read_spool(spool_path):
+        batch.extend(rows)
+        if len(batch) >= config.IMPORT_TRANSACTION_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def load_day(db_path: str, spool_path: str) -> Tuple[str, int, float, Optional[str]]:
+    """Fase 2: carrega a partição de um dia (ou shard) no seu DB. Retorna (DB, inseridas, segundos, erro)"""
+    start = time.perf_counter()
+    conn = database.get_db_connection(db_path)
+    if conn is None:
+        return db_path, 0, 0.0, "falha ao abrir o DB"
+
+    inserted = 0
+    error = None
+    is_new = False
+    blooms = bloom.BloomUpdater()  # IPs novos vão para os filtros ao fim da carga
+    try:
+        database.create_log_schema(conn, db_path)
+        catalog.register(db_path)
+
+        # Carga em massa: sem fsync por transação e cache grande (o WAL continua:
+        # o DB pode estar sendo lido pela interface web)
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -262144")  # 256MB
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+        # DB novo: índices só no final (criar de uma vez é bem mais rápido que mantê-los)
+        is_new = conn.execute("SELECT 1 FROM logs LIMIT 1").fetchone() is None
+        if is_new:
+            database.drop_log_indexes(conn)
+
+        caches = database.load_caches(conn)
+        resume = [_resume_seq()]
+        counts = catalog.CatalogDeltas()
+
+        for batch in transaction_batches(spool_path):
+            done = insert_rows(conn, db_path, batch, caches, resume, blooms)
+            if not done:
+                error = "falha ao inserir lote"
+                break
+            inserted += done
+            counts.add(db_path, batch)
+            counts.flush()
+    except Exception as e:
+        error = str(e)
+    finally:
+        if is_new:
+            # Também após uma falha: o DB não fica sem índices
+            with conn:
+                database.create_log_indexes(conn)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        blooms.close()
+        catalog.update_state(db_path)  # Tamanho com os índices
+
+    return db_path, inserted, time.perf_counter() - start, error
+
+def _load_day_task(args: Tuple[str, str]):
+    return load_day(*args)
+
+# ==================== IMPORTAÇÃO ====================
+
+def import_files(paths: List[str], workers: int = None, year: int = None) -> Dict[str, int]:
+    """Importa arquivos de log crus. Retorna estatísticas"""
+    if workers is None:
+        workers = config.IMPORT_WORKERS
+
+    spool_dir = tempfile.mkdtemp(prefix='.import-', dir=config.COLD_STORAGE_DIR)
+    pool = multiprocessing.Pool(workers, initializer=_init_worker) if workers > 1 else None
+
+    try:
+        # Fase 1: parsing
+        start = time.perf_counter()
+        spool = DaySpool(spool_dir)
+        stats = parse_files(paths, spool, pool, workers, year)
+        parse_sec = time.perf_counter() - start
+        print(f"🔎 Parsing: {stats['lines']:,} linhas em {parse_sec:.1f}s "
+              f"({stats['lines'] / max(parse_sec, 1e-9):,.0f} linhas/s) - "
+              f"{stats['rows']:,} válidas, {stats['failed']:,} falhas, {stats['filtered']:,} filtradas")
+
+        # Fase 2: carga (dias maiores primeiro, para não sobrar um dia grande no fim)
+        start = time.perf_counter()
+        tasks = [(db_path, spool.path(db_path)) for db_path in sorted(spool.counts, key=spool.counts.get, reverse=True)]
+        results = pool.imap_unordered(_load_day_task, tasks) if pool else map(_load_day_task, tasks)
+
+        stats['inserted'] = 0
+        stats['failed_days'] = 0
+        for db_path, inserted, elapsed, error in results:
+            stats['inserted'] += inserted
+            name = os.path.basename(db_path)
+            if error:
+                stats['failed_days'] += 1
+                print(f"❌ {name}: {error} ({inserted:,} de {spool.counts[db_path]:,} linhas gravadas)")
+            else:
+                print(f"💾 {name}: {inserted:,} linhas em {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} linhas/s)")
+
+        load_sec = time.perf_counter() - start
+        stats['rows_per_sec'] = round(stats['inserted'] / max(parse_sec + load_sec, 1e-9))
+        print(f"✅ Importação: {stats['inserted']:,} linhas em {len(tasks)} DB(s), "
+              f"{parse_sec + load_sec:.1f}s ({stats['rows_per_sec']:,} linhas/s; carga {load_sec:.1f}s)")
+        return stats
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+# ==================== MAIN ====================
+
+def main():
+    """Ponto de entrada (comando megalog-import)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importação em massa de logs crus - MEGA LOG")
+    parser.add_argument('files', nargs='+', help='Arquivos de log do rsyslog (texto ou .gz)')
+    parser.add_argument('--workers', type=int, default=config.IMPORT_WORKERS,
+                        help='Processos de parsing e de carga (1 = tudo no processo principal)')
+    parser.add_argument('--year', type=int,
+                        help='Ano dos timestamps (padrão: deduzido da data de modificação de cada arquivo)')
+    args = parser.parse_args()
+
+    missing = [path for path in args.files if not os.path.isfile(path)]
+    if missing:
+        print(f"❌ Arquivo(s) não encontrado(s): {', '.join(missing)}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"  {config.SYSTEM_NAME} - Importação de Logs")
+    print(f"  Versão: {config.SYSTEM_VERSION}")
+    print("=" * 60)
+
+    database.initialize_databases()
+
+    try:
+        stats = import_files(args.files, workers=args.workers, year=args.year)
+    except KeyboardInterrupt:
+        print("\n⚠️ Importação interrompida")
+        sys.exit(1)
+
+    if stats['failed_days']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
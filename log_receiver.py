@@ -3,12 +3,16 @@
 # Receptor de logs via UDP (Syslog) - Escuta logs do Mikrotik
 
 import socket
+import select
 import sys
 import signal
 import time
 import os
+import multiprocessing
 from datetime import datetime
 from app import config
+from app.ring_buffer import RingBuffer, get_ring_path
+from app.hot_buffer import SegmentWriter, get_buffer_size_bytes
 
 # ==================== CONFIGURAÇÃO ====================
 SYSLOG_HOST = "0.0.0.0"  # Escuta em todas as interfaces
@@ -146,17 +150,262 @@ class SyslogReceiver:
         if self.stats['last_log']:
             print(f"   Último log:     {self.stats['last_log']}")
         
-        # Tamanho do arquivo
-        if os.path.exists(self.output_file):
-            size_mb = os.path.getsize(self.output_file) / (1024**2)
-            print(f"   Arquivo:        {size_mb:.2f} MB")
+        # Tamanho do buffer em disco
+        size_mb = get_buffer_size_bytes() / (1024**2)
+        print(f"   Buffer HOT:     {size_mb:.2f} MB")
         
         print()
 
+# ==================== RECEPTOR EM LOTE (MULTI-SOCKET) ====================
+
+def create_udp_socket(host: str, port: int, reuse_port: bool = False,
+                      rcvbuf: int = None) -> socket.socket:
+    """Cria socket UDP não-bloqueante, opcionalmente com SO_REUSEPORT e SO_RCVBUF grande"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    
+    if reuse_port:
+        # Kernel distribui os datagramas entre os sockets (hash do 4-tuple)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    
+    if rcvbuf:
+        try:
+            # SO_RCVBUFFORCE ignora net.core.rmem_max (requer CAP_NET_ADMIN)
+            sock.setsockopt(socket.SOL_SOCKET, getattr(socket, 'SO_RCVBUFFORCE', 33), rcvbuf)
+        except (OSError, AttributeError):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+class BatchedReceiverWorker:
+    """
+    Worker de recepção em lote: drena vários datagramas por acordada
+    e grava todos no buffer HOT com uma única chamada write()
+    """
+    
+    def __init__(self, worker_id: int, host=SYSLOG_HOST, port=SYSLOG_PORT,
+                 output_file: str = None, rcvbuf: int = None, batch_max: int = None):
+        self.worker_id = worker_id
+        self.host = host
+        self.port = port
+        self.output_file = output_file or config.HOT_LOG_BUFFER_FILE
+        self.rcvbuf = rcvbuf or config.RECEIVER_RCVBUF_BYTES
+        self.batch_max = batch_max or config.RECEIVER_BATCH_MAX
+        self.socket = None
+        self.fd = None
+        self.segment_writer = None
+        self.ring = None
+        self.stats = {
+            'received': 0,
+            'written': 0,
+            'spilled': 0,
+            'errors': 0,
+            'batches': 0,
+            'started_at': None,
+            'last_log': None
+        }
+    
+    def drain(self) -> list:
+        """Lê todos os datagramas pendentes (até batch_max) sem bloquear"""
+        lines = []
+        recv = self.socket.recv
+        
+        for _ in range(self.batch_max):
+            try:
+                data = recv(BUFFER_SIZE)
+            except BlockingIOError:
+                break
+            
+            self.stats['received'] += 1
+            line = data.strip()
+            
+            # Ignora linhas vazias
+            if not line:
+                continue
+            
+            # Só paga o custo de decode quando há bytes não-ASCII
+            if not line.isascii():
+                line = line.decode('utf-8', errors='ignore').encode('utf-8')
+            
+            lines.append(line)
+        
+        return lines
+    
+    def write_batch(self, lines: list):
+        """Grava o lote inteiro com um único write() (O_APPEND é atômico entre workers)"""
+        payload = b"\n".join(lines) + b"\n"
+        
+        # Caminho zero-copy: publica no ring; disco só se o processador atrasar
+        if self.ring is not None:
+            if self.ring.publish(payload):
+                self.stats['written'] += len(lines)
+                self.stats['batches'] += 1
+                return
+            self.stats['spilled'] += len(lines)
+        
+        if self.segment_writer is not None:
+            self.segment_writer.write(payload)
+        else:
+            view = memoryview(payload)
+            while view:
+                written = os.write(self.fd, view)
+                view = view[written:]
+        
+        self.stats['written'] += len(lines)
+        self.stats['batches'] += 1
+    
+    def start(self):
+        """Loop do worker"""
+        global running
+        
+        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        
+        try:
+            self.socket = create_udp_socket(self.host, self.port, reuse_port=True, rcvbuf=self.rcvbuf)
+        except Exception as e:
+            print(f"❌ [worker {self.worker_id}] Erro ao criar socket: {e}")
+            return False
+        
+        if config.HOT_BUFFER_SEGMENTED and self.output_file == config.HOT_LOG_BUFFER_FILE:
+            self.segment_writer = SegmentWriter()
+        else:
+            self.fd = os.open(self.output_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.stats['started_at'] = datetime.now()
+        
+        if config.USE_SHM_RING:
+            try:
+                self.ring = RingBuffer(get_ring_path(self.worker_id), create=True)
+                print(f"🔗 [worker {self.worker_id}] Publicando no ring {self.ring.path}")
+            except Exception as e:
+                print(f"⚠️ [worker {self.worker_id}] Ring indisponível, usando só disco: {e}")
+        
+        rcvbuf_real = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        print(f"🎧 [worker {self.worker_id}] Escutando {self.host}:{self.port} "
+              f"(SO_RCVBUF={rcvbuf_real / (1024**2):.1f} MB, lote={self.batch_max})")
+        
+        poller = select.poll()
+        poller.register(self.socket, select.POLLIN)
+        last_stats_time = time.time()
+        
+        try:
+            while running:
+                try:
+                    # Aguarda dados (timeout de 1s para checar sinal de parada)
+                    if not poller.poll(1000):
+                        continue
+                    
+                    lines = self.drain()
+                    if lines:
+                        self.write_batch(lines)
+                        self.stats['last_log'] = time.time()
+                    
+                    if time.time() - last_stats_time >= 60:
+                        self.print_stats()
+                        last_stats_time = time.time()
+                
+                except InterruptedError:
+                    continue
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    print(f"❌ [worker {self.worker_id}] Erro no loop: {e}")
+                    time.sleep(1)
+        finally:
+            self.print_stats()
+            if self.segment_writer is not None:
+                self.segment_writer.close()
+            else:
+                os.close(self.fd)
+            self.socket.close()
+            if self.ring is not None:
+                self.ring.close()
+        
+        return True
+    
+    def print_stats(self):
+        """Imprime estatísticas do worker"""
+        uptime = None
+        if self.stats['started_at']:
+            uptime = datetime.now() - self.stats['started_at']
+        
+        avg_batch = self.stats['written'] / self.stats['batches'] if self.stats['batches'] else 0
+        
+        print(f"\n📊 Estatísticas do Worker {self.worker_id}:")
+        print(f"   Logs recebidos: {self.stats['received']:,}")
+        print(f"   Logs gravados:  {self.stats['written']:,}")
+        print(f"   Lotes (write):  {self.stats['batches']:,} (média {avg_batch:.1f} logs/lote)")
+        if self.ring is not None:
+            print(f"   Spill p/ disco: {self.stats['spilled']:,}")
+        print(f"   Erros:          {self.stats['errors']:,}")
+        
+        if uptime:
+            print(f"   Uptime:         {uptime}")
+        
+        if self.stats['last_log']:
+            print(f"   Último log:     {datetime.fromtimestamp(self.stats['last_log']).isoformat()}")
+        
+        print()
+
+def _run_worker(worker_id: int, host: str, port: int, output_file: str):
+    """Entrada do processo filho"""
+    BatchedReceiverWorker(worker_id, host, port, output_file).start()
+
+def run_batched_receivers(workers: int = None, host=SYSLOG_HOST, port=SYSLOG_PORT,
+                          output_file: str = None):
+    """Inicia N workers (processos) compartilhando a porta via SO_REUSEPORT"""
+    global running
+    
+    if workers is None:
+        workers = config.RECEIVER_WORKERS
+    workers = max(1, workers)
+    
+    print(f"🚀 Iniciando {workers} worker(s) de recepção em lote")
+    print(f"   Escutando: {host}:{port}")
+    print(f"   Saída: {output_file or config.HOT_LOG_BUFFER_FILE}")
+    print(f"   Pressione Ctrl+C para parar\n")
+    
+    processes = []
+    for worker_id in range(workers):
+        proc = multiprocessing.Process(
+            target=_run_worker,
+            args=(worker_id, host, port, output_file),
+            name=f"megalog-receiver-{worker_id}",
+            daemon=True
+        )
+        proc.start()
+        processes.append(proc)
+    
+    # Supervisiona os workers até receber sinal de parada
+    while running and any(proc.is_alive() for proc in processes):
+        time.sleep(1)
+    
+    print("\n🛑 Encerrando workers...")
+    for proc in processes:
+        if proc.is_alive():
+            proc.terminate()  # SIGTERM -> shutdown gracioso no filho
+    for proc in processes:
+        proc.join(timeout=5)
+    
+    print("✅ Receptor encerrado")
+    return True
+
 # ==================== MAIN ====================
 
 def main():
     """Ponto de entrada"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Receptor Syslog UDP - MEGA LOG")
+    parser.add_argument('--workers', type=int, default=config.RECEIVER_WORKERS,
+                        help='Workers UDP com SO_REUSEPORT (modo batched)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--batched', action='store_true',
+                      help='Usa N workers com SO_REUSEPORT (padrão: MEGALOG_RECEIVER_MODE)')
+    mode.add_argument('--legacy', action='store_true',
+                      help='Usa o receptor antigo (1 socket, 1 datagrama por vez)')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print(f"  {config.SYSTEM_NAME} - Receptor de Logs")
     print(f"  Versão: {config.SYSTEM_VERSION}")
@@ -170,11 +419,13 @@ def main():
         print(f"   Ou mude SYSLOG_PORT no código para >= 1024")
         print()
     
-    # Inicia receptor
-    receiver = SyslogReceiver()
-    
     try:
-        receiver.start()
+        if args.legacy or (not args.batched and config.RECEIVER_MODE != 'batched'):
+            # Inicia receptor
+            receiver = SyslogReceiver()
+            receiver.start()
+        else:
+            run_batched_receivers(args.workers)
     except KeyboardInterrupt:
         print("\n⚠️ Interrompido pelo usuário")
     except Exception as e:
@@ -2,9 +2,13 @@
 # Modelos de dados e queries complexas
 
 import os
-from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional, Tuple
-from app import config, database
+import time
+import heapq
+from collections import Counter
+from datetime import datetime, date
+from itertools import islice
+from typing import Iterator, List, Dict, Optional, Tuple
+from app import config, database, ipv4, archive, catalog, bloom, search_pool
 
 # ==================== USER MODEL ====================
 
@@ -229,18 +233,13 @@ class LogSearch:
     """Engine de busca forense"""
     
     @staticmethod
-    def get_db_files_in_range(start_date: date, end_date: date) -> List[str]:
-        """Retorna lista de arquivos DB no intervalo de datas"""
-        db_files = []
-        current = start_date
-        
-        while current <= end_date:
-            db_path = database.get_log_db_path(current)
-            if os.path.exists(db_path):
-                db_files.append(db_path)
-            current += timedelta(days=1)
-        
-        return db_files
+    def get_db_files_in_range(start_dt: datetime, end_dt: datetime) -> List[str]:
+        """
+        Retorna lista de arquivos DB (e arquivos colunares de dias arquivados) que
+        podem ter eventos no intervalo, pelo catálogo: com shards, só os das horas
+        pedidas; dias selados, só se os horários gravados cruzam o intervalo
+        """
+        return catalog.files_in_range(start_dt.timestamp(), end_dt.timestamp())
     
     @staticmethod
     def search(start_dt: datetime, end_dt: datetime,
@@ -248,126 +247,414 @@ class LogSearch:
                ip_publico: str = None, port_publica: str = None,
                ip_destino: str = None, port_destino: str = None,
                limit: int = 1000, user_id: int = None, username: str = None,
-               ip_address: str = None) -> Tuple[List[Dict], int]:
+               ip_address: str = None, concurrency: int = None,
+               after: str = None, before: str = None) -> List[Dict]:
         """
         Executa busca forense nos logs
         
+        Devolve até limit linhas, da mais recente para a mais antiga. Os arquivos são
+        lidos a partir do mais recente, e a busca para quando nenhum dos restantes
+        pode ter linha que entre na página; cada arquivo traz no máximo limit linhas.
+        O total é contado à parte (count). Paginação por cursor: after = 'cursor' da
+        última linha da página (próxima página), before = da primeira (página anterior).
+        
+        concurrency: arquivos (dias/shards) consultados em paralelo por esta busca
+        (padrão config.SEARCH_CONCURRENCY)
+        
         Returns:
-            (resultados, total_encontrado)
+            resultados
         """
         
         # Log de auditoria
         if user_id and username:
-            filters_used = []
-            if ip_privado: filters_used.append(f"IP Privado={ip_privado}")
-            if port_privada: filters_used.append(f"Porta Privada={port_privada}")
-            if ip_publico: filters_used.append(f"IP Público={ip_publico}")
-            if port_publica: filters_used.append(f"Porta Pública={port_publica}")
-            if ip_destino: filters_used.append(f"IP Destino={ip_destino}")
-            if port_destino: filters_used.append(f"Porta Destino={port_destino}")
-            
-            details = f"Período: {start_dt.date()} a {end_dt.date()} | Filtros: {', '.join(filters_used) if filters_used else 'Nenhum'}"
+            details = LogSearch.describe_criteria(start_dt, end_dt, ip_privado, port_privada,
+                                                  ip_publico, port_publica, ip_destino, port_destino)
             AuditLog.log_action(user_id, username, "BUSCA_FORENSE", details, ip_address)
         
-        # Busca arquivos DB no intervalo
-        db_files = LogSearch.get_db_files_in_range(start_dt.date(), end_dt.date())
-        
-        if not db_files:
-            return [], 0
-        
         # Converte timestamps
         start_ts = int(start_dt.timestamp())
         end_ts = int(end_dt.timestamp())
         
+        filters = LogSearch._filters(ip_privado, port_privada, ip_publico, port_publica, ip_destino, port_destino)
+        where, params = LogSearch._where(filters)
+        
+        # Continuação de uma página: linhas depois (after) ou antes (before) do cursor,
+        # na ordem (timestamp, dia, id) da mais recente para a mais antiga. A faixa de
+        # horário começa/termina no cursor, então a página custa o mesmo em qualquer
+        # profundidade
+        newest_first = before is None
+        cursor = LogSearch._parse_cursor(after if newest_first else before) if (after or before) else None
+        low_ts, high_ts = start_ts, end_ts
+        if cursor is not None:
+            if newest_first:
+                high_ts = min(end_ts, cursor[0])
+            else:
+                low_ts = max(start_ts, cursor[0])
+        
+        # Busca arquivos no intervalo
+        entries = LogSearch._entries(low_ts, high_ts, filters)
+        
+        if not entries:
+            return []
+        
         # Monta query base
-        query = """
+        # IDs de dicionário são decodificados em memória (sem JOIN por linha)
+        query = f"""
         SELECT 
             l.timestamp,
-            ii.name as interface_in,
-            io.name as interface_out,
-            s.name as state,
-            p.name as protocol,
+            l.interface_in_id,
+            l.interface_out_id,
+            l.state_id,
+            l.protocol_id,
             l.src_ip_priv,
             l.src_port_priv,
             l.dst_ip,
             l.dst_port,
             l.nat_ip_pub,
-            l.nat_port_pub
+            l.nat_port_pub,
+            l.id
         FROM logs l
-        JOIN d_interfaces ii ON l.interface_in_id = ii.id
-        JOIN d_interfaces io ON l.interface_out_id = io.id
-        LEFT JOIN d_states s ON l.state_id = s.id
-        JOIN d_protocols p ON l.protocol_id = p.id
-        WHERE l.timestamp BETWEEN ? AND ?
+        WHERE {where}
         """
+        row_params = [low_ts, high_ts] + params
+        
+        # Horário mais recente (ou mais antigo, com before) que cada arquivo pode ter:
+        # gravado no catálogo se o arquivo é imutável, senão o limite da partição
+        if newest_first:
+            edges = {entry['path']: min(high_ts, entry['max_ts'] if entry['sealed'] else entry['end'] - 1)
+                     for entry in entries}
+        else:
+            edges = {entry['path']: max(low_ts, entry['min_ts'] if entry['sealed'] else entry['start'])
+                     for entry in entries}
+        db_files = sorted(edges, key=edges.get, reverse=newest_first)
+        day_keys = {db_path: LogSearch._day_key(db_path) for db_path in db_files}
+        
+        def fetch(db_path: str) -> Tuple[Optional[Dict], Dict]:
+            # Linhas no horário do cursor: do mesmo dia, só ids depois do cursor; de outro
+            # dia, todas ou nenhuma conforme o dia venha depois ou antes na ordem
+            cursor_id = None
+            if cursor is not None:
+                cursor_ts, cursor_day, cursor_id = cursor
+                day = day_keys[db_path]
+                if day != cursor_day:
+                    later = day < cursor_day if newest_first else day > cursor_day
+                    everything, nothing = (LogSearch._MAX_ID, 0) if newest_first else (0, LogSearch._MAX_ID)
+                    cursor_id = everything if later else nothing
+            
+            if db_path.endswith(archive.ARCHIVE_SUFFIX):
+                return LogSearch._scan_archive(db_path, low_ts, high_ts, filters, limit, newest_first, cursor_id)
+            
+            rows_query, rows_params = query, row_params
+            if cursor_id is not None:
+                rows_query += " AND (l.timestamp < ? OR l.id < ?)" if newest_first else " AND (l.timestamp > ? OR l.id > ?)"
+                rows_params = rows_params + [cursor[0], cursor_id]
+            return LogSearch._query_db(db_path, rows_query, rows_params, limit, newest_first)
+        
+        # Executa busca nos DBs (em paralelo; resultados na ordem em que terminam)
+        file_rows = []
+        found = []  # Horários das linhas já trazidas
+        remaining = dict(edges)
+        
+        files = search_pool.run_bounded(fetch, db_files, concurrency)
+        try:
+            for db_path, fetched, error in files:
+                del remaining[db_path]
+                try:
+                    if error is not None:
+                        raise error
+                    columns, names = fetched
+                    if columns is not None:
+                        day = day_keys[db_path]
+                        rows = zip(*(LogSearch._as_list(columns[name]) for name in LogSearch.RESULT_COLUMNS))
+                        file_rows.append([((row[0], day, row[-1]), row, names) for row in rows])
+                        found.extend(LogSearch._as_list(columns['timestamp']))
+                    
+                except Exception as e:
+                    print(f"⚠️ Erro ao consultar {os.path.basename(db_path)}: {e}")
+                
+                # Página completa e nenhum arquivo restante pode ter linha que entre nela
+                if remaining and limit and len(found) >= limit:
+                    if newest_first:
+                        if heapq.nlargest(limit, found)[-1] > max(remaining.values()):
+                            break
+                    elif heapq.nsmallest(limit, found)[-1] < min(remaining.values()):
+                        break
+        finally:
+            files.close()
+        
+        # Cada arquivo já vem em ordem de (timestamp, dia, id): intercala (k-way) até
+        # completar a página; só as linhas da página são formatadas
+        merged = heapq.merge(*file_rows, key=lambda item: item[0], reverse=newest_first)
+        page = list(islice(merged, limit))
+        if not newest_first:
+            page.reverse()
+        
+        return LogSearch._format_rows(page)
+    
+    @staticmethod
+    def iter_results(start_dt: datetime, end_dt: datetime,
+                     ip_privado: str = None, port_privada: str = None,
+                     ip_publico: str = None, port_publica: str = None,
+                     ip_destino: str = None, port_destino: str = None,
+                     batch: int = None) -> Iterator[Dict]:
+        """
+        Todas as linhas da busca, da mais recente para a mais antiga, buscadas em
+        páginas de batch linhas (padrão config.EXPORT_BATCH_ROWS) por cursor: a
+        memória não cresce com o resultado (exportação, app/export.py)
+        """
+        batch = batch or config.EXPORT_BATCH_ROWS
+        after = None
+        while True:
+            rows = LogSearch.search(start_dt, end_dt, ip_privado, port_privada, ip_publico, port_publica,
+                                    ip_destino, port_destino, limit=batch, after=after)
+            yield from rows
+            if len(rows) < batch:
+                return
+            after = rows[-1]['cursor']
+    
+    @staticmethod
+    def count(start_dt: datetime, end_dt: datetime,
+              ip_privado: str = None, port_privada: str = None,
+              ip_publico: str = None, port_publica: str = None,
+              ip_destino: str = None, port_destino: str = None,
+              budget: float = None, concurrency: int = None) -> Tuple[int, bool]:
+        """
+        Total de linhas da busca: (total, exato)
+        
+        COUNT(*) por arquivo, em paralelo (só com as colunas dos índices, sem ler as
+        linhas); sem filtros, arquivo selado inteiro no intervalo vem do catálogo.
+        Passados budget segundos (padrão config.SEARCH_COUNT_BUDGET_SEC), os arquivos
+        ainda não contados são abandonados (COUNTs do SQLite e leituras de arquivos colunares
+        interrompidos) e estimados:
+        linhas no intervalo (catálogo, por hora) vezes a fração que casou nos já contados.
+        """
+        deadline = time.monotonic() + (config.SEARCH_COUNT_BUDGET_SEC if budget is None else budget)
+        start_ts = int(start_dt.timestamp())
+        end_ts = int(end_dt.timestamp())
         
-        params = [start_ts, end_ts]
-        
-        # Adiciona filtros dinamicamente
+        filters = LogSearch._filters(ip_privado, port_privada, ip_publico, port_publica, ip_destino, port_destino)
+        where, params = LogSearch._where(filters)
+        count_query = f"SELECT COUNT(*) FROM logs l WHERE {where}"
+        params = [start_ts, end_ts] + params
+        
+        total = 0
+        pending = {}
+        for entry in LogSearch._entries(start_ts, end_ts, filters):
+            if (not filters and entry['sealed'] and not entry['dirty']
+                    and start_ts <= entry['min_ts'] and entry['max_ts'] <= end_ts):
+                total += entry['row_count']
+            else:
+                pending[entry['path']] = entry
+        
+        def fetch(db_path: str) -> int:
+            if db_path.endswith(archive.ARCHIVE_SUFFIX):
+                return archive.open_archive(db_path).count(start_ts, end_ts, filters, deadline)
+            return LogSearch._count_db(db_path, count_query, params, deadline)
+        
+        # Linhas que casaram / linhas no intervalo (catálogo) dos arquivos contados
+        matched = scanned = 0
+        
+        files = search_pool.run_bounded(fetch, list(pending), concurrency,
+                                        timeout=max(0.0, deadline - time.monotonic()))
+        try:
+            for db_path, file_count, error in files:
+                if error is not None and time.monotonic() >= deadline:
+                    break  # Interrompido pelo prazo: fica para a estimativa
+                entry = pending.pop(db_path)
+                if error is not None:
+                    print(f"⚠️ Erro ao contar {os.path.basename(db_path)}: {error}")
+                else:
+                    total += file_count
+                    matched += file_count
+                    scanned += catalog.rows_in_range(entry, start_ts, end_ts)
+        finally:
+            files.close()
+        
+        if not pending:
+            return total, True
+        
+        rate = 1.0 if not filters else min(1.0, matched / scanned) if scanned else 0.0
+        estimate = total + rate * sum(catalog.rows_in_range(entry, start_ts, end_ts) for entry in pending.values())
+        return int(round(estimate)), False
+    
+    @staticmethod
+    def format_count(total: int, exact: bool = True) -> str:
+        """Total para exibição: exato ('1234') ou estimado ('~2.3M', '~45.1K', '~870')"""
+        if exact:
+            return str(total)
+        for size, suffix in ((10 ** 9, 'B'), (10 ** 6, 'M'), (10 ** 3, 'K')):
+            if total >= size:
+                return f"~{total / size:.1f}{suffix}"
+        return f"~{total}"
+    
+    @staticmethod
+    def describe_criteria(start_dt: datetime, end_dt: datetime,
+                          ip_privado: str = None, port_privada: str = None,
+                          ip_publico: str = None, port_publica: str = None,
+                          ip_destino: str = None, port_destino: str = None) -> str:
+        """Período e filtros da busca, para o log de auditoria"""
+        filters_used = []
+        if ip_privado: filters_used.append(f"IP Privado={ip_privado}")
+        if port_privada: filters_used.append(f"Porta Privada={port_privada}")
+        if ip_publico: filters_used.append(f"IP Público={ip_publico}")
+        if port_publica: filters_used.append(f"Porta Pública={port_publica}")
+        if ip_destino: filters_used.append(f"IP Destino={ip_destino}")
+        if port_destino: filters_used.append(f"Porta Destino={port_destino}")
+        
+        return f"Período: {start_dt.date()} a {end_dt.date()} | Filtros: {', '.join(filters_used) if filters_used else 'Nenhum'}"
+    
+    @staticmethod
+    def _filters(ip_privado: str = None, port_privada: str = None,
+                 ip_publico: str = None, port_publica: str = None,
+                 ip_destino: str = None, port_destino: str = None) -> Dict[str, int]:
+        """Filtros de igualdade por coluna (mesmos para SQLite e arquivo colunar)"""
+        filters = {}
         if ip_privado:
-            query += " AND l.src_ip_priv = ?"
-            params.append(database.convert_ip_to_int(ip_privado))
-        
+            filters['src_ip_priv'] = database.convert_ip_to_int(ip_privado)
         if port_privada:
-            query += " AND l.src_port_priv = ?"
-            params.append(int(port_privada))
-        
+            filters['src_port_priv'] = int(port_privada)
         if ip_publico:
-            query += " AND l.nat_ip_pub = ?"
-            params.append(database.convert_ip_to_int(ip_publico))
-        
+            filters['nat_ip_pub'] = database.convert_ip_to_int(ip_publico)
         if port_publica:
-            query += " AND l.nat_port_pub = ?"
-            params.append(int(port_publica))
-        
+            filters['nat_port_pub'] = int(port_publica)
         if ip_destino:
-            query += " AND l.dst_ip = ?"
-            params.append(database.convert_ip_to_int(ip_destino))
-        
+            filters['dst_ip'] = database.convert_ip_to_int(ip_destino)
         if port_destino:
-            query += " AND l.dst_port = ?"
-            params.append(int(port_destino))
-        
-        query += " ORDER BY l.timestamp DESC"
-        
-        # Executa busca em todos os DBs
-        all_results = []
-        
-        for db_path in db_files:
-            try:
-                conn = database.get_db_connection(db_path)
-                if not conn:
-                    continue
-                
-                cursor = conn.execute(query, params)
-                
-                for row in cursor:
-                    all_results.append({
-                        'timestamp': datetime.fromtimestamp(row['timestamp']).strftime('%Y-%m-%d %H:%M:%S'),
-                        'interface_in': row['interface_in'],
-                        'interface_out': row['interface_out'],
-                        'state': row['state'] or 'N/A',
-                        'protocol': row['protocol'],
-                        'src_ip_priv': database.convert_int_to_ip(row['src_ip_priv']),
-                        'src_port_priv': row['src_port_priv'],
-                        'dst_ip': database.convert_int_to_ip(row['dst_ip']),
-                        'dst_port': row['dst_port'],
-                        'nat_ip_pub': database.convert_int_to_ip(row['nat_ip_pub']) if row['nat_ip_pub'] else 'N/A',
-                        'nat_port_pub': row['nat_port_pub'] if row['nat_port_pub'] else 'N/A',
-                    })
-                
-                conn.close()
-                
-            except Exception as e:
-                print(f"⚠️ Erro ao consultar {os.path.basename(db_path)}: {e}")
+            filters['dst_port'] = int(port_destino)
+        return filters
+    
+    @staticmethod
+    def _where(filters: Dict[str, int]) -> Tuple[str, list]:
+        """Condições da busca (intervalo nos dois primeiros parâmetros, a completar) e valores dos filtros"""
+        where = "l.timestamp BETWEEN ? AND ?"
+        params = []
         
-        # Ordena por timestamp (DESC) já que juntamos vários DBs
-        all_results.sort(key=lambda x: x['timestamp'], reverse=True)
+        # Adiciona filtros dinamicamente
+        for column, value in filters.items():
+            where += f" AND l.{column} = ?"
+            params.append(value)
+        return where, params
+    
+    @staticmethod
+    def _entries(start_ts: int, end_ts: int, filters: Dict[str, int]) -> List[Dict]:
+        """Arquivos do intervalo (catálogo) que podem ter os IPs pedidos (filtros de Bloom, app/bloom.py)"""
+        if None in filters.values():
+            return []  # IP inválido no filtro (= NULL): nenhuma linha casa
+        entries = catalog.entries_in_range(start_ts, end_ts)
+        candidates = set(bloom.candidate_files([entry['path'] for entry in entries], filters))
+        return [entry for entry in entries if entry['path'] in candidates]
+    
+    # Colunas de cada linha de resultado (ordem do SELECT)
+    RESULT_COLUMNS = ('timestamp', 'interface_in_id', 'interface_out_id', 'state_id', 'protocol_id',
+                      'src_ip_priv', 'src_port_priv', 'dst_ip', 'dst_port', 'nat_ip_pub', 'nat_port_pub', 'id')
+    
+    _MAX_ID = 2 ** 63 - 1
+    
+    @staticmethod
+    def _as_list(values) -> list:
+        return values.tolist() if hasattr(values, 'tolist') else values
+    
+    @staticmethod
+    def _day_key(path: str) -> int:
+        """Dia do arquivo como AAAAMMDD (segunda parte do cursor)"""
+        parsed = catalog.parse_file_name(os.path.basename(path))
+        return int(parsed[0].strftime('%Y%m%d')) if parsed else 0
+    
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Tuple[int, int, int]:
+        """Cursor 'timestamp-AAAAMMDD-id' de uma linha -> (timestamp, dia, id)"""
+        timestamp, day, row_id = (int(part) for part in cursor.split('-'))
+        return timestamp, day, row_id
+    
+    @staticmethod
+    def _format_rows(rows: List[Tuple[tuple, tuple, Dict]]) -> List[Dict]:
+        """
+        Linhas para exibição: (chave, valores em RESULT_COLUMNS, dicionários do arquivo
+        de origem). 'cursor' identifica a linha para continuar a busca a partir dela
+        """
+        # IPs convertidos por coluna (cada IP distinto uma vez)
+        src_ips = ipv4.ints_to_ips([row[5] for _, row, _ in rows])
+        dst_ips = ipv4.ints_to_ips([row[7] for _, row, _ in rows])
+        nat_ips = ipv4.ints_to_ips([row[9] for _, row, _ in rows])
+        
+        results = []
+        for ((timestamp, day, row_id), (_, interface_in, interface_out, state, protocol, _, src_port,
+             _, dst_port, nat_ip_int, nat_port, _), names), src_ip, dst_ip, nat_ip in zip(rows, src_ips, dst_ips, nat_ips):
+            interfaces = names['d_interfaces']
+            results.append({
+                'timestamp': datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+                'interface_in': interfaces.get(interface_in),
+                'interface_out': interfaces.get(interface_out),
+                'state': names['d_states'].get(state) or 'N/A',
+                'protocol': names['d_protocols'].get(protocol),
+                'src_ip_priv': src_ip,
+                'src_port_priv': src_port,
+                'dst_ip': dst_ip,
+                'dst_port': dst_port,
+                'nat_ip_pub': nat_ip if nat_ip_int else 'N/A',
+                'nat_port_pub': nat_port if nat_port else 'N/A',
+                'cursor': f"{timestamp}-{day}-{row_id}",
+            })
+        return results
+    
+    @staticmethod
+    def _query_db(db_path: str, query: str, params: list, limit: int,
+                  newest_first: bool = True) -> Tuple[Optional[Dict], Dict]:
+        """Busca em um DB do dia: ({coluna: valores}, dicionários), só as limit primeiras linhas na ordem pedida"""
+        conn = database.get_log_db_reader(db_path)
+        if not conn:
+            return None, {}
         
-        total_count = len(all_results)
+        try:
+            # Dia arquivado com linhas chegadas depois: o DB só traz as posteriores ao arquivo
+            archived_max_id = archive.archived_max_id(db_path)
+            if archived_max_id:
+                query += " AND l.id > ?"
+                params = params + [archived_max_id]
+            order = "l.timestamp DESC, l.id DESC" if newest_first else "l.timestamp, l.id"
+            rows = conn.execute(f"{query} ORDER BY {order} LIMIT ?", params + [limit]).fetchall()
+            
+            columns = {name: [row[i] for row in rows] for i, name in enumerate(LogSearch.RESULT_COLUMNS)}
+            names = database.load_dict_names(conn, {
+                'd_interfaces': set(columns['interface_in_id']) | set(columns['interface_out_id']),
+                'd_states': set(columns['state_id']),
+                'd_protocols': set(columns['protocol_id']),
+            })
+            return columns, names
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _count_db(db_path: str, count_query: str, params: list, deadline: float = None) -> int:
+        """COUNT(*) da busca em um DB do dia (interrompido se passar de deadline, time.monotonic())"""
+        conn = database.get_log_db_reader(db_path)
+        if not conn:
+            return 0
         
-        # Aplica limite
-        return all_results[:limit], total_count
+        try:
+            if deadline is not None:
+                # Contagem abandonada pelo count() não segue ocupando a thread do pool
+                conn.set_progress_handler(lambda: time.monotonic() >= deadline, 10000)
+            archived_max_id = archive.archived_max_id(db_path)
+            if archived_max_id:
+                count_query += " AND l.id > ?"
+                params = params + [archived_max_id]
+            return conn.execute(count_query, params).fetchone()[0]
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _scan_archive(path: str, start_ts: int, end_ts: int, filters: Dict[str, int], limit: int,
+                      newest_first: bool = True, cursor_id: int = None) -> Tuple[Dict, Dict]:
+        """
+        Busca em um dia arquivado (scan vetorizado, app/archive.py): ({coluna: array},
+        dicionários). cursor_id limita as linhas do horário do cursor (start_ts ou end_ts)
+        """
+        reader = archive.open_archive(path)
+        bounds = {}
+        if cursor_id is not None:
+            bounds = {'before_id': cursor_id} if newest_first else {'after_id': cursor_id}
+        return reader.scan(start_ts, end_ts, filters, LogSearch.RESULT_COLUMNS, limit, newest_first, **bounds), reader.dicts
 
 # ==================== STATISTICS ====================
 
@@ -376,13 +663,13 @@ class LogStatistics:
     
     @staticmethod
     def get_daily_summary(target_date: date = None) -> Dict:
-        """Resumo diário de logs"""
+        """Resumo diário de logs (catálogo: soma dos DBs/arquivos do dia, diário ou shards)"""
         if target_date is None:
             target_date = date.today()
         
-        db_path = database.get_log_db_path(target_date)
+        files = catalog.day_files(target_date)
         
-        if not os.path.exists(db_path):
+        if not files:
             return {
                 'date': target_date.isoformat(),
                 'exists': False,
@@ -390,54 +677,131 @@ class LogStatistics:
                 'db_size_mb': 0
             }
         
-        conn = database.get_db_connection(db_path)
-        if not conn:
-            return {'date': target_date.isoformat(), 'exists': False}
-        
         try:
-            # Total de logs
-            cursor = conn.execute("SELECT COUNT(*) as total FROM logs")
-            total = cursor.fetchone()['total']
-            
-            # Stats do processador
-            stats = database.get_processor_stats(conn)
-            
-            # Tamanho do DB
-            db_size = os.path.getsize(db_path) / (1024 * 1024)  # MB
-            
-            conn.close()
+            # Stats do processador (ficam no DB diário)
+            stats = {}
+            conn = database.get_log_db_reader(database.get_log_db_path(target_date))
+            if conn:
+                try:
+                    stats = database.get_processor_stats(conn)
+                finally:
+                    conn.close()
             
+            # Dia arquivado: o arquivo e o DB de linhas posteriores têm linhas próprias
             return {
                 'date': target_date.isoformat(),
                 'exists': True,
-                'total_logs': total,
-                'db_size_mb': round(db_size, 2),
+                'archived': any(entry['archived'] for entry in files),
+                'total_logs': sum(entry['row_count'] for entry in files),
+                'db_size_mb': round(sum(entry['size_bytes'] for entry in files) / (1024 * 1024), 2),  # MB
                 'processor_stats': stats
             }
             
         except Exception as e:
             print(f"❌ Erro ao obter stats: {e}")
-            if conn:
-                conn.close()
             return {'date': target_date.isoformat(), 'error': str(e)}
     
     @staticmethod
-    def get_available_dates() -> List[date]:
-        """Lista datas com DBs disponíveis"""
-        dates = []
+    def get_daily_charts(target_date: date) -> Optional[Dict]:
+        """
+        Agregados dos gráficos diários: protocolos e interfaces (top 10), logs por hora
+        (catálogo), top 10 IPs NAT e de destino públicos. Soma os DBs/arquivos do dia
+        (diário ou shards). None se o dia não tem logs.
+        """
+        files = catalog.day_files(target_date)
+        if not files:
+            return None
         
-        for filename in os.listdir(config.COLD_STORAGE_DIR):
-            if filename.endswith('.db'):
-                try:
-                    # Parse filename (YYYY-MM-DD.db)
-                    date_str = filename.replace('.db', '')
-                    dt = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    dates.append(dt)
-                except ValueError:
-                    continue
-        
-        dates.sort(reverse=True)
-        return dates
+        names = {entry['name'] for entry in files}
+        totals = {name: Counter() for name in ('protocols', 'interfaces', 'nat_ips', 'dst_ips')}
+        hours = [0] * 24
+        for entry in files:
+            hours = [a + b for a, b in zip(hours, entry['hourly'])]
+            if entry['archived']:
+                counts = archive.chart_counts(entry['path'])  # Inclui as linhas posteriores do DB
+            elif os.path.basename(archive.archive_path_for_db(entry['path'])) in names:
+                continue
+            else:
+                # Um DB só: o top 10 pode sair direto do SQL
+                counts = LogStatistics._chart_counts_db(entry['path'], 10 if len(files) == 1 else None)
+            for name, counter in counts.items():
+                totals[name].update(counter)
+        
+        return {
+            'protocols': totals['protocols'].most_common(10),
+            'interfaces': totals['interfaces'].most_common(10),
+            'timeline': [(f"{hour:02d}:00", count) for hour, count in enumerate(hours) if count],
+            'top_nat_ips': [(ipv4.int_to_ip(ip), count) for ip, count in totals['nat_ips'].most_common(10)],
+            'top_dst_ips': [(ipv4.int_to_ip(ip), count) for ip, count in totals['dst_ips'].most_common(10)],
+        }
+    
+    @staticmethod
+    def _chart_counts_db(db_path: str, limit: int = None) -> Dict[str, Counter]:
+        """Contagens dos gráficos de um DB (limit: só os maiores de cada ranking)"""
+        conn = database.get_log_db_reader(db_path)
+        if not conn:
+            return {}
+        
+        top = f"ORDER BY count DESC LIMIT {limit}" if limit else ""
+        try:
+            # Gráfico de Protocolos (IDs decodificados em memória: dicionário do dia ou global)
+            protocol_rows = conn.execute(f"""
+                SELECT protocol_id, COUNT(*) as count
+                FROM logs
+                GROUP BY protocol_id
+                {top}
+            """).fetchall()
+            
+            # Gráfico de Interfaces (origem)
+            interface_rows = conn.execute(f"""
+                SELECT interface_in_id, COUNT(*) as count
+                FROM logs
+                GROUP BY interface_in_id
+                {top}
+            """).fetchall()
+            
+            names = database.load_dict_names(conn, {
+                'd_protocols': {row['protocol_id'] for row in protocol_rows},
+                'd_interfaces': {row['interface_in_id'] for row in interface_rows},
+            })
+            
+            # Top IPs Públicos (NAT)
+            nat_rows = conn.execute(f"""
+                SELECT nat_ip_pub, COUNT(*) as count
+                FROM logs
+                WHERE nat_ip_pub IS NOT NULL
+                GROUP BY nat_ip_pub
+                {top}
+            """).fetchall()
+            
+            # Top IPs de Destino (mais acessados): apenas IPs públicos (não RFC1918)
+            dst_rows = conn.execute(f"""
+                SELECT dst_ip, COUNT(*) as count
+                FROM logs
+                WHERE dst_ip IS NOT NULL
+                    -- Filtra IPs privados RFC1918
+                    AND NOT ((dst_ip >> 24) & 255 = 10)  -- 10.0.0.0/8
+                    AND NOT (((dst_ip >> 24) & 255 = 172) AND (((dst_ip >> 16) & 255) BETWEEN 16 AND 31))  -- 172.16.0.0/12
+                    AND NOT (((dst_ip >> 24) & 255 = 192) AND (((dst_ip >> 16) & 255) = 168))  -- 192.168.0.0/16
+                    AND NOT ((dst_ip >> 24) & 255 = 127)  -- 127.0.0.0/8 (loopback)
+                    AND NOT ((dst_ip >> 24) & 255 = 0)  -- 0.0.0.0/8
+                GROUP BY dst_ip
+                {top}
+            """).fetchall()
+        finally:
+            conn.close()
+        
+        return {
+            'protocols': Counter({names['d_protocols'].get(row['protocol_id']): row['count'] for row in protocol_rows}),
+            'interfaces': Counter({names['d_interfaces'].get(row['interface_in_id']): row['count'] for row in interface_rows}),
+            'nat_ips': Counter({row['nat_ip_pub']: row['count'] for row in nat_rows}),
+            'dst_ips': Counter({row['dst_ip']: row['count'] for row in dst_rows}),
+        }
+    
+    @staticmethod
+    def get_available_dates() -> List[date]:
+        """Lista datas com DBs (ou arquivos colunares) disponíveis, pelo catálogo"""
+        return catalog.available_days()
 
 # ==================== INICIALIZAÇÃO ====================
 
@@ -0,0 +1,104 @@
+# app/noise_filter.py
+# Filtro de ruído: regras de substring compiladas em uma única regex + regras estruturadas
+#
+# Testar cada filtro com "in" custa uma varredura da linha por regra. Aqui os
+# filtros de substring viram uma trie e a trie vira uma única regex: em cada
+# posição da linha o motor só segue o ramo do caractere seguinte, então o custo
+# depende do tamanho da linha e não da quantidade de regras.
+#
+# Regras estruturadas (ex: dst_port=123) são avaliadas depois do parsing, sobre a
+# linha normalizada, com lookup em dicionário por combinação de campos.
+
+import re
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from app import ipv4
+
+# Campos aceitos nas regras estruturadas -> posição na linha normalizada (database.normalize_log)
+RULE_FIELDS = {
+    'interface_in': 1,
+    'interface_out': 2,
+    'state': 3,
+    'proto': 4,
+    'src_ip_priv': 5,
+    'src_port_priv': 6,
+    'dst_ip': 7,
+    'dst_port': 8,
+    'nat_ip_pub': 9,
+    'nat_port_pub': 10,
+}
+
+_IP_FIELDS = ('src_ip_priv', 'dst_ip', 'nat_ip_pub')
+_PORT_FIELDS = ('src_port_priv', 'dst_port', 'nat_port_pub')
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex equivalente a 'qualquer uma das palavras', com prefixos comuns fatorados"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True  # Fim de palavra
+
+    def build(node: dict) -> str:
+        if '' in node:
+            return ''  # Uma palavra termina aqui: continuações mais longas já estão cobertas
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+class NoiseFilter:
+    """
+    Regras de descarte compiladas.
+
+    substrings: trechos que descartam a linha crua (config.NOISE_FILTERS).
+    rules: dicts {campo: valor, ..., 'name': opcional}; a linha é descartada se
+    todos os campos da regra baterem (config.NOISE_RULES).
+    """
+
+    def __init__(self, substrings: List[str] = None, rules: List[Dict] = None):
+        substrings = [s for s in dict.fromkeys(substrings or []) if s]
+        self.substring_regex = re.compile(_trie_pattern(substrings)) if substrings else None
+
+        # Combinação de campos -> (extrator dos campos da linha, {valores: nome da regra})
+        self.structured: Dict[Tuple[str, ...], Tuple[itemgetter, Dict]] = {}
+        for rule in rules or []:
+            self._add_rule(rule)
+
+    def _add_rule(self, rule: Dict):
+        fields = tuple(sorted(key for key in rule if key != 'name'))
+        unknown = [field for field in fields if field not in RULE_FIELDS]
+        if not fields or unknown:
+            raise ValueError(f"Regra de ruído inválida: {rule} (campos aceitos: {', '.join(RULE_FIELDS)})")
+
+        values = []
+        for field in fields:
+            value = rule[field]
+            if field in _IP_FIELDS:
+                value = ipv4.ip_to_int(value)
+                if value is None:
+                    raise ValueError(f"IP inválido na regra de ruído: {rule}")
+            elif field in _PORT_FIELDS:
+                value = int(value)
+            values.append(value)
+
+        name = rule.get('name') or ','.join(f"{field}={rule[field]}" for field in fields)
+        getter = itemgetter(*(RULE_FIELDS[field] for field in fields))
+        key = values[0] if len(values) == 1 else tuple(values)  # Mesmo formato do itemgetter
+        self.structured.setdefault(fields, (getter, {}))[1][key] = name
+
+    def match_line(self, line: str) -> Optional[str]:
+        """Regra de substring que descarta a linha crua (ou None)"""
+        if self.substring_regex is None:
+            return None
+        match = self.substring_regex.search(line)
+        return match.group() if match else None
+
+    def match_row(self, row: Tuple) -> Optional[str]:
+        """Regra estruturada que descarta a linha normalizada (ou None)"""
+        for getter, table in self.structured.values():
+            name = table.get(getter(row))
+            if name is not None:
+                return name
+        return None
@@ -6,15 +6,17 @@ import time
 import os
 import sys
 import signal
+import threading
+import multiprocessing
+from collections import deque
 from datetime import datetime, date
-
-try:
-    from pygtail import Pygtail
-except ImportError:
-    print("❌ Erro: pygtail não instalado. Execute: pip install pygtail")
-    sys.exit(1)
+from typing import Dict, List, Tuple
 
 from app import config, database
+from app.ring_buffer import RingConsumer
+from app.batch_writer import BatchWriter
+from app.noise_filter import NoiseFilter
+from app import hot_buffer, sealing, archive, catalog, bloom
 
 # ==================== CONTROLE DE EXECUÇÃO ====================
 running = True
@@ -25,38 +27,142 @@ def signal_handler(signum, frame):
     print(f"\n⚠️ Sinal {signum} recebido. Encerrando processador...")
     running = False
 
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
+# ==================== PARSING (WORKERS) ====================
+
+# Regras compiladas uma vez (herdadas pelos workers do pool)
+NOISE_FILTER = NoiseFilter(config.NOISE_FILTERS, config.NOISE_RULES)
+
+def is_noise(line: str) -> bool:
+    """Verifica se a linha é ruído (deve ser filtrada)"""
+    return NOISE_FILTER.match_line(line) is not None
+
+def parse_chunk(lines: List[str]) -> Tuple[List[Tuple], Dict[str, int], int]:
+    """
+    Filtra, parseia e normaliza um bloco de linhas (sem acesso ao DB).
+    Retorna (linhas normalizadas, descartes por regra de ruído, falhas).
+    """
+    rows = []
+    noise_hits = {}
+    failed = 0
+    
+    for line in lines:
+        rule = NOISE_FILTER.match_line(line)
+        if rule is not None:
+            noise_hits[rule] = noise_hits.get(rule, 0) + 1
+            continue
+        
+        parsed = database.parse_log_line(line)
+        row = database.normalize_log(parsed) if parsed else None
+        if row is None:
+            failed += 1
+            continue
+        
+        rule = NOISE_FILTER.match_row(row)
+        if rule is not None:
+            noise_hits[rule] = noise_hits.get(rule, 0) + 1
+            continue
+        
+        rows.append(row)
+    
+    return rows, noise_hits, failed
+
+def _init_parse_worker():
+    """Workers do pool ignoram sinais: o processo pai coordena o shutdown"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
 
 # ==================== PROCESSADOR ====================
+# Nome da fonte do buffer HOT na tabela ingest_offsets
+HOT_BUFFER_SOURCE = "hot_buffer"
+
+class DayBatch:
+    """Lote de um dia (ou shard do dia): linhas roteadas pelo horário do próprio evento"""
+    
+    def __init__(self, db_path: str, end_ts: float, first_seq: int, start_positions: dict):
+        self.db_path = db_path
+        self.end_ts = end_ts
+        self.rows = []
+        self.chunks = []                        # (seq do bloco de entrada, linhas deste dia)
+        self.first_seq = first_seq              # Bloco mais antigo com linhas neste lote
+        self.start_positions = start_positions  # Posições de entrada antes desse bloco
+        self.created_at = time.time()
 
 class LogProcessor:
-    def __init__(self):
+    def __init__(self, workers: int = None):
         self.conn = None
         self.current_db_date = None
-        self.log_batch = []
-        self.last_batch_time = time.time()
+        self.day_batches = {}  # DB do dia/shard -> DayBatch
         self.stats = {
             'lines_processed': 0,
             'lines_inserted': 0,
             'lines_filtered': 0,
             'lines_failed': 0,
+            'noise_hits': {},
             'last_log_time': None,
-            'db_rotations': 0
+            'db_rotations': 0,
+            'late_rows': 0,
+            'backpressure_events': 0,
+            'backlog_bytes': 0,
+            'catchup_rate': 0.0
         }
         
-        # Cria arquivo de buffer se não existir
-        if not os.path.exists(config.HOT_LOG_BUFFER_FILE):
+        # Fase de catch-up (entrada disponível sem pausas): mede a vazão de drenagem
+        self.catchup_started = None
+        self.catchup_lines = 0
+        
+        self.last_gc_time = time.time()
+        
+        # Offsets commitados junto com o último lote (exactly-once no restart)
+        committed = database.load_ingest_offsets()
+        checkpoint = committed.get(HOT_BUFFER_SOURCE) or hot_buffer.load_legacy_checkpoint()
+        
+        # Blocos depois do ponto de retomada que chegaram a ser gravados em algum dia
+        # serão relidos: a cópia antiga sai antes (sem duplicação)
+        self.next_chunk_seq = committed.get(database.CHUNK_SEQ_SOURCE, (0, 0))[0]
+        removed = database.rollback_uncommitted_chunks(self.next_chunk_seq)
+        if removed:
+            print(f"↩️ {removed:,} logs gravados após o ponto de retomada serão regravados")
+        
+        # Catálogo: reconta os DBs com gravações não contadas (queda) ou desfeitas acima
+        recounted = catalog.refresh_dirty()
+        if recounted:
+            print(f"📒 Catálogo: {recounted} arquivo(s) recontado(s)")
+        
+        if not config.HOT_BUFFER_SEGMENTED and not os.path.exists(config.HOT_LOG_BUFFER_FILE):
+            # Cria arquivo de buffer se não existir
             print(f"⚠️ Buffer não encontrado. Criando: {config.HOT_LOG_BUFFER_FILE}")
             os.makedirs(os.path.dirname(config.HOT_LOG_BUFFER_FILE), exist_ok=True)
             open(config.HOT_LOG_BUFFER_FILE, 'a').close()
         
-        # Inicializa Pygtail (tail -f com memória)
-        self.log_tail = Pygtail(
-            config.HOT_LOG_BUFFER_FILE,
-            offset_file=config.PROCESSOR_OFFSET_FILE,
-            paranoid=True  # Detecta rotação de arquivo
-        )
+        # Leitor em blocos do buffer HOT (arquivo único ou segmentos)
+        self.log_tail = hot_buffer.open_tailer(checkpoint)
+        seq, offset = self.log_tail.position()
+        print(f"📍 Retomando buffer HOT em ({seq}, {offset:,})")
+        
+        # Caminho zero-copy: consome direto dos rings do receptor
+        self.ring_consumer = RingConsumer(committed=committed) if config.USE_SHM_RING else None
+        self.batch_timeout = config.RING_BATCH_TIMEOUT_SEC if self.ring_consumer else config.BATCH_TIMEOUT_SEC
+        self.idle_sleep = config.RING_POLL_INTERVAL_SEC if self.ring_consumer else 1
+        
+        # Posições de entrada logo após o último bloco consumido
+        self.read_positions = self._read_positions()
+        
+        # Maior horário de evento visto: encerra dias passada a janela de atraso
+        self.event_watermark = 0
+        
+        # Pool de parsing: blocos vão para os workers e voltam em ordem de leitura
+        self.workers = max(1, workers or config.PROCESSOR_WORKERS)
+        self.pool = None
+        self.pending_chunks = deque()  # (resultado assíncrono, linhas, posições)
+        self.inflight_lines = 0
+        if self.workers > 1:
+            self.pool = multiprocessing.Pool(self.workers, initializer=_init_parse_worker)
+        
+        # Estágio de gravação: commita um lote enquanto o próximo é montado
+        self.writer = BatchWriter()
+        
+        # Selagem de dias encerrados (thread em segundo plano)
+        self.sealer = None
         
         print("✅ Processador inicializado")
     
@@ -78,7 +184,6 @@ class LogProcessor:
         
         if self.conn:
             database.create_log_schema(self.conn)
-            database.load_caches(self.conn)
             self.current_db_date = target_date
             print(f"📂 Conectado ao DB: {os.path.basename(db_path)}")
             return True
@@ -87,19 +192,15 @@ class LogProcessor:
             return False
     
     def check_db_rotation(self):
-        """Verifica se precisa trocar de banco (mudança de dia)"""
+        """
+        Troca o DB de estatísticas na mudança de dia.
+        As linhas não dependem disto: cada uma vai para o DB do dia do seu evento.
+        """
         today = date.today()
         
         if self.current_db_date != today:
             print(f"📅 Mudança de dia detectada: {self.current_db_date} → {today}")
             
-            # Salva lote pendente no DB antigo
-            if self.log_batch:
-                print(f"💾 Salvando {len(self.log_batch)} logs pendentes do dia anterior...")
-                inserted = database.insert_log_batch(self.conn, self.log_batch)
-                self.stats['lines_inserted'] += inserted
-                self.log_batch = []
-            
             # Atualiza stats do dia anterior
             self._update_db_stats()
             
@@ -115,68 +216,240 @@ class LogProcessor:
         
         return True
     
-    def is_noise(self, line: str) -> bool:
-        """Verifica se a linha é ruído (deve ser filtrada)"""
-        for noise_filter in config.NOISE_FILTERS:
-            if noise_filter in line:
-                return True
-        return False
+    def _is_due(self, day_batch: DayBatch, now: float) -> bool:
+        """Lote do dia pronto: cheio, antigo ou dia encerrado (janela de atraso passou)"""
+        return (len(day_batch.rows) >= config.BATCH_SIZE
+                or now - day_batch.created_at > self.batch_timeout
+                or day_batch.end_ts + config.LATE_DATA_WINDOW_SEC <= self.event_watermark)
+    
+    def should_flush_batch(self) -> bool:
+        """Verifica se algum lote de dia deve ser salvo"""
+        now = time.time()
+        return any(self._is_due(day_batch, now) for day_batch in self.day_batches.values())
     
-    def process_line(self, line: str) -> bool:
-        """Processa uma linha de log"""
-        self.stats['lines_processed'] += 1
+    def flush_batch(self, force: bool = False):
+        """Entrega ao writer os lotes de dia prontos (force: todos), do bloco mais antigo ao mais novo"""
+        now = time.time()
+        for day_batch in sorted(self.day_batches.values(), key=lambda b: b.first_seq):
+            if force or self._is_due(day_batch, now):
+                del self.day_batches[day_batch.db_path]
+                self.writer.submit(day_batch.db_path, day_batch.rows, self._resume_positions(),
+                                   day_batch.chunks)
         
-        # Filtro de ruído
-        if self.is_noise(line):
-            self.stats['lines_filtered'] += 1
-            return False
+        self.collect_writes()
+    
+    def _resume_positions(self) -> dict:
+        """
+        De onde retomar a entrada se o processo parar após o próximo commit: início
+        do bloco mais antigo ainda em algum lote de dia (ou tudo o que já foi lido).
+        """
+        if self.day_batches:
+            oldest = min(self.day_batches.values(), key=lambda b: b.first_seq)
+            positions, chunk_seq = oldest.start_positions, oldest.first_seq
+        else:
+            positions, chunk_seq = self.read_positions, self.next_chunk_seq
+        return dict(positions, **{database.CHUNK_SEQ_SOURCE: (chunk_seq, 0)})
+    
+    def _buffered_rows(self) -> int:
+        """Linhas nos lotes de dia ainda não entregues ao writer"""
+        return sum(len(day_batch.rows) for day_batch in self.day_batches.values())
+    
+    def collect_writes(self):
+        """Contabiliza lotes já commitados pelo writer e libera a entrada correspondente"""
+        for positions, inserted in self.writer.collect():
+            if not inserted:
+                continue
+            
+            self.stats['lines_inserted'] += inserted
+            self._after_commit(positions)
+            
+            # Atualiza stats a cada 1000 inserções
+            if self.stats['lines_inserted'] % 1000 == 0:
+                self._update_db_stats()
+    
+    def _read_positions(self) -> dict:
+        """Até onde a entrada já foi lida (tudo antes disso está em algum lote de dia ou foi filtrado)"""
+        positions = {HOT_BUFFER_SOURCE: self.log_tail.position()}
+        if self.ring_consumer:
+            positions.update(self.ring_consumer.positions())
+        return positions
+    
+    def _after_commit(self, positions: dict):
+        """Libera a entrada já gravada (chamado após o commit do lote + offsets)"""
+        # Libera espaço nos rings só depois do commit no DB
+        if self.ring_consumer:
+            self.ring_consumer.commit(positions)
         
-        # Parse da linha
-        parsed = database.parse_log_line(line)
-        if not parsed:
-            self.stats['lines_failed'] += 1
-            return False
+        # Apaga segmentos totalmente commitados
+        if config.HOT_BUFFER_SEGMENTED and time.time() - self.last_gc_time > config.HOT_GC_INTERVAL_SEC:
+            seq, _ = positions[HOT_BUFFER_SOURCE]
+            removed = hot_buffer.collect_segments(seq)
+            if removed:
+                print(f"🧹 {removed} segmento(s) HOT removido(s)")
+            self.last_gc_time = time.time()
+    
+    def _iter_input_chunks(self):
+        """
+        Gera blocos de linhas enquanto houver entrada disponível.
         
-        # Prepara dados para inserção
-        prepared = database.prepare_log_for_db(self.conn, parsed)
-        if not prepared:
-            self.stats['lines_failed'] += 1
-            return False
+        Leitura preguiçosa e limitada: cada bloco tem no máximo
+        PROCESSOR_CHUNK_BYTES por fonte e nada é lido enquanto houver
+        MAX_INFLIGHT_LINES linhas aguardando gravação (backpressure).
+        Cada bloco vem com as posições de leitura logo após ele.
+        """
+        while running:
+            if self._buffered_rows() + self.inflight_lines >= config.MAX_INFLIGHT_LINES:
+                self.stats['backpressure_events'] += 1
+                return
+            
+            # Rings (memória) primeiro, depois o buffer em disco
+            lines = []
+            if self.ring_consumer:
+                lines = self.ring_consumer.read_lines(config.PROCESSOR_CHUNK_BYTES)
+            lines.extend(self.log_tail.read_lines(config.PROCESSOR_CHUNK_BYTES))
+            
+            if not lines:
+                return
+            yield lines, self._read_positions()
+    
+    def drain_available(self) -> int:
+        """Processa a entrada disponível em streaming, gravando lotes durante o catch-up"""
+        processed = 0
+        
+        for lines, positions in self._iter_input_chunks():
+            if self.pool is None:
+                processed += len(lines)
+                if not self._consume_chunk(parse_chunk(lines), len(lines), positions):
+                    break
+                continue
+            
+            # Mantém até 2 blocos por worker em voo
+            result = self.pool.apply_async(parse_chunk, (lines,))
+            self.pending_chunks.append((result, len(lines), positions))
+            self.inflight_lines += len(lines)
+            if len(self.pending_chunks) < self.workers * 2:
+                continue
+            
+            processed += self.pending_chunks[0][1]
+            if not self._collect_chunk():
+                break
         
-        # Adiciona ao lote
-        self.log_batch.append(prepared)
-        self.stats['last_log_time'] = datetime.now()
+        # Nada fica em voo quando a entrada esgota
+        while self.pending_chunks:
+            processed += self.pending_chunks[0][1]
+            self._collect_chunk()
         
-        return True
+        return processed
     
-    def should_flush_batch(self) -> bool:
-        """Verifica se deve salvar o lote"""
-        # Por tamanho
-        if len(self.log_batch) >= config.BATCH_SIZE:
-            return True
+    def _collect_chunk(self) -> bool:
+        """Aguarda o bloco mais antigo do pool e aplica o resultado"""
+        result, count, positions = self.pending_chunks[0]
+        parsed = result.get()
+        self.pending_chunks.popleft()
+        self.inflight_lines -= count
+        return self._consume_chunk(parsed, count, positions)
+    
+    def _consume_chunk(self, parsed: Tuple[List[Tuple], Dict[str, int], int], count: int, positions: dict) -> bool:
+        """
+        Roteia as linhas do bloco para os lotes dos seus dias (sempre em ordem de leitura).
+        Retorna False se a rotação de DB falhar.
+        """
+        rows, noise_hits, failed = parsed
+        self.stats['lines_processed'] += count
+        self.stats['lines_failed'] += failed
+        for rule, hits in noise_hits.items():
+            self.stats['lines_filtered'] += hits
+            self.stats['noise_hits'][rule] = self.stats['noise_hits'].get(rule, 0) + hits
         
-        # Por timeout
-        if self.log_batch and (time.time() - self.last_batch_time > config.BATCH_TIMEOUT_SEC):
-            return True
+        chunk_seq = self.next_chunk_seq
+        self.next_chunk_seq += 1
+        start_positions = self.read_positions
+        self.read_positions = positions
+        
+        if rows:
+            self._route_rows(rows, chunk_seq, start_positions)
+            self.stats['last_log_time'] = datetime.now()
+        
+        self._track_catchup(count)
         
-        return False
+        # Flush a cada bloco: os lotes nunca crescem muito além de BATCH_SIZE
+        if self.should_flush_batch():
+            self.flush_batch()
+        
+        return self.check_db_rotation()
     
-    def flush_batch(self):
-        """Salva lote no banco"""
-        if not self.log_batch:
-            return
+    def _route_rows(self, rows: List[Tuple], chunk_seq: int, start_positions: dict):
+        """Distribui as linhas de um bloco pelo dia (ou shard) do timestamp de cada uma"""
+        by_day = {}
+        start = end = 0
+        for row in rows:
+            ts = row[0]
+            if not start <= ts < end:
+                db_path, start, end = database.partition_bounds(ts)
+                current = by_day.setdefault(db_path, (end, []))[1]
+            current.append(row)
         
-        batch_size = len(self.log_batch)
-        inserted = database.insert_log_batch(self.conn, self.log_batch)
+        # Horário dos eventos (limitado ao relógio: um timestamp absurdo não encerra dias)
+        self.event_watermark = max(self.event_watermark, min(max(row[0] for row in rows), time.time() + 60))
         
-        if inserted > 0:
-            self.stats['lines_inserted'] += inserted
-            self.log_batch = []
-            self.last_batch_time = time.time()
+        for db_path, (end, day_rows) in by_day.items():
+            day_batch = self.day_batches.get(db_path)
+            if day_batch is None:
+                day_batch = self.day_batches[db_path] = DayBatch(db_path, end, chunk_seq, start_positions)
+            day_batch.rows.extend(day_rows)
+            day_batch.chunks.append((chunk_seq, len(day_rows)))
             
-            # Atualiza stats a cada 1000 inserções
-            if self.stats['lines_inserted'] % 1000 == 0:
-                self._update_db_stats()
+            if end + config.LATE_DATA_WINDOW_SEC <= self.event_watermark:
+                self.stats['late_rows'] += len(day_rows)
+    
+    def start_sealing(self):
+        """Confere o catálogo e sela (e arquiva) os dias encerrados em uma thread própria (uma por vez)"""
+        if self.sealer is not None and self.sealer.is_alive():
+            return
+        archiving = bool(config.ARCHIVE_AFTER_DAYS) and archive.available()
+        
+        self.sealer = threading.Thread(target=self._seal_and_archive, args=(archiving,),
+                                       name="megalog-sealer", daemon=True)
+        self.sealer.start()
+    
+    def _seal_and_archive(self, archiving: bool):
+        try:
+            catalog.sync()  # DBs criados por fora (ex: cópia de backup)
+            bloom.build_missing()  # Dias selados antes dos filtros de Bloom
+        except Exception as e:
+            print(f"❌ Erro ao conferir catálogo: {e}")
+        sealing.seal_pending_days(config.SEAL_MAX_AGE_DAYS)
+        if archiving:
+            archive.archive_pending_days()
+    
+    def _track_catchup(self, lines: int):
+        """Acumula linhas da fase de catch-up atual"""
+        if self.catchup_started is None:
+            self.catchup_started = time.time()
+            self.catchup_lines = 0
+        self.catchup_lines += lines
+    
+    def _end_catchup(self):
+        """Fim da fase de catch-up (entrada esgotada): registra a vazão de drenagem"""
+        if self.catchup_started is None:
+            return
+        
+        elapsed = time.time() - self.catchup_started
+        if elapsed >= config.CATCHUP_MIN_REPORT_SEC:
+            self.stats['catchup_rate'] = self.catchup_lines / elapsed
+            print(f"✅ Backlog drenado: {self.catchup_lines:,} linhas em {elapsed:.1f}s "
+                  f"({self.stats['catchup_rate']:,.0f} linhas/s)")
+        
+        self.catchup_started = None
+        self.catchup_lines = 0
+    
+    def _sample_backlog(self):
+        """Bytes ainda não lidos nas fontes de entrada"""
+        backlog = self.log_tail.pending_bytes()
+        if self.ring_consumer:
+            backlog += self.ring_consumer.pending_bytes()
+        self.stats['backlog_bytes'] = backlog
+        return backlog
     
     def _update_db_stats(self):
         """Atualiza estatísticas no banco"""
@@ -188,6 +461,17 @@ class LogProcessor:
             database.update_processor_stats(self.conn, 'lines_inserted', self.stats['lines_inserted'])
             database.update_processor_stats(self.conn, 'lines_filtered', self.stats['lines_filtered'])
             database.update_processor_stats(self.conn, 'lines_failed', self.stats['lines_failed'])
+            database.update_processor_stats(self.conn, 'backlog_bytes', self.stats['backlog_bytes'])
+            database.update_processor_stats(self.conn, 'catchup_lines_per_sec', round(self.stats['catchup_rate']))
+            database.update_processor_stats(self.conn, 'late_rows', self.stats['late_rows'])
+            
+            # Descartes por regra de ruído (uma chave por regra)
+            for rule, hits in self.stats['noise_hits'].items():
+                database.update_processor_stats(self.conn, f'noise_hits:{rule}', hits)
+            
+            # Tempo de espera de cada lado do pipeline (quem é o gargalo)
+            for key in ('writer_busy_sec', 'writer_idle_sec', 'parser_blocked_sec'):
+                database.update_processor_stats(self.conn, key, round(self.writer.stats[key], 1))
             
             if self.stats['last_log_time']:
                 database.update_processor_stats(self.conn, 'last_log_seen', 
@@ -201,9 +485,28 @@ class LogProcessor:
         print(f"   Processadas: {self.stats['lines_processed']:,}")
         print(f"   Inseridas:   {self.stats['lines_inserted']:,}")
         print(f"   Filtradas:   {self.stats['lines_filtered']:,}")
+        for rule, hits in sorted(self.stats['noise_hits'].items(), key=lambda item: -item[1])[:5]:
+            print(f"      {hits:>12,}  {rule}")
         print(f"   Falhas:      {self.stats['lines_failed']:,}")
         print(f"   Rotações DB: {self.stats['db_rotations']}")
-        print(f"   Buffer:      {len(self.log_batch)} logs")
+        print(f"   Buffer:      {self._buffered_rows()} logs em {len(self.day_batches)} dia(s) "
+              f"(+{self.writer.pending()} lote(s) no writer)")
+        if self.stats['late_rows']:
+            print(f"   Atrasadas:   {self.stats['late_rows']:,} (após a janela de {config.LATE_DATA_WINDOW_SEC}s)")
+        print(f"   Backlog:     {self._sample_backlog() / (1024**2):.1f} MB")
+        if self.catchup_started is not None:
+            elapsed = max(time.time() - self.catchup_started, 1e-6)
+            print(f"   Catch-up:    {self.catchup_lines / elapsed:,.0f} linhas/s (em andamento)")
+        elif self.stats['catchup_rate']:
+            print(f"   Catch-up:    {self.stats['catchup_rate']:,.0f} linhas/s (último)")
+        if self.stats['backpressure_events']:
+            print(f"   Backpressure: {self.stats['backpressure_events']:,} pausas de leitura")
+        
+        # Parser bloqueado alto = SQLite é o gargalo; writer ocioso alto = parsing (ou falta de entrada)
+        writer = self.writer.stats
+        if writer['batches']:
+            print(f"   Escrita:     {writer['batches']:,} lotes | gravando {writer['writer_busy_sec']:.1f}s | "
+                  f"writer ocioso {writer['writer_idle_sec']:.1f}s | parser bloqueado {writer['parser_blocked_sec']:.1f}s")
         if self.stats['last_log_time']:
             print(f"   Último log:  {self.stats['last_log_time'].strftime('%Y-%m-%d %H:%M:%S')}")
     
@@ -212,9 +515,15 @@ class LogProcessor:
         global running
         
         print("🚀 Iniciando processador de logs...")
-        print(f"   Buffer:     {config.HOT_LOG_BUFFER_FILE}")
+        if config.HOT_BUFFER_SEGMENTED:
+            print(f"   Buffer:     {config.HOT_STORAGE_DIR} (segmentos de {config.HOT_SEGMENT_SIZE_BYTES / (1024**2):.0f} MB)")
+        else:
+            print(f"   Buffer:     {config.HOT_LOG_BUFFER_FILE}")
         print(f"   Batch Size: {config.BATCH_SIZE}")
-        print(f"   Timeout:    {config.BATCH_TIMEOUT_SEC}s")
+        print(f"   Timeout:    {self.batch_timeout}s")
+        print(f"   Workers:    {self.workers}")
+        if self.ring_consumer:
+            print(f"   Ring SHM:   {config.RING_BUFFER_DIR} ({len(self.ring_consumer.rings)} rings)")
         
         # Conecta ao DB inicial
         if not self.connect_to_db():
@@ -222,6 +531,8 @@ class LogProcessor:
             return
         
         last_stats_time = time.time()
+        last_ring_scan = time.time()
+        last_seal_check = 0
         stats_interval = 300  # 5 minutos
         
         while running:
@@ -232,28 +543,32 @@ class LogProcessor:
                     time.sleep(10)
                     continue
                 
-                # Lê novas linhas do buffer
-                new_lines = list(self.log_tail)
+                if self.ring_consumer and time.time() - last_ring_scan > 10:
+                    self.ring_consumer.rescan()
+                    last_ring_scan = time.time()
                 
-                if new_lines:
-                    # Processa cada linha
-                    for line in new_lines:
-                        self.process_line(line)
-                    
-                    # Verifica se deve salvar lote
-                    if self.should_flush_batch():
-                        self.flush_batch()
-                else:
+                # Processa em streaming tudo o que estiver disponível
+                drained = self.drain_available()
+                self.collect_writes()
+                if not drained:
                     # Sem novas linhas, verifica timeout do lote
                     if self.should_flush_batch():
                         self.flush_batch()
                     
+                    self._end_catchup()
+                    
                     # Dorme um pouco
-                    time.sleep(1)
+                    time.sleep(self.idle_sleep)
+                
+                # Sela dias encerrados (índices completos, VACUUM) em segundo plano
+                if time.time() - last_seal_check > config.SEAL_CHECK_INTERVAL_SEC:
+                    self.start_sealing()
+                    last_seal_check = time.time()
                 
                 # Imprime stats periodicamente
                 if time.time() - last_stats_time > stats_interval:
                     self.print_stats()
+                    self._update_db_stats()
                     last_stats_time = time.time()
                 
             except KeyboardInterrupt:
@@ -276,10 +591,16 @@ class LogProcessor:
         # Shutdown gracioso
         print("\n🛑 Encerrando processador...")
         
-        # Salva lote pendente
-        if self.log_batch:
-            print(f"💾 Salvando {len(self.log_batch)} logs pendentes...")
-            self.flush_batch()
+        # Blocos ainda no pool (erro no meio de uma drenagem)
+        while self.pending_chunks:
+            self._collect_chunk()
+        
+        # Salva lotes pendentes e espera o writer gravar tudo
+        if self.day_batches:
+            print(f"💾 Salvando {self._buffered_rows()} logs pendentes...")
+            self.flush_batch(force=True)
+        self.writer.close()
+        self.collect_writes()
         
         # Atualiza stats finais
         self._update_db_stats()
@@ -289,12 +610,32 @@ class LogProcessor:
         if self.conn:
             self.conn.close()
         
+        if self.ring_consumer:
+            self.ring_consumer.close()
+        
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+        
+        self.log_tail.close()
+        
         print("✅ Processador encerrado")
 
 # ==================== MAIN ====================
 
 def main():
     """Ponto de entrada"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Processador de Logs - MEGA LOG")
+    parser.add_argument('--workers', type=int, default=config.PROCESSOR_WORKERS,
+                        help='Processos de parsing (1 = tudo no processo principal)')
+    args = parser.parse_args()
+    
+    # Só ao rodar como serviço: módulos que importam parse_chunk mantêm seus sinais
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    
     print("=" * 60)
     print(f"  {config.SYSTEM_NAME} - Processador de Logs")
     print(f"  Versão: {config.SYSTEM_VERSION}")
@@ -312,7 +653,7 @@ def main():
     database.initialize_databases()
     
     # Inicia processador
-    processor = LogProcessor()
+    processor = LogProcessor(workers=args.workers)
     
     try:
         processor.run()
@@ -0,0 +1,195 @@
+# app/ring_buffer.py
+# Ring buffer em memória compartilhada (mmap) entre receptor e processador
+
+import os
+import mmap
+import glob
+import struct
+from typing import List, Tuple
+from app import config
+
+# ==================== LAYOUT ====================
+# [0:8]    magic
+# [8:16]   capacidade (bytes da área de dados)
+# [16:24]  id aleatório do ring (muda se o ring for recriado, ex: reboot limpa /dev/shm)
+# [64:72]  write_pos (monotônico, só o produtor escreve)
+# [128:136] read_pos (monotônico, só o consumidor escreve)
+# [HEADER_SIZE:] área de dados circular (linhas terminadas em \n)
+RING_MAGIC = b'MLRING01'
+HEADER_SIZE = 4096
+_WRITE_POS_OFFSET = 64
+_READ_POS_OFFSET = 128
+_POS = struct.Struct('<Q')
+
+def get_ring_path(worker_id: int) -> str:
+    """Caminho do ring de um worker do receptor"""
+    return os.path.join(config.RING_BUFFER_DIR, f"ring.{worker_id}")
+
+class RingBuffer:
+    """
+    Ring SPSC (um produtor, um consumidor) sobre arquivo mapeado em memória.
+
+    As posições são contadores de bytes que só crescem; o índice físico é
+    pos % capacidade. O produtor só publica lotes completos de linhas, então
+    o consumidor sempre enxerga dados terminando em \\n.
+    """
+
+    def __init__(self, path: str, capacity: int = None, create: bool = False):
+        self.path = path
+
+        if create and not os.path.exists(path):
+            capacity = capacity or config.RING_BUFFER_SIZE_BYTES
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.truncate(HEADER_SIZE + capacity)
+                f.seek(0)
+                f.write(RING_MAGIC + _POS.pack(capacity) + os.urandom(8))
+            os.replace(tmp_path, path)  # Consumidor nunca vê header incompleto
+
+        self._fd = os.open(path, os.O_RDWR)
+        size = os.fstat(self._fd).st_size
+        self._mm = mmap.mmap(self._fd, size)
+
+        if self._mm[0:8] != RING_MAGIC:
+            self.close()
+            raise ValueError(f"Arquivo não é um ring do MEGA LOG: {path}")
+
+        self.capacity = _POS.unpack_from(self._mm, 8)[0]
+        self.ring_id = self._mm[16:24].hex()
+        self.source = f"ring:{os.path.basename(path)}:{self.ring_id}"
+
+    # ---------- posições ----------
+
+    @property
+    def write_pos(self) -> int:
+        return _POS.unpack_from(self._mm, _WRITE_POS_OFFSET)[0]
+
+    @property
+    def read_pos(self) -> int:
+        return _POS.unpack_from(self._mm, _READ_POS_OFFSET)[0]
+
+    # ---------- produtor ----------
+
+    def publish(self, payload: bytes) -> bool:
+        """Publica um lote de linhas. Retorna False se não houver espaço (caller faz spill)"""
+        size = len(payload)
+        write_pos = self.write_pos
+
+        if size > self.capacity - (write_pos - self.read_pos):
+            return False
+
+        start = write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        base = HEADER_SIZE
+
+        self._mm[base + start:base + start + first] = payload[:first]
+        if first < size:
+            # Dá a volta no fim da área de dados
+            self._mm[base:base + size - first] = payload[first:]
+
+        # Publica só depois dos dados estarem copiados
+        _POS.pack_into(self._mm, _WRITE_POS_OFFSET, write_pos + size)
+        return True
+
+    # ---------- consumidor ----------
+
+    def read(self, start_pos: int, max_bytes: int) -> Tuple[bytes, int]:
+        """Lê a partir de start_pos até max_bytes, terminando em \\n. Retorna (dados, nova_pos)"""
+        available = self.write_pos - start_pos
+        if available <= 0:
+            return b'', start_pos
+
+        size = min(available, max_bytes)
+        start = start_pos % self.capacity
+        first = min(size, self.capacity - start)
+        base = HEADER_SIZE
+
+        data = self._mm[base + start:base + start + first]
+        if first < size:
+            data += self._mm[base:base + size - first]
+
+        # Só entrega linhas completas
+        if size < available:
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                return b'', start_pos
+            data = data[:cut]
+
+        return data, start_pos + len(data)
+
+    def commit(self, pos: int):
+        """Libera espaço até pos (chamado após o lote ser gravado no DB)"""
+        _POS.pack_into(self._mm, _READ_POS_OFFSET, pos)
+
+    def close(self):
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+        try:
+            os.close(self._fd)
+        except Exception:
+            pass
+
+class RingConsumer:
+    """Consome todos os rings dos workers do receptor (lado do processador)"""
+
+    def __init__(self, ring_dir: str = None, committed: dict = None):
+        self.ring_dir = ring_dir or config.RING_BUFFER_DIR
+        self.rings = {}      # path -> RingBuffer
+        self.cursors = {}    # path -> posição lida (ainda não commitada)
+        self.committed = committed or {}  # source -> (0, posição) commitada no DB
+        self.rescan()
+
+    def rescan(self):
+        """Abre rings criados depois do processador iniciar"""
+        for path in glob.glob(os.path.join(self.ring_dir, 'ring.*')):
+            if path.endswith('.tmp') or path in self.rings:
+                continue
+            try:
+                ring = RingBuffer(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignorando ring {path}: {e}")
+                continue
+            self.rings[path] = ring
+            self.cursors[path] = ring.read_pos
+            
+            # O DB pode estar à frente do read_pos (crash entre o commit do DB e o do ring)
+            committed = self.committed.get(ring.source)
+            if committed and ring.read_pos < committed[1] <= ring.write_pos:
+                self.cursors[path] = committed[1]
+                ring.commit(committed[1])
+            print(f"🔗 Ring conectado: {path} ({ring.capacity / (1024**2):.0f} MB)")
+
+    def read_lines(self, max_bytes: int = None) -> List[str]:
+        """Lê linhas pendentes de todos os rings"""
+        if max_bytes is None:
+            max_bytes = config.PROCESSOR_CHUNK_BYTES
+
+        lines = []
+        for path, ring in self.rings.items():
+            data, new_pos = ring.read(self.cursors[path], max_bytes)
+            if data:
+                self.cursors[path] = new_pos
+                lines.extend(data.decode('utf-8', errors='ignore').splitlines())
+        return lines
+
+    def positions(self) -> dict:
+        """Snapshot das posições lidas, no formato dos offsets do DB: {source: (0, pos)}"""
+        return {ring.source: (0, self.cursors[path]) for path, ring in self.rings.items()}
+
+    def commit(self, positions: dict):
+        """Libera espaço nos rings até as posições informadas (após o commit no DB)"""
+        for ring in self.rings.values():
+            if ring.source in positions:
+                ring.commit(positions[ring.source][1])
+
+    def pending_bytes(self) -> int:
+        """Bytes publicados e ainda não lidos"""
+        return sum(ring.write_pos - self.cursors[path] for path, ring in self.rings.items())
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+        self.rings = {}
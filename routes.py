@@ -4,9 +4,10 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from functools import wraps
 from datetime import datetime, timedelta
-from app import config
+from app import config, search_pool, export
 from app.models import User, AuditLog, LogSearch, LogStatistics, ensure_admin_user
 from app.database import get_current_log_db_connection, get_processor_stats, get_log_db_path, get_db_connection
+from app.hot_buffer import get_buffer_size_bytes
 import psutil
 import os
 import requests
@@ -248,10 +249,8 @@ def api_system_status():
         except Exception:
             disk_cold_data = {'percent': 0, 'used_gb': 0, 'total_gb': 0}
 
-        # Buffer HOT size
-        buffer_size_mb = 0
-        if os.path.exists(config.HOT_LOG_BUFFER_FILE):
-            buffer_size_mb = os.path.getsize(config.HOT_LOG_BUFFER_FILE) / (1024**2)
+        # Buffer HOT size (arquivo único ou segmentos)
+        buffer_size_mb = get_buffer_size_bytes() / (1024**2)
 
         # Stats do processador e logs de hoje
         conn = get_current_log_db_connection()
@@ -285,6 +284,29 @@ def api_system_status():
 
 # ==================== FORENSIC SEARCH ====================
 
+# Campos do formulário de busca (busca e exportação)
+SEARCH_FIELDS = ('date_inicio', 'hora_inicio', 'date_fim', 'hora_fim', 'ip_privado', 'port_privada',
+                 'ip_publico', 'port_publica', 'ip_destino', 'port_destino')
+
+def _search_criteria(search_params):
+    """Critérios de LogSearch.search/count a partir dos campos do formulário (ValueError se data inválida)"""
+    return dict(
+        start_dt=datetime.strptime(
+            f"{search_params['date_inicio']} {search_params['hora_inicio']}",
+            '%Y-%m-%d %H:%M:%S'
+        ),
+        end_dt=datetime.strptime(
+            f"{search_params['date_fim']} {search_params['hora_fim']}",
+            '%Y-%m-%d %H:%M:%S'
+        ),
+        ip_privado=search_params['ip_privado'].strip() or None,
+        port_privada=search_params['port_privada'].strip() or None,
+        ip_publico=search_params['ip_publico'].strip() or None,
+        port_publica=search_params['port_publica'].strip() or None,
+        ip_destino=search_params['ip_destino'].strip() or None,
+        port_destino=search_params['port_destino'].strip() or None,
+    )
+
 @main_bp.route('/search', methods=['GET', 'POST'])
 @login_required
 def search_forensics():
@@ -294,6 +316,13 @@ def search_forensics():
     total_count = 0
     page = int(request.args.get('page', 1))
     per_page = 100  # Registros por página
+    # Cursor da página (última linha da anterior ou primeira da seguinte)
+    after = request.args.get('after') or None
+    before = request.args.get('before') or None
+    if not (after or before):
+        page = 1
+    has_prev = has_next = False
+    total_exact = True
 
     # Parâmetros padrão
     search_params = {
@@ -320,17 +349,9 @@ def search_forensics():
                     search_params[key] = request.args.get(key)
         
         try:
-            # Parse de datas
-            start_dt = datetime.strptime(
-                f"{search_params['date_inicio']} {search_params['hora_inicio']}",
-                '%Y-%m-%d %H:%M:%S'
-            )
-            end_dt = datetime.strptime(
-                f"{search_params['date_fim']} {search_params['hora_fim']}",
-                '%Y-%m-%d %H:%M:%S'
-            )
+            criteria = _search_criteria(search_params)
             
-            if start_dt > end_dt:
+            if criteria['start_dt'] > criteria['end_dt']:
                 flash('Data/hora de início não pode ser maior que a de fim.', 'danger')
                 return render_template('search_forensics.html', 
                                      results=results, 
@@ -339,30 +360,44 @@ def search_forensics():
                                      page=page,
                                      total_pages=0)
             
-            # Executa busca (sem limite, pegamos tudo)
-            all_results, total_count = LogSearch.search(
-                start_dt=start_dt,
-                end_dt=end_dt,
-                ip_privado=search_params['ip_privado'].strip() or None,
-                port_privada=search_params['port_privada'].strip() or None,
-                ip_publico=search_params['ip_publico'].strip() or None,
-                port_publica=search_params['port_publica'].strip() or None,
-                ip_destino=search_params['ip_destino'].strip() or None,
-                port_destino=search_params['port_destino'].strip() or None,
-                limit=10000,  # Limite alto para pegar todos
+            # Total contado em paralelo com a página (exato ou, passado o tempo de
+            # SEARCH_COUNT_BUDGET_SEC, estimado). Nas páginas seguintes vem do link
+            counting = None
+            if (after or before) and request.args.get('total', '').isdigit():
+                total_count = int(request.args['total'])
+                total_exact = request.args.get('exact') == '1'
+            else:
+                counting = search_pool.run_in_background(LogSearch.count, **criteria)
+            
+            # Executa busca (só as linhas da página pedida; uma a mais diz se há outra página)
+            rows = LogSearch.search(
+                **criteria,
+                limit=per_page + 1,
+                after=after,
+                before=before,
                 user_id=user.id,
                 username=user.username,
                 ip_address=request.remote_addr
             )
+            more = len(rows) > per_page
+            if before:
+                results = rows[1:] if more else rows
+                has_prev, has_next = more, True
+                if not more:
+                    page = 1
+            else:
+                results = rows[:per_page]
+                has_prev, has_next = page > 1, more
+            
+            if counting is not None:
+                total_count, total_exact = counting.result()
             
             # Calcula paginação
             total_pages = (total_count + per_page - 1) // per_page
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            results = all_results[start_idx:end_idx]
             
-            if total_count > 0:
-                flash(f'{total_count} registros encontrados. Página {page} de {total_pages}.', 'success')
+            if results:
+                flash(f'{LogSearch.format_count(total_count, total_exact)} registros encontrados. '
+                      f'Página {page} de {LogSearch.format_count(total_pages, total_exact)}.', 'success')
             else:
                 flash('Nenhum registro encontrado para os critérios informados.', 'info')
                 
@@ -379,40 +414,53 @@ def search_forensics():
                          total_count=total_count,
                          page=page,
                          total_pages=total_pages,
+                         total_label=LogSearch.format_count(total_count, total_exact),
+                         total_exact=total_exact,
+                         has_prev=has_prev,
+                         has_next=has_next,
                          per_page=per_page)
 
-@main_bp.route('/export-results', methods=['POST'])
+@main_bp.route('/export-results', methods=['GET', 'POST'])
 @login_required
 def export_results():
-    """Exporta resultados em CSV"""
-    import csv
-    from io import StringIO
-    from flask import make_response
+    """Exporta todos os resultados da busca (CSV ou NDJSON, opcionalmente gzip) em streaming"""
+    from flask import Response, stream_with_context
     
-    # Recebe dados do form (JSON)
-    import json
-    results = json.loads(request.form.get('results', '[]'))
+    # Parâmetros da busca: a exportação refaz a busca no servidor, página a página
+    search_params = {key: request.values.get(key, '') for key in SEARCH_FIELDS}
+    export_format = request.values.get('format', 'csv')
+    if export_format not in export.FORMATS:
+        export_format = 'csv'
+    compress = request.values.get('gzip') == '1'
     
-    if not results:
-        flash('Nenhum resultado para exportar.', 'warning')
+    try:
+        criteria = _search_criteria(search_params)
+    except ValueError as e:
+        flash(f'Erro no formato de data/hora: {e}', 'danger')
         return redirect(url_for('main.search_forensics'))
     
-    # Cria CSV
-    output = StringIO()
-    writer = csv.DictWriter(output, fieldnames=results[0].keys())
-    writer.writeheader()
-    writer.writerows(results)
+    # Filtros validados antes da auditoria e da resposta: um erro dentro do streaming
+    # já sairia com status 200 e um arquivo truncado
+    try:
+        LogSearch._filters(**{key: value for key, value in criteria.items()
+                              if key not in ('start_dt', 'end_dt')})
+    except ValueError as e:
+        flash(f'Filtro inválido (porta deve ser numérica): {e}', 'danger')
+        return redirect(url_for('main.search_forensics'))
     
-    # Log de auditoria
+    # Log de auditoria (antes do envio: o download pode ser interrompido no meio)
     user = get_current_user()
     AuditLog.log_action(user.id, user.username, 'EXPORTACAO',
-                       f'{len(results)} registros exportados',
+                       f'{LogSearch.describe_criteria(**criteria)} | Formato: {export_format}'
+                       f'{" (gzip)" if compress else ""}',
                        request.remote_addr)
     
-    # Retorna CSV
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = f'attachment; filename=logs_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    response.headers['Content-Type'] = 'text/csv'
+    # Retorna o arquivo em streaming (memória constante, qualquer tamanho)
+    rows = LogSearch.iter_results(**criteria)
+    filename = f'logs_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}{".gz" if compress else ""}'
+    response = Response(stream_with_context(export.stream(rows, export_format, compress)),
+                        mimetype=export.content_type(export_format, compress))
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
     
     return response
 
@@ -446,114 +494,30 @@ def api_daily_charts(date_str):
     try:
         print(f"[DEBUG] Charts API chamada para data: {date_str}")
         selected_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        db_path = get_log_db_path(selected_date)
-        print(f"[DEBUG] Caminho do banco: {db_path}")
 
-        if not os.path.exists(db_path):
-            print(f"[ERROR] Banco não encontrado: {db_path}")
+        # Agregados somados dos DBs do dia (diário ou shards) e dos arquivos colunares
+        charts = LogStatistics.get_daily_charts(selected_date)
+        if charts is None:
+            print(f"[ERROR] Banco não encontrado: {date_str}")
             return jsonify({'error': 'Banco de dados não encontrado'}), 404
 
-        conn = get_db_connection(db_path)
-        if not conn:
-            print(f"[ERROR] Erro ao conectar ao banco")
-            return jsonify({'error': 'Erro ao conectar ao banco'}), 500
-
-        # Gráfico de Protocolos
-        cursor = conn.execute("""
-            SELECT d.name as protocol, COUNT(*) as count
-            FROM logs l
-            JOIN d_protocols d ON l.protocol_id = d.id
-            GROUP BY l.protocol_id
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        protocols = [{'name': row['protocol'], 'count': row['count']} for row in cursor.fetchall()]
-
-        # Gráfico de Interfaces (origem)
-        cursor = conn.execute("""
-            SELECT d.name as interface, COUNT(*) as count
-            FROM logs l
-            JOIN d_interfaces d ON l.interface_in_id = d.id
-            GROUP BY l.interface_in_id
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        interfaces = [{'name': row['interface'], 'count': row['count']} for row in cursor.fetchall()]
-
-        # Timeline (logs por hora)
-        cursor = conn.execute("""
-            SELECT
-                strftime('%H:00', datetime(timestamp, 'unixepoch', 'localtime')) as hour,
-                COUNT(*) as count
-            FROM logs
-            GROUP BY hour
-            ORDER BY hour
-        """)
-        timeline = [{'hour': row['hour'], 'count': row['count']} for row in cursor.fetchall()]
-
-        # Top IPs Públicos (NAT)
-        cursor = conn.execute("""
-            SELECT
-                CASE
-                    WHEN nat_ip_pub IS NOT NULL THEN
-                        printf('%d.%d.%d.%d',
-                            (nat_ip_pub >> 24) & 255,
-                            (nat_ip_pub >> 16) & 255,
-                            (nat_ip_pub >> 8) & 255,
-                            nat_ip_pub & 255)
-                    ELSE 'N/A'
-                END as ip,
-                COUNT(*) as count
-            FROM logs
-            WHERE nat_ip_pub IS NOT NULL
-            GROUP BY nat_ip_pub
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        top_ips = [{'ip': row['ip'], 'count': row['count']} for row in cursor.fetchall()]
-
-        # Top IPs de Destino (mais acessados) com informação de ASN
-        # Filtra apenas IPs públicos (não RFC1918)
-        cursor = conn.execute("""
-            SELECT
-                CASE
-                    WHEN dst_ip IS NOT NULL THEN
-                        printf('%d.%d.%d.%d',
-                            (dst_ip >> 24) & 255,
-                            (dst_ip >> 16) & 255,
-                            (dst_ip >> 8) & 255,
-                            dst_ip & 255)
-                    ELSE 'N/A'
-                END as ip,
-                COUNT(*) as count
-            FROM logs
-            WHERE dst_ip IS NOT NULL
-                -- Filtra IPs privados RFC1918
-                AND NOT ((dst_ip >> 24) & 255 = 10)  -- 10.0.0.0/8
-                AND NOT (((dst_ip >> 24) & 255 = 172) AND (((dst_ip >> 16) & 255) BETWEEN 16 AND 31))  -- 172.16.0.0/12
-                AND NOT (((dst_ip >> 24) & 255 = 192) AND (((dst_ip >> 16) & 255) = 168))  -- 192.168.0.0/16
-                AND NOT ((dst_ip >> 24) & 255 = 127)  -- 127.0.0.0/8 (loopback)
-                AND NOT ((dst_ip >> 24) & 255 = 0)  -- 0.0.0.0/8
-            GROUP BY dst_ip
-            ORDER BY count DESC
-            LIMIT 10
-        """)
+        protocols = [{'name': name, 'count': count} for name, count in charts['protocols']]
+        interfaces = [{'name': name, 'count': count} for name, count in charts['interfaces']]
+        timeline = [{'hour': hour, 'count': count} for hour, count in charts['timeline']]
+        top_ips = [{'ip': ip, 'count': count} for ip, count in charts['top_nat_ips']]
 
         # Enriquece com informação de ASN (limitado aos top 10 para não sobrecarregar API)
         top_dst_ips = []
-        for row in cursor.fetchall():
-            ip = row['ip']
+        for ip, count in charts['top_dst_ips']:
             asn_info = get_ip_asn_info(ip)
             top_dst_ips.append({
                 'ip': ip,
-                'count': row['count'],
+                'count': count,
                 'asn': asn_info['asn'] if asn_info else 'N/A',
                 'org': asn_info['org'] if asn_info else 'N/A',
                 'country': asn_info['country'] if asn_info else 'N/A'
             })
 
-        conn.close()
-
         print(f"[DEBUG] Dados gerados - Protocolos: {len(protocols)}, Interfaces: {len(interfaces)}, Timeline: {len(timeline)}, Top IPs NAT: {len(top_ips)}, Top IPs Destino: {len(top_dst_ips)}")
 
         return jsonify({
@@ -680,7 +644,10 @@ def health():
             conn_logs.close()
         
         # Verifica buffer
-        buffer_exists = os.path.exists(config.HOT_LOG_BUFFER_FILE)
+        if config.HOT_BUFFER_SEGMENTED:
+            buffer_exists = os.path.isdir(config.HOT_STORAGE_DIR)
+        else:
+            buffer_exists = os.path.exists(config.HOT_LOG_BUFFER_FILE)
         
         return jsonify({
             'status': 'healthy',
@@ -7,6 +7,7 @@ from app import config
 from app.routes import main_bp
 from app.database import initialize_databases
 from app.models import ensure_admin_user
+from app import catalog
 
 def create_app():
     """Factory do Flask"""
@@ -31,6 +32,15 @@ def create_app():
     print("🔧 Inicializando bancos de dados...")
     initialize_databases()
     
+    # Busca e datas disponíveis leem só o catálogo: registra DBs que ele ainda não
+    # conhece (anteriores ao catálogo, copiados, sem processador rodando)
+    try:
+        added, removed = catalog.sync()
+        if added or removed:
+            print(f"📚 Catálogo: {added} arquivo(s) registrado(s), {removed} removido(s)")
+    except Exception as e:
+        print(f"⚠️ Erro ao conferir catálogo: {e}")
+    
     # Garante que admin existe
     ensure_admin_user()
     
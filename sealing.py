@@ -0,0 +1,122 @@
+# app/sealing.py
+# Selagem de DBs de dias encerrados
+#
+# O dia ativo grava só com os índices de config.ACTIVE_DAY_INDEXES. Quando o dia
+# termina (+ SEAL_DELAY_SEC para linhas atrasadas), a selagem cria os índices
+# forenses completos, roda ANALYZE/PRAGMA optimize, compacta com VACUUM e marca o
+# arquivo como selado: buscas e estatísticas passam a abri-lo como imutável.
+# Se um dia selado ainda receber linhas, o writer tira a marca antes de gravar
+# (database.begin_log_write) e o dia volta a ser selado na próxima verificação.
+
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from app import config, database
+
+def db_size(db_path: str) -> int:
+    """Bytes do DB incluindo o WAL"""
+    return sum(os.path.getsize(path) for path in (db_path, f"{db_path}-wal") if os.path.exists(path))
+
+def seal_database(db_path: str) -> Dict[str, float]:
+    """Sela o DB de um dia encerrado. Retorna segundos por etapa e tamanhos (bytes)"""
+    conn = database.get_db_connection(db_path)
+    if conn is None:
+        raise RuntimeError(f"falha ao abrir {db_path}")
+
+    result = {'size_before': db_size(db_path)}
+    try:
+        start = time.perf_counter()
+        with conn:
+            database.create_log_indexes(conn)
+        result['indexes_sec'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        result['analyze_sec'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        result['vacuum_sec'] = time.perf_counter() - start
+
+        # Leitores imutáveis não leem o WAL: a marca só é criada com o WAL vazio,
+        # segurando o lock de escrita (um lote atrasado espera e depois tira a marca)
+        wal_path = f"{db_path}-wal"
+        for _ in range(10):
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                wal_empty = not os.path.exists(wal_path) or os.path.getsize(wal_path) == 0
+                if wal_empty:
+                    with open(database.get_sealed_marker_path(db_path), 'w') as f:
+                        f.write(datetime.now().isoformat())
+            finally:
+                conn.rollback()
+            if wal_empty:
+                break
+            time.sleep(1)
+        else:
+            raise RuntimeError("WAL não esvaziou (leitores ou gravações em andamento)")
+
+        result['size_after'] = db_size(db_path)
+        return result
+    finally:
+        conn.close()
+
+def days_to_seal(max_age_days: int = None, now: float = None) -> List[str]:
+    """DBs (diários e shards) de dias encerrados há mais de SEAL_DELAY_SEC ainda não selados (mais antigos primeiro)"""
+    if now is None:
+        now = time.time()
+
+    paths = []
+    for name in sorted(os.listdir(config.COLD_STORAGE_DIR)):
+        parsed = database.parse_log_db_name(name)
+        if parsed is None:
+            continue  # users.db, dictionary.db, marcas...
+        day = parsed[0]
+
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+        if now < day_end + config.SEAL_DELAY_SEC:
+            continue
+        if max_age_days is not None and day_end < now - max_age_days * 86400:
+            continue
+
+        path = os.path.join(config.COLD_STORAGE_DIR, name)
+        if not database.is_sealed(path):
+            paths.append(path)
+    return paths
+
+def seal_pending_days(max_age_days: int = None) -> int:
+    """Sela os dias encerrados pendentes. Retorna quantos foram selados"""
+    from app import catalog, bloom
+
+    sealed = 0
+    for db_path in days_to_seal(max_age_days):
+        name = os.path.basename(db_path)
+        try:
+            result = seal_database(db_path)
+        except Exception as e:
+            print(f"❌ Erro ao selar {name}: {e}")
+            continue
+
+        catalog.update_state(db_path)
+        bloom.rebuild(db_path)  # Tamanho exato para os IPs do dia
+        sealed += 1
+        total = result['indexes_sec'] + result['analyze_sec'] + result['vacuum_sec']
+        print(f"🔒 {name} selado em {total:.1f}s (índices {result['indexes_sec']:.1f}s, "
+              f"ANALYZE {result['analyze_sec']:.1f}s, VACUUM {result['vacuum_sec']:.1f}s) - "
+              f"{result['size_before'] / (1024**2):.1f} MB → {result['size_after'] / (1024**2):.1f} MB")
+    return sealed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Selagem de DBs de dias encerrados - MEGA LOG")
+    parser.add_argument('--all', action='store_true',
+                        help=f'Sela dias de qualquer idade (padrão: últimos {config.SEAL_MAX_AGE_DAYS} dias)')
+    args = parser.parse_args()
+
+    count = seal_pending_days(None if args.all else config.SEAL_MAX_AGE_DAYS)
+    print(f"✅ {count} DB(s) selado(s)")
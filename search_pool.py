@@ -0,0 +1,89 @@
+# app/search_pool.py
+# Execução concorrente das consultas por arquivo (DB de dia/shard ou arquivo colunar)
+#
+# Uma busca de 30 dias fazia 30 consultas em sequência. O SQLite libera o GIL
+# enquanto percorre o DB (e o NumPy nos arquivos colunares), então os arquivos
+# podem ser consultados em paralelo por threads. O pool é um só por processo
+# (SEARCH_MAX_THREADS); cada busca usa no máximo `concurrency` threads dele, para
+# uma busca pesada não ocupar o disco e as CPUs dos demais workers do gunicorn.
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+from app import config
+
+_executor: Optional[ThreadPoolExecutor] = None
+_background: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_END = object()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool de threads de busca do processo (criado no primeiro uso)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config.SEARCH_MAX_THREADS,
+                                           thread_name_prefix="megalog-search")
+        return _executor
+
+def run_in_background(func: Callable, *args, **kwargs) -> Future:
+    """
+    Executa func em outra thread, fora do pool de arquivos (ex: a contagem de uma
+    busca enquanto a página é montada). func pode usar run_bounded: ocupar uma thread
+    do pool esperando tarefas do próprio pool poderia travá-lo.
+    """
+    global _background
+    with _executor_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=config.SEARCH_MAX_THREADS,
+                                             thread_name_prefix="megalog-search-bg")
+    return _background.submit(func, *args, **kwargs)
+
+def run_bounded(func: Callable[[Any], Any], items: Iterable, concurrency: int = None,
+                timeout: float = None) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Executa func(item) para cada item, com até `concurrency` em andamento
+    (padrão SEARCH_CONCURRENCY). Rende (item, resultado, erro) na ordem em que
+    terminam; se o consumidor parar antes, o que não começou é cancelado.
+    Passados `timeout` segundos para de esperar: o que ainda não terminou é
+    abandonado (func deve se interromper sozinha, ex: progress handler do SQLite).
+    """
+    concurrency = max(1, min(concurrency or config.SEARCH_CONCURRENCY, config.SEARCH_MAX_THREADS))
+    deadline = None if timeout is None else time.monotonic() + timeout
+    items = iter(items)
+
+    if concurrency == 1:
+        for item in items:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            try:
+                yield item, func(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    executor = get_executor()
+    pending = {}
+    try:
+        for item in items:
+            pending[executor.submit(func, item)] = item
+            if len(pending) >= concurrency:
+                break
+
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                return
+            for future in done:
+                item = pending.pop(future)
+                following = next(items, _END)
+                if following is not _END:
+                    pending[executor.submit(func, following)] = following
+
+                error = future.exception()
+                yield item, None if error else future.result(), error
+    finally:
+        for future in pending:
+            future.cancel()
@@ -51,7 +51,7 @@ echo ""
 # ==================== INSTALAÇÃO DE DEPENDÊNCIAS ====================
 echo "📦 Instalando dependências Python..."
 
-pip3 install --break-system-packages -q flask werkzeug pandas numpy psutil pygtail gunicorn
+pip3 install --break-system-packages -q flask werkzeug pandas numpy psutil gunicorn
 
 echo "✅ Dependências instaladas"
 echo ""
@@ -88,6 +88,17 @@ if [ -f "log_generator.py" ]; then
     echo "  ✅ log_generator.py copiado"
 fi
 
+if [ -f "log_importer.py" ]; then
+    cp log_importer.py "$APP_DIR/"
+    chmod +x "$APP_DIR/log_importer.py"
+    cat > /usr/local/bin/megalog-import << EOF
+#!/bin/bash
+cd "$APP_DIR" && exec /usr/bin/python3 "$APP_DIR/log_importer.py" "\$@"
+EOF
+    chmod +x /usr/local/bin/megalog-import
+    echo "  ✅ log_importer.py copiado (comando megalog-import)"
+fi
+
 if [ -f "gunicorn_config.py" ]; then
     cp gunicorn_config.py "$APP_DIR/"
     echo "  ✅ gunicorn_config.py copiado"
@@ -0,0 +1,170 @@
+# app/tests/test_parsers.py
+# Equivalência dos caminhos rápidos de parsing com as implementações originais
+#
+# Rodar a partir do diretório acima do pacote: python -m pytest app/tests
+# (ou python -m unittest app.tests.test_parsers)
+
+import os
+import time
+import random
+import unittest
+from datetime import datetime, timedelta
+from app import database, ipv4, timestamps
+from app.tokenizer import tokenize_firewall_line, NO_MATCH
+
+# ==================== TOKENIZADOR ====================
+
+GOLDEN_CORPUS = [
+    # Formato do log_generator
+    "Dec  2 14:23:45 mikrotik-router firewall,info forward: in:ether1-cgnat out:ether5-wan, connection-state:new proto tcp, 100.64.3.10:41760->8.8.8.8:443, NAT (100.64.3.10:41760->177.67.176.147:41760)->8.8.8.8:443",
+    # Formato real do RouterOS (src-mac, flags TCP, len)
+    "Dec 12 03:04:05 10.0.0.1 firewall,info CGNAT forward: in:vlan100 out:sfp-sfpplus1, connection-state:new src-mac 4c:5e:0c:11:22:33, proto TCP (SYN), 100.80.3.210:51234->142.250.185.78:443, NAT (100.80.3.210:51234->177.67.176.147:51234)->142.250.185.78:443, len 60",
+    # Prefixo <PRI> do datagrama UDP
+    "<30>Dec  2 14:23:45 router firewall,info forward: in:ether1 out:ether2, proto udp, 100.64.0.1:5353->1.1.1.1:53, NAT (100.64.0.1:5353->177.67.176.150:10001)->1.1.1.1:53, len 72",
+    # Interface com espaço
+    "Dec  2 14:23:45 router firewall,info forward: in:REDE LAN out:LINK  WAN, proto tcp, 10.0.0.5:1000->8.8.4.4:80, NAT (10.0.0.5:1000->200.1.1.1:2000)->8.8.4.4:80",
+    # Sem NAT
+    "Dec  2 14:23:45 router firewall,info forward: in:ether1 out:ether2, proto tcp (ACK,PSH), 192.168.1.10:3333->192.168.2.20:22, len 52",
+    # ICMP (sem portas: nenhuma regex casa)
+    "Dec  2 14:23:45 router firewall,info forward: in:ether1 out:ether2, proto ICMP (type 8, code 0), 100.64.1.1->8.8.8.8, NAT (100.64.1.1->177.67.176.147)->8.8.8.8, len 84",
+    # Números antes do endpoint
+    "Dec  2 14:23:45 router firewall,info forward: in:ether1 out:ether2, proto 41 len 120, 2001.1:80->10.0.0.1:80",
+    # NAT malformado
+    "Dec  2 14:23:45 router firewall,info forward: in:ether1 out:ether2, proto tcp, 1.2.3.4:5->6.7.8.9:10, NAT (garbage)",
+    # 'out:' sem espaço antes
+    "Dec  2 14:23:45 router firewall,info forward: in:layout:x out:ether2, proto tcp, 1.2.3.4:5->6.7.8.9:10",
+    # Lixo
+    "",
+    "linha qualquer sem formato",
+    "Dec  2 14:23:45 router system,info user admin logged in from 10.0.0.1 via ssh",
+    "Dec  2 14:23:45 in:a out:b, proto x, 1:2->3:4, NAT (->5:6)",
+    "Dec  2 14:23:45 in: out:, proto\ttcp, 1.1:2->3.3:4 NAT  (a->5.5:66)",
+    "Dez  2 14:23:45 in:é out:b, proto tcp, 1.2.3.4:5->6.7.8.9:10",
+]
+
+def _fuzz_corpus(count: int, seed: int = 42) -> list:
+    """Mutações aleatórias do corpus (inserção/remoção/troca de caracteres)"""
+    rng = random.Random(seed)
+    alphabet = ' \t:.,->()0123456789NATinoutproxyz<é'
+    base = [line for line in GOLDEN_CORPUS if line]
+    lines = []
+    for _ in range(count):
+        chars = list(rng.choice(base))
+        for _ in range(rng.randint(1, 4)):
+            pos = rng.randrange(len(chars) + 1)
+            op = rng.random()
+            if op < 0.4:
+                chars.insert(pos, rng.choice(alphabet))
+            elif op < 0.7 and pos < len(chars):
+                del chars[pos]
+            elif pos < len(chars):
+                chars[pos] = rng.choice(alphabet)
+        lines.append(''.join(chars))
+    return lines
+
+class TokenizerTest(unittest.TestCase):
+    """Tokenizador x regex originais (database.parse_log_line_regex)"""
+
+    def assert_equivalent(self, lines):
+        for line in lines:
+            result = tokenize_firewall_line(line)
+            if result is None:
+                continue  # Fallback: a própria regex responde
+            expected = database.parse_log_line_regex(line)
+            self.assertEqual(None if result is NO_MATCH else result, expected, line)
+
+    def test_golden_corpus(self):
+        self.assert_equivalent(GOLDEN_CORPUS)
+
+    def test_fuzz(self):
+        self.assert_equivalent(_fuzz_corpus(200000))
+
+    def test_common_lines_skip_regex(self):
+        for line in GOLDEN_CORPUS[:5]:
+            self.assertIsNotNone(tokenize_firewall_line(line), line)
+
+    def test_parse_log_line(self):
+        for line in GOLDEN_CORPUS:
+            self.assertEqual(database.parse_log_line(line), database.parse_log_line_regex(line), line)
+
+# ==================== TIMESTAMPS ====================
+
+class TimestampTest(unittest.TestCase):
+    """Cache de timestamps x strptime (horário de verão e virada de ano)"""
+
+    def setUp(self):
+        self._tz = os.environ.get('TZ')
+
+    def tearDown(self):
+        if self._tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = self._tz
+        time.tzset()
+        timestamps.set_reference_time(None)
+        timestamps.clear_cache()
+
+    def assert_year(self, now: datetime):
+        timestamps.clear_cache()
+        timestamps.set_reference_time(now.timestamp())
+        day = datetime(now.year, 1, 1)
+        while day.year == now.year:
+            for hour in range(24):
+                for minute, second in ((0, 0), (17, 42), (59, 59)):
+                    ts_str = f"{day:%b} {day.day:>2} {hour:02d}:{minute:02d}:{second:02d}"
+                    self.assertEqual(timestamps.parse_syslog_timestamp(ts_str, 0.0),
+                                     timestamps.strptime_timestamp(ts_str, now), ts_str)
+            day += timedelta(days=1)
+
+        for ts_str in ("Feb 29 10:00:00", "Feb 30 10:00:00", "Foo  1 10:00:00", "Dec  2 24:00:00",
+                       "Dec  2 14:60:00", "Dec  2 14:23:60", "Dec  2 14:23", "dec 02 14:23:45", ""):
+            self.assertEqual(timestamps.parse_syslog_timestamp(ts_str, 0.0),
+                             timestamps.strptime_timestamp(ts_str, now), ts_str)
+
+    def test_timezones(self):
+        for tz in ('America/Sao_Paulo', 'America/New_York', 'Europe/Berlin', 'UTC'):
+            os.environ['TZ'] = tz
+            time.tzset()
+            for now in (datetime(2018, 1, 5, 12), datetime(2024, 7, 5, 12)):
+                with self.subTest(tz=tz, now=now):
+                    self.assert_year(now)
+
+# ==================== IPv4 ====================
+
+def _fuzz_ips(count: int, seed: int = 42):
+    """Strings e inteiros aleatórios perto das bordas de validação"""
+    rng = random.Random(seed)
+    alphabet = '0123456789....'
+    strings = ['', '0.0.0.0', '255.255.255.255', '256.1.1.1', '01.2.3.4', '1.2.3', '1.2.3.4.5',
+               ' 1.2.3.4', '1.2.3.4\n', '1.2.3.4\x00', '١.٢.٣.٤', '1..2.3', '0x1.2.3.4']
+    strings += [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 16))) for _ in range(count)]
+    strings += [f"{rng.randint(0, 300)}.{rng.randint(0, 300)}.{rng.randint(0, 300)}.{rng.randint(0, 300)}"
+                for _ in range(count)]
+    ints = [0, 1, -1, 0xFFFFFFFF, 0x100000000, True, 1.0, '1.2.3.4', None]
+    ints += [rng.randint(-10, 0x100000010) for _ in range(count)]
+    return strings, ints
+
+class IPv4Test(unittest.TestCase):
+    """Conversão de IPv4 x ipaddress (unitária e por coluna)"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.strings, cls.ints = _fuzz_ips(100000)
+
+    def test_ip_to_int(self):
+        for value in self.strings:
+            self.assertEqual(ipv4.ip_to_int(value), ipv4._ip_to_int_slow(value) if value else None, repr(value))
+
+    def test_int_to_ip(self):
+        for value in self.ints:
+            self.assertEqual(ipv4.int_to_ip(value), ipv4._int_to_ip_slow(value) if value else None, repr(value))
+
+    def test_columns(self):
+        self.assertEqual(ipv4.ips_to_ints(self.strings), [ipv4.ip_to_int(value) for value in self.strings])
+        expected = [ipv4.int_to_ip(value) for value in self.ints[9:]]
+        self.assertEqual(ipv4.ints_to_ips(self.ints[9:]), expected)
+        if ipv4.np is not None:
+            self.assertEqual(ipv4.ints_to_ips(ipv4.np.array(self.ints[9:], dtype=ipv4.np.int64)), expected)
+
+if __name__ == "__main__":
+    unittest.main()
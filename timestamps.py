@@ -0,0 +1,102 @@
+# app/timestamps.py
+# Conversão de timestamps syslog ("Dec  2 14:23:45") para Unix timestamp com cache
+#
+# Milhares de linhas compartilham o mesmo segundo: o epoch de cada string de
+# segundo fica em cache; em um miss, o epoch da hora ("Dec  2 14") vem de um
+# segundo cache e só minutos/segundos são somados. O strptime roda uma vez por
+# hora distinta, e o ano (com a virada dezembro/janeiro) uma vez por dia.
+
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from app import config
+
+# "Dec  2 14:23:45" -> epoch (segundos recentes)
+_SECOND_CACHE = {}
+
+# ("Dec", "2", "14") -> epoch de 14:00:00. Mudanças de horário de verão acontecem em
+# hora cheia, então dentro da hora o epoch é linear (exceto fusos com mudança de
+# 30 min, como Lord Howe, e só em horários que não existem no relógio local)
+_HOUR_CACHE = {}
+
+# Data de referência para ano/virada de ano: recalculada uma vez por dia
+_year_state = {'valid_until': 0.0, 'now': None}
+
+def strptime_timestamp(ts_str: str, now: datetime = None) -> Optional[int]:
+    """Conversão original via strptime (referência e fallback para formatos incomuns)"""
+    try:
+        if now is None:
+            now = datetime.now()
+        current_year = now.year
+        # Formato: "Dec  2 14:23:45"
+        dt_str = f"{ts_str} {current_year}"
+        dt = datetime.strptime(dt_str, '%b %d %H:%M:%S %Y')
+
+        # Ajuste de ano (se log é de dezembro mas estamos em janeiro)
+        if dt.month == 12 and now.month == 1:
+            dt = dt.replace(year=current_year - 1)
+
+        return int(dt.timestamp())
+    except Exception:
+        return None
+
+def _refresh_year_state(now_ts: float):
+    """Virada do dia: nova data de referência e caches invalidados"""
+    now = datetime.fromtimestamp(now_ts)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    _year_state['valid_until'] = midnight.timestamp()
+    _year_state['now'] = now
+    _SECOND_CACHE.clear()
+    _HOUR_CACHE.clear()
+
+def set_reference_time(now_ts: Optional[float]):
+    """
+    Fixa a data de referência do ano (importação de arquivos antigos: ex. mtime do
+    arquivo). None volta ao relógio.
+    """
+    clear_cache()
+    if now_ts is None:
+        _year_state['valid_until'] = 0.0
+        return
+    _year_state['valid_until'] = float('inf')
+    _year_state['now'] = datetime.fromtimestamp(now_ts)
+
+def parse_syslog_timestamp(ts_str: str, now_ts: float = None) -> Optional[int]:
+    """Converte timestamp syslog para Unix timestamp (mesmo resultado de strptime_timestamp)"""
+    if now_ts is None:
+        now_ts = time.time()
+    if now_ts >= _year_state['valid_until']:
+        _refresh_year_state(now_ts)
+
+    epoch = _SECOND_CACHE.get(ts_str)
+    if epoch is not None or ts_str in _SECOND_CACHE:
+        return epoch
+
+    # "Dec  2 14:23:45" -> ("Dec", "2", "14:23:45")
+    parts = ts_str.split()
+    clock = parts[-1] if len(parts) == 3 else ''
+    if (len(clock) != 8 or clock[2] != ':' or clock[5] != ':' or not clock.isascii()
+            or not (clock[0:2] + clock[3:5] + clock[6:8]).isdigit()
+            or clock[3] > '5' or clock[6] > '5'):
+        # Formato incomum (segundo bissexto, dígitos não ASCII...): caminho original
+        return strptime_timestamp(ts_str, _year_state['now'])
+
+    hour_key = (parts[0], parts[1], clock[0:2])
+    hour_epoch = _HOUR_CACHE.get(hour_key, 0)
+    if hour_epoch == 0:
+        hour_epoch = strptime_timestamp(f"{parts[0]} {parts[1]} {clock[0:2]}:00:00", _year_state['now'])
+        _HOUR_CACHE[hour_key] = hour_epoch
+
+    epoch = None
+    if hour_epoch is not None:
+        epoch = hour_epoch + int(clock[3:5]) * 60 + int(clock[6:8])
+
+    if len(_SECOND_CACHE) >= config.TIMESTAMP_CACHE_SIZE:
+        _SECOND_CACHE.clear()
+    _SECOND_CACHE[ts_str] = epoch
+    return epoch
+
+def clear_cache():
+    """Esvazia os caches (benchmarks e testes)"""
+    _SECOND_CACHE.clear()
+    _HOUR_CACHE.clear()
@@ -0,0 +1,152 @@
+# app/tokenizer.py
+# Tokenizador de passada única para logs de firewall Mikrotik
+#
+# Substitui as regex LOG_REGEX_WITH_NAT / LOG_REGEX_NO_NAT no caminho quente.
+# As regex originais encadeiam ".*?"/".+?": o motor testa cada posição da linha,
+# volta atrás quando um trecho não casa e, sem NAT, ainda varre a linha duas vezes.
+#
+# O tokenizador anda pela linha uma vez com str.find/partição, sempre na PRIMEIRA
+# ocorrência de cada campo ("in:", " out:", ",", "proto", "->", "NAT ("). Quando a
+# linha casa, essa é exatamente a escolha que as regex fazem (a primeira tentativa
+# do backtracking). Qualquer desvio do formato (ex: o primeiro "->" não é um
+# endpoint) devolve None e o chamador usa as regex como fallback.
+#
+# Tudo antes do endpoint de origem (horário, host, interfaces, proto) se repete
+# entre as linhas do mesmo segundo: esses campos ficam em cache por prefixo.
+
+import re
+from app import config
+
+# Resultado definitivo: nenhuma das regex pode casar com a linha
+NO_MATCH = object()
+
+# Horário "Dec  2 14:23:45" (trecho fixo, sem backtracking)
+_ts_match = re.compile(r'\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}').match
+
+# Trecho obrigatório nas duas regex: sem ele (ex: ICMP, sem portas) nada casa
+_PORT_ARROW_REGEX = re.compile(r':\d+->')
+
+_IP_CHARS = '0123456789.'
+_DIGITS = '0123456789'
+_SPACES = ' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'  # \s (str.isspace) no ASCII
+
+# Prefixo até o endpoint de origem -> (syslog_ts, interface_in, interface_out, proto), ou () fora do formato
+_PREFIX_CACHE = {}
+
+def _ip_port_after(line: str, start: int):
+    """'[\\d.]+:\\d+' começando em start: (ip, porta, fim) ou None"""
+    rest = line[start:]
+    tail = rest.lstrip(_IP_CHARS)
+    ip_len = len(rest) - len(tail)
+    if not ip_len or tail[:1] != ':':
+        return None
+
+    after = tail[1:]
+    port_len = len(after) - len(after.lstrip(_DIGITS))
+    if not port_len:
+        return None
+    end = start + ip_len + 1 + port_len
+    return rest[:ip_len], after[:port_len], end
+
+def _nat(line: str, start: int):
+    """'NAT\\s+\\([^>]+->ip:porta\\)' a partir de start: (ip, porta) ou (None, None)"""
+    pos = line.find('NAT', start)
+    while pos >= 0:
+        i = pos + 3
+        j = i
+        while j < len(line) and line[j].isspace():
+            j += 1
+        if j > i and line.startswith('(', j):
+            gt = line.find('>', j + 1)
+            if gt > j + 2 and line[gt - 1] == '-':
+                pub = _ip_port_after(line, gt + 1)
+                if pub is not None and line.startswith(')', pub[2]):
+                    return pub[0], pub[1]
+        pos = line.find('NAT', pos + 1)
+    return None, None
+
+def _no_fast_path(line: str):
+    """Linha fora do formato comum: NO_MATCH se nenhuma regex casaria, senão None (fallback)"""
+    return None if _PORT_ARROW_REGEX.search(line) else NO_MATCH
+
+def _prefix_fields(prefix: str):
+    """Campos do prefixo '<PRI>Dec  2 14:23:45 … in:… out:…, … proto …,': tupla ou () fora do formato"""
+    # Horário no início (com ou sem o prefixo <PRI> do datagrama)
+    pos = 0
+    if prefix[:1] == '<':
+        pos = prefix.find('>') + 1
+        if pos < 3 or not prefix[1:pos - 1].isdigit():
+            return ()
+    match = _ts_match(prefix, pos)
+    if match is None:
+        return ()
+
+    # ..., in:<interface_in>\s+out:<interface_out>, ... proto <proto> ...
+    # ("in:" não aparece dentro do horário nem do <PRI>)
+    _, found_in, rest = prefix.partition('in:')
+    interface_in, found_out, rest = rest.partition('out:')
+    interface_out, found_comma, rest = rest.partition(',')
+    skipped, found_proto, rest = rest.partition('proto ')
+    proto = rest.partition(' ')[0].rstrip(',')    # "tcp," / "TCP (SYN),"
+    if (not (found_in and found_out and found_comma and found_proto and interface_out)
+            or interface_in[-1:] not in _SPACES or 'proto' in skipped or not proto.isalnum()):
+        return ()
+    interface_in = interface_in.rstrip()
+    if not interface_in:
+        return ()
+    return match.group(), interface_in, interface_out, proto
+
+def tokenize_firewall_line(line: str):
+    """
+    Extrai os campos de uma linha 'in:… out:…, proto …, a:b->c:d, NAT (…)'.
+
+    Retorna o mesmo dicionário de database.parse_log_line, NO_MATCH quando
+    nenhuma regex casaria, ou None quando a linha exige o fallback por regex.
+    """
+    if not line.isascii() or '\n' in line:
+        return _no_fast_path(line)  # Fora do ASCII \w/\d/\s das regex valem mais; '.' não cruza \n
+
+    # Até o primeiro "->": <prefixo> <src_ip>:<src_port>
+    # Depois dele: <dst_ip>:<dst_port>, ... NAT (...-><nat_ip_pub>:<nat_port_pub>) ...
+    head, arrow, tail = line.partition('->')
+    prefix, _, src = head.rpartition(' ')
+    src_ip, _, src_port = src.partition(':')
+    dst_ip, _, rest = tail.partition(':')
+    dst_port, _, rest = rest.partition(',')
+    if (not (arrow and src_ip and src_port and dst_ip and dst_port)
+            or not (src_port + dst_port).isdigit() or (src_ip + dst_ip).strip(_IP_CHARS)):
+        return _no_fast_path(line)
+
+    # Com o endpoint válido (só [\d.:]), nenhum campo do prefixo pode estar nele
+    fields = _PREFIX_CACHE.get(prefix)
+    if fields is None:
+        fields = _prefix_fields(prefix)
+        if len(_PREFIX_CACHE) >= config.TOKENIZER_CACHE_SIZE:
+            _PREFIX_CACHE.clear()
+        _PREFIX_CACHE[prefix] = fields
+    if not fields:
+        return _no_fast_path(line)
+    syslog_ts, interface_in, interface_out, proto = fields
+
+    nat_ip = nat_port = None
+    if 'NAT' in rest:
+        nat, arrow, pub = rest.partition('->')
+        nat_ip, _, pub = pub.partition(':')
+        nat_port, close, _ = pub.partition(')')
+        if (nat[:6] != ' NAT (' or len(nat) < 7 or '>' in nat or not close
+                or not nat_port.isdigit() or not nat_ip or nat_ip.strip(_IP_CHARS)):
+            nat_ip, nat_port = _nat(line, len(line) - len(rest))
+
+    return {
+        'syslog_ts': syslog_ts,
+        'interface_in': interface_in,
+        'interface_out': interface_out,
+        'proto': proto,
+        'src_ip_priv': src_ip,
+        'src_port_priv': src_port,
+        'dst_ip': dst_ip,
+        'dst_port': dst_port,
+        'nat_ip_pub': nat_ip,
+        'nat_port_pub': nat_port,
+        'has_nat': nat_ip is not None,
+    }